@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_compression
+----------------------------------
+
+Compares flux variability analysis of the full E. coli model against FVA of its
+compressed form (blocked reactions removed, coupled reactions lumped), including
+the time taken to compress it, and reports the largest difference in flux ranges.
+
+Run from the repository root:  python benchmarks/bench_compression.py
+"""
+
+import time
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FVA
+from pyabolism.simulate.compression import compress, decompress
+
+MODEL  = 'examples/data/ecoli.xml'
+SOLVER = 'highs'
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+
+    start   = time.time()
+    reduced = compress(model)
+    compressing = time.time() - start
+
+    print('%s : %d reactions, %d metabolites -> %d reactions, %d metabolites'
+          % (MODEL, len(model.reaction), len(model.metabolite),
+             len(reduced.reaction), len(reduced.metabolite)))
+    print('    compress           : %8.2f s' % compressing)
+
+    start = time.time()
+    full  = FVA(model, norm='', solver=SOLVER, write_back=False)
+    print('    FVA                : %8.2f s  (%d LPs)' % (time.time() - start, full.lps_solved))
+
+    start    = time.time()
+    solution = FVA(reduced, norm='', solver=SOLVER, write_back=False)
+    expanded = decompress(reduced, solution)
+    print('    FVA (compressed)   : %8.2f s  (%d LPs, largest difference %.1e)'
+          % (time.time() - start, solution.lps_solved,
+             np.abs(expanded.flux_ranges - full.flux_ranges).max()))
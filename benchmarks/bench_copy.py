@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_copy
+----------------------------------
+
+Compares the ways of evaluating variants of the full E. coli model without altering it:
+`copy.deepcopy` of the model against `MetaModel.copy`, each followed by a change of bounds,
+and the same change made within `MetaModel.temporary_changes` on the model itself.
+
+Run from the repository root:  python benchmarks/bench_copy.py
+"""
+
+import time
+from copy import deepcopy
+
+from pyabolism.io import load_model
+
+MODEL    = 'examples/data/ecoli.xml'
+VARIANTS = 20
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+    model.matrix()
+
+    print('%s (%d variants)' % (MODEL, VARIANTS))
+
+    timings = []
+    for name, make in [('copy.deepcopy', deepcopy), ('MetaModel.copy', lambda m: m.copy())]:
+        start = time.time()
+        for _ in range(VARIANTS):
+            variant = make(model)
+            variant.reaction['R_EX_glc_e_'].lower_bound = -5.0
+            variant.matrix()
+        timings.append(time.time() - start)
+        print('    %-24s : %8.2f ms per variant' % (name, 1e3 * timings[-1] / VARIANTS))
+
+    start = time.time()
+    for _ in range(VARIANTS):
+        with model.temporary_changes({'R_EX_glc_e_': (-5.0, 0.0)}):
+            model.matrix()
+    elapsed = (time.time() - start) / VARIANTS
+    print('    %-24s : %8.2f ms per variant' % ('temporary_changes', 1e3 * elapsed))
+    print('    MetaModel.copy is x%.1f faster than deepcopy' % (timings[0] / timings[1]))
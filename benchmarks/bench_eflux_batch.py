@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_eflux_batch
+----------------------------------
+
+Compares the time taken to simulate a cohort of random expression samples with `EFlux`,
+one sample at a time (restoring the bounds of the model in between), against
+`EFlux_batch` with one and with several processes.
+
+Run from the repository root:  python benchmarks/bench_eflux_batch.py
+"""
+
+import time
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import EFlux, EFlux_batch
+from pyabolism.tools import compile_GPRs
+
+MODEL     = 'examples/data/ecoli_core.xml'
+SAMPLES   = 200
+PROCESSES = 4
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+    genes = compile_GPRs(model).genes
+
+    X = 100.0 * np.random.rand(SAMPLES, len(genes))
+
+    bounds = [(r, r.lower_bound, r.upper_bound) for r in model.reactions()]
+
+    start = time.time()
+    for x in X:
+        EFlux(model, dict(zip(genes, x)))
+        for r, lower_bound, upper_bound in bounds:
+            r.lower_bound = lower_bound
+            r.upper_bound = upper_bound
+    single = time.time() - start
+
+    print('%s (%d samples)' % (MODEL, SAMPLES))
+    print('    EFlux per sample     : %8.2f s' % single)
+
+    for processes in [1, PROCESSES]:
+        start = time.time()
+        EFlux_batch(model, X, genes=genes, processes=processes)
+        batch = time.time() - start
+        print('    EFlux_batch (%d proc) : %8.2f s  (x%.1f)' % (processes, batch, single / batch))
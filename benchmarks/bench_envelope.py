@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_envelope
+----------------------------------
+
+Compares computing a phenotypic phase plane (growth over a grid of glucose and oxygen
+uptakes) by setting the bounds of the model and calling `FBA` at every point, against
+`production_envelope` with one and with several processes.
+
+Run from the repository root:  python benchmarks/bench_envelope.py
+"""
+
+import time
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FBA, production_envelope
+
+MODEL     = 'examples/data/ecoli.xml'
+SOLVER    = 'highs'
+REACTIONS = ['R_EX_glc_e_', 'R_EX_o2_e_']
+RANGES    = [(-10.0, 0.0), (-20.0, 0.0)]
+POINTS    = 15
+PROCESSES = 4
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+
+    axes = [np.linspace(lower_bound, upper_bound, POINTS) for (lower_bound, upper_bound) in RANGES]
+    bounds = [(model.reaction[rid].lower_bound, model.reaction[rid].upper_bound)
+              for rid in REACTIONS]
+
+    FBA(model, solver=SOLVER)
+
+    start  = time.time()
+    looped = np.nan * np.ones((POINTS, POINTS))
+    for i, x in enumerate(axes[0]):
+        for j, y in enumerate(axes[1]):
+            for rid, value in zip(REACTIONS, [x, y]):
+                model.reaction[rid].lower_bound = value
+                model.reaction[rid].upper_bound = value
+            solution = FBA(model, solver=SOLVER, write_back=False)
+            looped[i, j] = solution.objective_value if solution.objective_value is not None \
+                else np.nan
+    single = time.time() - start
+
+    for rid, (lower_bound, upper_bound) in zip(REACTIONS, bounds):
+        model.reaction[rid].lower_bound = lower_bound
+        model.reaction[rid].upper_bound = upper_bound
+
+    print('%s (%d x %d grid)' % (MODEL, POINTS, POINTS))
+    print('    FBA per point               : %8.2f s' % single)
+
+    for processes in [1, PROCESSES]:
+        start    = time.time()
+        envelope = production_envelope(model, REACTIONS, points=POINTS, ranges=RANGES,
+                                       processes=processes, solver=SOLVER)
+        swept    = time.time() - start
+        print('    production_envelope (%d proc) : %8.2f s  (x%.1f, largest difference %.1e)'
+              % (processes, swept, single / swept,
+                 np.nanmax(np.abs(envelope[..., 2] - looped))))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_fastcc
+----------------------------------
+
+Compares finding the blocked reactions of the full E. coli model with `FASTCC` against
+flux variability analysis (with no objective, so that the full range of every flux is found),
+reporting the LPs solved by each and any reactions on which they disagree.
+
+Run from the repository root:  python benchmarks/bench_fastcc.py
+"""
+
+import time
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FASTCC, FVA
+
+MODEL  = 'examples/data/ecoli.xml'
+SOLVER = 'highs'
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+
+    print('%s (%d reactions)' % (MODEL, len(model.reaction)))
+
+    start   = time.time()
+    blocked = FASTCC(model, solver=SOLVER)
+    print('    FASTCC : %8.2f s  (%d LPs, %d blocked)'
+          % (time.time() - start, model.fastcc_lps_solved, len(blocked)))
+
+    for reaction in model.reactions():
+        reaction.objective_coefficient = 0.0
+
+    start    = time.time()
+    solution = FVA(model, norm='', solver=SOLVER, write_back=False)
+    by_FVA   = [rid for rid, flux_range in zip(solution.reaction_ids, solution.flux_ranges)
+                if np.abs(flux_range).max() < 1e-6]
+    print('    FVA    : %8.2f s  (%d LPs, %d blocked)'
+          % (time.time() - start, solution.lps_solved, len(by_FVA)))
+
+    print('    disagreeing : %s' % ', '.join(sorted(set(blocked) ^ set(by_FVA))))
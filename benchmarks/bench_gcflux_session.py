@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_gcflux_session
+----------------------------------
+
+Compares the time taken to simulate a cohort of random expression samples with
+`GCFlux`, which converts the model and builds its LP for every sample, against a
+`GCFluxSession`, which does so once and updates only the gene constraints per sample.
+
+Run from the repository root:  python benchmarks/bench_gcflux_session.py
+"""
+
+import time
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import GCFlux, GCFluxSession
+from pyabolism.tools import compile_GPRs
+
+MODEL   = 'examples/data/ecoli_core.xml'
+SAMPLES = 100
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+    genes = compile_GPRs(model).genes
+
+    X = 20.0 + 80.0 * np.random.rand(SAMPLES, len(genes))
+
+    print('%s (%d samples)' % (MODEL, SAMPLES))
+
+    for norm in ['L1', 'L2']:
+
+        start = time.time()
+        for x in X:
+            GCFlux(model, dict(zip(genes, x)), norm=norm)
+        single = time.time() - start
+
+        start = time.time()
+        GCFluxSession(model, norm=norm).batch(X)
+        batch = time.time() - start
+
+        print('    %s GCFlux per sample : %8.2f s' % (norm, single))
+        print('    %s GCFluxSession     : %8.2f s  (x%.1f)' % (norm, batch, single / batch))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_gene_incidence
+----------------------------------
+
+Compares finding the reactions disabled by pairs of gene deletions in the full E. coli model,
+by evaluating every GPR for each pair (as the deletion screens did) against the gene incidence
+of the model, which leaves only the GPRs naming both genes of a pair to be evaluated.
+
+Run from the repository root:  python benchmarks/bench_gene_incidence.py
+"""
+
+import time
+from itertools import combinations
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate.knockouts import _GeneReactionMap
+
+MODEL = 'examples/data/ecoli.xml'
+PAIRS = 100000
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+
+    start     = time.time()
+    incidence = model.gene_incidence()
+    building  = time.time() - start
+
+    gpr   = _GeneReactionMap(model)
+    pairs = list(combinations(gpr.genes, 2))[:PAIRS]
+
+    print('%s (%d genes, %d pairs)' % (MODEL, len(incidence.genes), len(pairs)))
+
+    start    = time.time()
+    expected = []
+    for k in range(0, len(pairs), 256):
+        expected.extend([list(np.flatnonzero(~row)) for row in gpr.gprs.active(pairs[k:k + 256])])
+    every = time.time() - start
+
+    start   = time.time()
+    knocked = gpr.knocked_out(pairs)
+    touched = time.time() - start
+
+    assert knocked == expected
+
+    print('    %-24s : %8.2f ms' % ('making the incidence', 1e3 * building))
+    print('    %-24s : %8.2f s' % ('every GPR', every))
+    print('    %-24s : %8.2f s' % ('genes touched', touched))
+    print('    the incidence is x%.1f faster' % (every / touched))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_gpr
+----------------------------------
+
+Compares the time taken to find the capacity of every reaction for a batch of
+expression samples by parsing each GPR into a tree (`GPR_string2tree`), as EFlux once
+did, against evaluating the GPRs compiled once per model (`compile_GPRs`).
+
+Run from the repository root:  python benchmarks/bench_gpr.py
+"""
+
+import time
+
+import networkx as nx
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.tools import GPR_string2tree, CompiledGPRs
+
+MODELS  = ['examples/data/ecoli_core.xml', 'examples/data/ecoli.xml']
+SAMPLES = 100
+
+
+def tree_capacity(gene_association, expressions):
+    """the capacity of a GPR, evaluated over its tree"""
+
+    tree = GPR_string2tree(gene_association)
+
+    for node in reversed(list(nx.topological_sort(tree))):
+        children = list(tree.successors(node))
+        if not children:
+            tree.node[node]['capacity'] = expressions.get(node, np.infty)
+        elif tree.node[node].get('operation', '') == 'or':
+            tree.node[node]['capacity'] = sum([tree.node[c]['capacity'] for c in children])
+        else:
+            tree.node[node]['capacity'] = min([tree.node[c]['capacity'] for c in children])
+
+    return tree.node['root']['capacity']
+
+
+if __name__ == '__main__':
+
+    for filename in MODELS:
+
+        model             = load_model(filename)
+        gene_associations = [r.notes.get('GENE_ASSOCIATION', '') for r in model.reactions()]
+
+        start    = time.time()
+        compiled = CompiledGPRs(gene_associations)
+        compile  = time.time() - start
+
+        X       = 100.0 * np.random.rand(SAMPLES, len(compiled.genes))
+        samples = [dict(zip(compiled.genes, x)) for x in X]
+
+        start = time.time()
+        trees = [[tree_capacity(g, sample) for g in gene_associations] for sample in samples[:5]]
+        tree  = (time.time() - start) * SAMPLES / 5.0
+
+        start      = time.time()
+        capacities = compiled.capacities(X)
+        batch      = time.time() - start
+
+        assert np.allclose(capacities[:5], trees)
+
+        print('%s (%d samples)' % (filename, SAMPLES))
+        print('    trees    : %10.2f ms' % (1e3 * tree))
+        print('    compile  : %10.2f ms' % (1e3 * compile))
+        print('    compiled : %10.2f ms  (x%.0f)' % (1e3 * batch, tree / batch))
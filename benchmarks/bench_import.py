@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_import
+----------------------------------
+
+Times `import pyabolism` (and its subpackages) in fresh interpreters, and lists which
+of the heavy optional dependencies each import pulls in. These should load only on
+first use: the solver library when an LP is built, networkx when a GPR is parsed and
+matplotlib when something is plotted.
+
+Run from the repository root:  python benchmarks/bench_import.py
+"""
+
+import subprocess
+import sys
+import timeit
+
+STATEMENTS = ['import pyabolism',
+              'import pyabolism.simulate',
+              'from pyabolism.simulate import FBA; from pyabolism.simulate.solvers import '
+              'default_solver; default_solver()']
+
+HEAVY   = ['gurobipy', 'highspy', 'networkx', 'matplotlib', 'seaborn', 'scipy']
+REPEATS = 5
+
+REPORT = "import sys; print(' '.join([m for m in %r if m in sys.modules]))" % HEAVY
+
+
+def time_import(statement):
+
+    def run():
+        subprocess.check_call([sys.executable, '-c', statement])
+
+    # the interpreter alone is timed too, so that its startup can be discounted
+    total    = min(timeit.repeat(run, number=1, repeat=REPEATS))
+    baseline = min(timeit.repeat(lambda: subprocess.check_call([sys.executable, '-c', 'pass']),
+                                 number=1, repeat=REPEATS))
+
+    return total - baseline
+
+
+if __name__ == '__main__':
+
+    for statement in STATEMENTS:
+
+        loaded = subprocess.check_output([sys.executable, '-c', statement + '; ' + REPORT])
+
+        print(statement)
+        print('    import time : %8.2f ms' % (1e3 * time_import(statement)))
+        print('    loaded      : %s' % (loaded.decode().strip() or '-'))
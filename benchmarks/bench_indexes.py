@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_indexes
+----------------------------------
+
+Compares finding the exchange, transport and compartment reactions of the full E. coli model
+by a search of every reaction (as `tools` did) against the indexes kept by `model.reaction`,
+counting the first query (which makes the index) separately.
+
+Run from the repository root:  python benchmarks/bench_indexes.py
+"""
+
+import time
+
+from pyabolism.io import load_model
+
+MODEL   = 'examples/data/ecoli.xml'
+QUERIES = 100
+
+
+def scan_exchanges(model):
+    """docstring for scan_exchanges"""
+    return [r for r in model.reactions()
+            if [m for (m, s) in r.participants.items() if m.boundaryCondition]
+            or len(r.participants) == 1]
+
+
+def scan_transports(model):
+    """docstring for scan_transports"""
+    return [r for r in model.reactions()
+            if set(['e', 'c']) == set([m.compartment for m in r.participants.keys()])]
+
+
+def scan_compartment(model):
+    """docstring for scan_compartment"""
+    return [r for r in model.reactions()
+            if 'Periplasm' in [m.compartment for m in r.participants.keys()]]
+
+
+def indexed(model):
+    """docstring for indexed"""
+    return (model.reaction.get_exchanges(), model.reaction.get_transports(),
+            model.reaction.get_by_compartment('Periplasm'))
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+
+    print('%s (%d reactions, %d queries of each)' % (MODEL, len(model.reaction), QUERIES))
+
+    start = time.time()
+    for _ in range(QUERIES):
+        scanned = (scan_exchanges(model), scan_transports(model), scan_compartment(model))
+    scanning = time.time() - start
+
+    start = time.time()
+    found = indexed(model)
+    first = time.time() - start
+
+    assert [[r.id for r in rs] for rs in found] == [[r.id for r in rs] for rs in scanned]
+
+    start = time.time()
+    for _ in range(QUERIES):
+        indexed(model)
+    queries = time.time() - start
+
+    print('    %-24s : %8.3f ms per query' % ('search of reactions', 1e3 * scanning / QUERIES))
+    print('    %-24s : %8.3f ms' % ('making the index', 1e3 * first))
+    print('    %-24s : %8.3f ms per query' % ('indexed', 1e3 * queries / QUERIES))
+    print('    indexed queries are x%.0f faster' % (scanning / queries))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_irreversify
+----------------------------------
+
+Compares the time and memory taken to put a model into irreversible form by copying
+it (`irreversify`, as L1-norm FBA and GC-Flux once did) against splitting the fluxes
+within the LP (`add_negative_parts`) and the array-form GC-Flux conversion.
+
+Memory is the peak allocated by Python during each step, and is only reported where
+tracemalloc is available (Python 3).
+
+Run from the repository root:  python benchmarks/bench_irreversify.py
+"""
+
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate.LP import build_matrix_lp, add_negative_parts
+from pyabolism.simulate.GCFlux import _convert_model
+from pyabolism.simulate.simtools import irreversify
+
+MODELS  = ['examples/data/ecoli_core.xml', 'examples/data/ecoli.xml']
+REPEATS = 5
+
+
+def measure(step, setup=lambda: None):
+    """the least time over REPEATS calls of step(setup()), and the peak memory of one call"""
+
+    times = []
+    for _ in range(REPEATS):
+        args  = setup()
+        start = time.time()
+        step(args)
+        times.append(time.time() - start)
+
+    peak = None
+    if tracemalloc is not None:
+        args = setup()
+        tracemalloc.start()
+        step(args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return min(times), peak
+
+
+def report(label, result):
+
+    seconds, peak = result
+    memory = '' if peak is None else '%10.2f MB' % (peak / 2.0**20)
+    print('    %-22s: %8.2f ms %s' % (label, 1e3 * seconds, memory))
+
+
+if __name__ == '__main__':
+
+    for filename in MODELS:
+
+        model  = load_model(filename)
+        matrix = model.matrix()
+
+        def split(lp):
+            add_negative_parts(lp, np.flatnonzero(matrix.reversible))
+
+        print(filename)
+        report('irreversify (copy)', measure(lambda _: irreversify(model)))
+        report('negative parts (LP)',
+               measure(split, setup=lambda: build_matrix_lp(matrix)[0]))
+        report('GC-Flux conversion', measure(lambda _: _convert_model(model)))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_lp_build
+----------------------------------
+
+Compares the time taken by `generate_basic_lp` to build the FBA linear program
+one element at a time against the bulk matrix-form construction.
+
+Run from the repository root:  python benchmarks/bench_lp_build.py
+"""
+
+import timeit
+
+from pyabolism.io import load_model
+from pyabolism.simulate.LP import generate_basic_lp
+
+MODELS  = ['examples/data/ecoli_core.xml', 'examples/data/ecoli.xml']
+REPEATS = 5
+
+
+def time_build(model, bulk):
+
+    def build():
+        generate_basic_lp(model, bulk=bulk)
+
+    return min(timeit.repeat(build, number=1, repeat=REPEATS))
+
+
+if __name__ == '__main__':
+
+    for filename in MODELS:
+
+        model = load_model(filename)
+
+        try:
+            by_element = time_build(model, bulk=False)
+            bulk       = time_build(model, bulk=True)
+        except Exception as e:
+            # e.g. a model too large for a size-limited solver license
+            print('%s : skipped (%s)' % (filename, e))
+            continue
+
+        print('%s : %d reactions, %d metabolites' % (filename, len(model.reaction),
+                                                     len(model.metabolite)))
+        print('    by element : %8.2f ms' % (1e3 * by_element))
+        print('    bulk       : %8.2f ms  (x%.1f)' % (1e3 * bulk, by_element / bulk))
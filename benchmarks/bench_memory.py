@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_memory
+----------------------------------
+
+Measures the memory taken by the full E. coli model once loaded, as the total size of all
+the objects reachable from it, by type, against the size of the SBML file it is read from.
+
+Run from the repository root:  python benchmarks/bench_memory.py
+"""
+
+import gc
+import os
+import sys
+import time
+import types
+from collections import defaultdict
+
+from pyabolism.io import load_model
+
+MODEL = 'examples/data/ecoli.xml'
+
+# objects shared with the rest of the interpreter, rather than belonging to the model
+SHARED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def deep_size(root):
+    """the total size of the objects reachable from root, and the sizes by type"""
+
+    sizes = defaultdict(int)
+    seen  = set()
+    stack = [root]
+
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SHARED) or obj is None:
+            continue
+        seen.add(id(obj))
+
+        sizes[type(obj).__name__] += sys.getsizeof(obj)
+
+        # the referents of containers, slots and any __dict__, without making the __dict__
+        # of elements that have none
+        stack.extend(gc.get_referents(obj))
+
+    return sum(sizes.values()), sizes
+
+
+if __name__ == '__main__':
+
+    start = time.time()
+    model = load_model(MODEL)
+    print('%s : %d reactions, %d metabolites, loaded in %.2f s' %
+          (MODEL, len(model.reaction), len(model.metabolite), time.time() - start))
+
+    total, sizes = deep_size(model)
+
+    print('    %-24s : %8.2f MB' % ('SBML file', os.path.getsize(MODEL) / 1e6))
+    print('    %-24s : %8.2f MB' % ('model in memory', total / 1e6))
+    for name, size in sorted(sizes.items(), key=lambda item: -item[1])[:8]:
+        print('        %-20s : %8.2f MB' % (name, size / 1e6))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_pfba
+----------------------------------
+
+Times repeated calls of parsimonious FBA (`pFBA`) on the full E. coli model for both norms,
+against plain FBA, along with the cost of switching the LP between the objectives of the
+two stages, which are kept by the LP session rather than rebuilt on every call.
+
+Run from the repository root:  python benchmarks/bench_pfba.py
+"""
+
+import time
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FBA, pFBA
+from pyabolism.simulate.solvers import MAXIMIZE, MINIMIZE
+
+MODEL   = 'examples/data/ecoli.xml'
+SOLVER  = 'highs'
+REPEATS = 20
+
+
+if __name__ == '__main__':
+
+    model = load_model(MODEL)
+
+    print('%s (%s, mean of %d calls)' % (MODEL, SOLVER, REPEATS))
+
+    FBA(model, solver=SOLVER)
+
+    start = time.time()
+    for _ in range(REPEATS):
+        FBA(model, solver=SOLVER)
+    print('    FBA           : %8.1f ms' % (1e3 * (time.time() - start) / REPEATS))
+
+    session   = model.lp_session
+    objective = session._full_length(model.matrix().objective)
+
+    for norm in ['L1', 'L2']:
+
+        pFBA(model, norm=norm, solver=SOLVER)
+
+        start = time.time()
+        for _ in range(REPEATS):
+            pFBA(model, norm=norm, solver=SOLVER)
+        calls = time.time() - start
+
+        # a switch to the objective of the second stage and back, without solving
+        linear, quadratic = session.norm_objective(norm)
+        start = time.time()
+        for _ in range(REPEATS):
+            model.lp.set_objective(linear=linear, quadratic=quadratic, sense=MINIMIZE)
+            model.lp.set_objective(linear=objective, sense=MAXIMIZE)
+        switches = time.time() - start
+        session.objective_replaced = True
+
+        print('    pFBA (%s)     : %8.1f ms  (switching objectives %.2f ms)'
+              % (norm, 1e3 * calls / REPEATS, 1e3 * switches / REPEATS))
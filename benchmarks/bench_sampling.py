@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_sampling
+----------------------------------
+
+Times the flux sampler on the full E. coli model: finding the warmup points by LP, then
+drawing samples with hit-and-run, streamed to a .npy file, with one and with several
+processes. The largest steady-state violation of the samples is reported alongside.
+
+Run from the repository root:  python benchmarks/bench_sampling.py
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import sample
+from pyabolism.simulate.sampling import warmup_points
+
+MODEL     = 'examples/data/ecoli.xml'
+SAMPLES   = 10000
+THINNING  = 100
+PROCESSES = 4
+SOLVER    = 'highs'
+
+
+if __name__ == '__main__':
+
+    model  = load_model(MODEL)
+    matrix = model.matrix()
+
+    start  = time.time()
+    warmup = warmup_points(matrix, solver=SOLVER)
+
+    print('%s (%d samples, thinning %d)' % (MODEL, SAMPLES, THINNING))
+    print('    warmup (%d points)   : %8.2f s' % (len(warmup), time.time() - start))
+
+    output = os.path.join(tempfile.mkdtemp(), 'samples.npy')
+
+    for processes in [1, PROCESSES]:
+        start   = time.time()
+        samples = sample(model, SAMPLES, thinning=THINNING, processes=processes, output=output,
+                         warmup=warmup)
+        print('    sampling (%d proc)    : %8.2f s  (largest |S.v| %.1e)'
+              % (processes, time.time() - start,
+                 np.abs(matrix.constrained().dot(samples.T)).max()))
+
+    os.remove(output)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_sbml_load
+----------------------------------
+
+Compares the time taken by `load_sbml` to read each example model via libsbml
+against the single-pass streaming reader.
+
+Run from the repository root:  python benchmarks/bench_sbml_load.py
+"""
+
+import timeit
+
+from pyabolism.io import load_sbml
+
+MODELS  = ['examples/data/ecoli_core.xml', 'examples/data/ecoli.xml']
+REPEATS = 5
+
+
+def time_load(filename, fast):
+
+    def load():
+        load_sbml(filename, fast=fast)
+
+    return min(timeit.repeat(load, number=1, repeat=REPEATS))
+
+
+if __name__ == '__main__':
+
+    for filename in MODELS:
+
+        libsbml   = time_load(filename, fast=False)
+        streaming = time_load(filename, fast=True)
+
+        print(filename)
+        print('    libsbml   : %8.2f ms' % (1e3 * libsbml))
+        print('    streaming : %8.2f ms  (x%.1f)' % (1e3 * streaming, libsbml / streaming))
@@ -1,7 +1,6 @@
 
 import os
 import re
-from libsbml import SBMLReader, SBMLWriter, SBMLDocument, UnitKind_toString, UnitKind_forName
 
 from .model import MetaModel, Compartment, Metabolite, Reaction, Unit, UnitDefinition
 
@@ -12,6 +11,10 @@ def load_model(filename, filetype='sbml'):
         return load_sbml(filename)
     elif filetype.lower() == 'pickle':
         return load_pickle(filename)
+    elif filetype.lower() == 'binary':
+        return load_binary(filename)
+    elif filetype.lower() == 'cached':
+        return uncache_model(filename)
     else:
         raise Exception('Unknown filetype!')
 
@@ -22,12 +25,30 @@ def save_model(model, filename, filetype='sbml'):
         save_sbml(model, filename)
     elif filetype.lower() == 'pickle':
         save_pickle(model, filename)
+    elif filetype.lower() == 'binary':
+        save_binary(model, filename)
     else:
         raise Exception('Unknown filetype!')
 
 
-def load_sbml(filename):
-    """docstring for load_model"""
+def load_sbml(filename, fast=True):
+    """docstring for load_model
+
+        by default the file is read in a single streaming pass of the XML (see _load_sbml_fast),
+        falling back to libsbml for those files using features the streaming reader does not
+        handle. fast=False always reads via libsbml"""
+
+    if fast:
+        model = _load_sbml_fast(filename)
+        if model is not None:
+            return model
+
+    return _load_sbml_libsbml(filename)
+
+
+def _load_sbml_libsbml(filename):
+    """docstring for _load_sbml_libsbml"""
+    from libsbml import SBMLReader, UnitKind_toString
 
     notes_pattern = re.compile('\<\w*:?\w*\>([^<>]*)\<\/\w*:?\w*\>')
 
@@ -127,8 +148,176 @@ def load_sbml(filename):
     return model
 
 
+class _UnsupportedSBML(Exception):
+    """raised by the streaming reader for SBML it leaves to libsbml"""
+    pass
+
+
+class _LocalNames(dict):
+    """the tags of elements without their namespace, memoised since every element is looked up"""
+    def __missing__(self, tag):
+        self[tag] = name = tag.rsplit('}', 1)[-1]
+        return name
+
+
+def _sbml_boolean(value):
+    """docstring for _sbml_boolean"""
+    return value.strip() in ('true', '1')
+
+
+def _load_sbml_fast(filename):
+    """read an SBML (level 2) file in a single streaming pass, without libsbml
+
+        each species and reaction is converted as soon as its closing tag is read, and its
+        element then discarded, such that the document is never held in memory as a whole.
+        the resulting model matches that read by libsbml, save for the raw_notes of species,
+        which are serialised by ElementTree rather than libsbml.
+
+        returns None for any file the reader is unable to handle faithfully, such as
+        compressed files, other levels of SBML or stoichiometryMath"""
+    try:
+        from xml.etree import cElementTree as ElementTree
+    except ImportError:
+        from xml.etree import ElementTree
+
+    if filename.lower().endswith(('.gz', '.zip', '.bz2')):
+        return None
+
+    try:
+        return _stream_sbml(ElementTree, filename)
+    except (_UnsupportedSBML, SyntaxError, IOError, OSError):
+        # ElementTree's ParseError is a SyntaxError, and libsbml reports unreadable files
+        return None
+
+
+def _stream_sbml(ElementTree, filename):
+    """docstring for _stream_sbml"""
+
+    model = None
+    names = _LocalNames()
+
+    for event, element in ElementTree.iterparse(filename, events=('start', 'end')):
+
+        tag = names[element.tag]
+
+        if event == 'start':
+            # only the opening tags of the document and of the model are of interest
+            if model is None:
+                if tag == 'sbml' and element.get('level') != '2':
+                    raise _UnsupportedSBML('SBML level %s' % element.get('level'))
+
+                elif tag == 'model':
+                    model = MetaModel(id=element.get('id', ''))
+                    model.name = element.get('name', '')
+
+            continue
+
+        if tag == 'compartment':
+            compartment = Compartment(element.get('id'), name=element.get('name', ''),
+                                      outside=element.get('outside', ''))
+            model.compartment.add(compartment)
+
+        elif tag == 'unitDefinition':
+            unit_definition = UnitDefinition(element.get('id'))
+            for sbml_unit in element.iter():
+                if names[sbml_unit.tag] != 'unit':
+                    continue
+                unit = Unit(sbml_unit.get('kind'))
+                unit.multiplier = float(sbml_unit.get('multiplier', 1.0))
+                unit.scale      = int(sbml_unit.get('scale', 0))
+                unit.exponent   = int(sbml_unit.get('exponent', 1))
+                unit.offset     = float(sbml_unit.get('offset', 0.0))
+                unit_definition.units.append(unit)
+            model.unit_definition[unit_definition.id] = unit_definition
+            element.clear()
+
+        elif tag == 'species':
+            metabolite = Metabolite(element.get('id'),
+                                    name=element.get('name', ''),
+                                    compartment=element.get('compartment', ''),
+                                    charge=int(element.get('charge', 0)),
+                                    boundaryCondition=_sbml_boolean(
+                                        element.get('boundaryCondition', 'false')))
+
+            metabolite.raw_notes = ''
+            for child in element:
+                if names[child.tag] == 'notes':
+                    metabolite.raw_notes = ElementTree.tostring(child)
+
+            model.metabolite.add(metabolite)
+            element.clear()
+
+        elif tag == 'reaction':
+            model.reaction.add(_stream_reaction(element, model, names))
+            element.clear()
+
+        elif tag in ('listOfSpecies', 'listOfReactions'):
+            # the (now empty) elements that were converted are also let go
+            element.clear()
+
+    if model is None:
+        raise _UnsupportedSBML('no model found')
+
+    return model
+
+
+def _stream_reaction(element, model, names):
+    """convert a reaction element, read by _stream_sbml, into a Reaction of model"""
+
+    reaction = Reaction(element.get('id'), name=element.get('name', ''),
+                        reversible=_sbml_boolean(element.get('reversible', 'true')))
+
+    parameters = {}
+
+    for child in element:
+
+        tag = names[child.tag]
+
+        if tag == 'notes':
+            # as for the libsbml reader, each element holding only text is a 'key: value' pair
+            for note in child.iter():
+                if len(note) == 0 and not note.attrib and note is not child:
+                    string = note.text or ''
+                    reaction.notes[string.split(':')[0].strip()] = string.split(':')[-1].strip()
+
+        elif tag == 'kineticLaw':
+            for parameter in child.iter():
+                if names[parameter.tag] == 'parameter':
+                    parameters[parameter.get('id')] = float(parameter.get('value', 'nan'))
+
+        elif tag in ('listOfReactants', 'listOfProducts'):
+            sign = -1.0 if tag == 'listOfReactants' else 1.0
+
+            for reference in child:
+                if names[reference.tag] != 'speciesReference':
+                    continue
+                if len(reference) and [r for r in reference if names[r.tag] == 'stoichiometryMath']:
+                    raise _UnsupportedSBML('stoichiometryMath')
+
+                m_id = reference.get('species')
+                try:
+                    metabolite = model.metabolite[m_id]
+                except KeyError:
+                    metabolite = Metabolite(m_id,
+                                            compartment=m_id.split('_')[-1],
+                                            boundaryCondition=False)
+                    model.metabolite.add(metabolite)
+
+                reaction.add_participant(metabolite,
+                                         sign * float(reference.get('stoichiometry', 1.0)))
+
+    reaction.lower_bound    = parameters.get('LOWER_BOUND', None)
+    reaction.upper_bound    = parameters.get('UPPER_BOUND', None)
+    reaction.default_bounds = (reaction.lower_bound, reaction.upper_bound)
+
+    reaction.objective_coefficient = parameters.get('OBJECTIVE_COEFFICIENT', 0.0)
+
+    return reaction
+
+
 def save_sbml(model, filename):
     """docstring for save_model"""
+    from libsbml import SBMLWriter, SBMLDocument, UnitKind_forName
 
     sbml_document = SBMLDocument(2, 1)
     sbml_model    = sbml_document.createModel(model.id)
@@ -210,65 +399,166 @@ def save_sbml(model, filename):
     writer.writeSBML(sbml_document, filename)
 
 
-def uncache_model(bug_name):
-    """Searches .pyabolism file for matching bug name
-        if available will load pickle file
-        otherwise, will load from SBML and store pickle for future use
+def uncache_model(filename, config_folder=None, max_size=None, mmap_mode='r'):
+    """the model of an SBML file, loaded from the cache where available,
+        and otherwise read from the file and added to the cache for future use
 
-        NB Pyabolism bugs are intended to speed up loading models, not for storage
-            of edits made. These should be written back to external SBML files for
-            safekeeping.
+        the cache is kept in the .pyabolism folder (as found by tools.find_config_folder,
+        unless config_folder is given), and holds each model in the binary format of
+        save_binary. where no config folder exists, the SBML is simply read.
 
-            Bugs will not in general survive upgrades to Pyabolism code base!
-            Use with care!
-        """
-    raise Exception("Apologies, in it's current state this functionality is best avoided!")
+        models are keyed on the hash of the SBML file and on BINARY_FORMAT_VERSION, so an
+        edited file or an upgraded Pyabolism never finds a stale model. the cache is limited
+        to max_size bytes (CACHE_SIZE by default), the least recently used models being evicted.
 
-    from .tools import find_config_folder
-    config_folder = find_config_folder()
+        NB the cache is intended to speed up loading models, not for storage of edits made.
+            These should be written back to external SBML files for safekeeping."""
 
-    if not config_folder:
-        raise Exception("Unable to load bug, can't find a config folder!")
+    folder = _cache_folder(config_folder)
 
-    import pickle
-    from os.path import sep
+    if folder is None:
+        return load_sbml(filename)
+
+    path = os.path.join(folder, _cache_key(filename))
 
     try:
-        return pickle.load(open(sep.join([config_folder, 'bugs', '%s.pickle' % bug_name]), 'r'))
-    except IOError:
-        raise IOError('Sorry, unable to find a bug of that name...')
+        model = load_binary(path, mmap_mode)
+    except (IOError, OSError, ValueError):
+        # not yet cached, or evicted by another process as it was read
+        model = load_sbml(filename)
+        _add_to_cache(model, folder, path, max_size)
+        return model
+
+    # the modification time of the header records when each model was last used
+    try:
+        os.utime(os.path.join(path, 'header.json'), None)
+    except OSError:
+        pass
 
+    # other processes may evict the entry at any time, so the matrix is pickled by value
+    # rather than by the path of the entry (see StoichiometricMatrix)
+    model._matrix.path = None
 
-def cache_model(model, bug_name, overwrite=False):
-    """cache a model as pickle inside the pyabolism config folder
+    return model
+
+
+def cache_model(filename, config_folder=None, max_size=None):
+    """add the model of an SBML file to the cache (see uncache_model) without loading it,
+        returning the path of its entry in the cache, or None where there is no config folder"""
+
+    folder = _cache_folder(config_folder)
+
+    if folder is None:
+        return None
+
+    path = os.path.join(folder, _cache_key(filename))
+
+    if not os.path.isfile(os.path.join(path, 'header.json')):
+        _add_to_cache(load_sbml(filename), folder, path, max_size)
 
-        NB Pyabolism bugs are intended to speed up loading models, not for storage
-            of edits made. These should be written back to external SBML files.
+    return path
 
-            Bugs will not in general survive upgrades to Pyabolism code base!
-            Use with care!!"""
 
-    raise Exception("Apologies, in it's current state this functionality is best avoided!")
+# the total size of the model cache, in bytes, above which models are evicted
+CACHE_SIZE = 2 ** 30
 
+
+def _cache_folder(config_folder=None):
+    """docstring for _cache_folder"""
     from .tools import find_config_folder
-    config_folder = find_config_folder()
+
+    config_folder = config_folder or find_config_folder()
 
     if not config_folder:
-        raise Exception("Unable to save bug, can't find a config folder!")
+        return None
 
-    from os.path import isdir, sep, isfile
+    folder = os.path.join(config_folder, 'cache')
+
+    try:
+        os.makedirs(folder)
+    except OSError:
+        # the folder exists, perhaps just created by another process
+        if not os.path.isdir(folder):
+            raise
 
-    if not isdir(sep.join([config_folder, 'bugs'])):
-        os.mkdir(sep.join([config_folder, 'bugs']))
+    return folder
 
-    pickle_name = sep.join([config_folder, 'bugs', '%s.pickle' % bug_name])
 
-    if isfile(pickle_name) and not overwrite:
-        raise Exception('Bug already exists! Pass overwrite=True to replace existing pickle.')
+def _cache_key(filename):
+    """the SHA-1 of an SBML file, together with the version of the binary format"""
+    import hashlib
 
-    save_pickle(model, open(pickle_name, 'w'))
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(2 ** 20), b''):
+            digest.update(block)
 
-    return
+    return '%s-v%d' % (digest.hexdigest(), BINARY_FORMAT_VERSION)
+
+
+def _add_to_cache(model, folder, path, max_size=None):
+    """write a model into the cache atomically, then evict models to bring it within max_size
+
+        the model is written to a temporary folder and renamed into place, such that other
+        processes see either the complete model or nothing. should another process rename
+        the same model into place first, the duplicate is simply discarded"""
+    import shutil
+    import tempfile
+
+    temporary = tempfile.mkdtemp(prefix='.tmp-', dir=folder)
+    try:
+        save_binary(model, temporary)
+        os.rename(temporary, path)
+    except OSError:
+        pass
+    finally:
+        shutil.rmtree(temporary, ignore_errors=True)
+
+    _evict(folder, CACHE_SIZE if max_size is None else max_size, keep=path)
+
+
+def _evict(folder, max_size, keep=None):
+    """remove models of other format versions, and then the least recently used models
+        until the cache is within max_size bytes"""
+    import shutil
+
+    suffix = '-v%d' % BINARY_FORMAT_VERSION
+
+    entries = []
+    for name in os.listdir(folder):
+
+        # folders still being written by other processes
+        if name.startswith('.'):
+            continue
+
+        path = os.path.join(folder, name)
+        try:
+            size = sum([os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)])
+            used = os.path.getmtime(os.path.join(path, 'header.json'))
+        except OSError:
+            # removed by another process, or an entry left incomplete
+            size, used = 0, 0.0
+
+        entries.append((name.endswith(suffix), used, size, path))
+
+    total = sum([entry[2] for entry in entries])
+
+    # stale versions first, then in order of last use
+    for (current, used, size, path) in sorted(entries):
+
+        if current and total <= max_size:
+            break
+        if path == keep:
+            continue
+
+        # the header goes first, so that readers see the model as absent rather than broken
+        try:
+            os.remove(os.path.join(path, 'header.json'))
+        except OSError:
+            pass
+        shutil.rmtree(path, ignore_errors=True)
+
+        total -= size
 
 
 import pickle
@@ -276,15 +566,225 @@ import pickle
 
 def save_pickle(model, filename):
 
-    model.lp = None
+    model.lp         = None
+    model.lp_session = None
     for r in model.reactions():
         r.lp_var = None
     for m in model.metabolites():
         m.lp_constr = None
 
-    pickle.dump(model, open(filename, 'w'))
+    pickle.dump(model, open(filename, 'wb'))
 
 
 def load_pickle(filename):
 
-    return pickle.load(open(filename, 'r'))
+    return pickle.load(open(filename, 'rb'))
+
+
+# incremented whenever the layout of the binary format changes; other versions are refused
+BINARY_FORMAT_VERSION = 1
+
+
+def save_binary(model, path):
+    """save a model as a directory holding a JSON header and a .npy file for each array
+
+        S is stored column by column (as scipy's CSC), each reaction's participants kept in
+        their original order. alongside S are the bounds, objective and flux of each reaction
+        and the boundary condition of each metabolite; ids, names and notes go in the header.
+
+        the arrays can be memory-mapped by load_binary and load_matrix, such that processes
+        sharing a genome-scale model share a single copy of it"""
+    import json
+    import numpy as np
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    reactions   = model.reactions()
+    metabolites = model.metabolites()
+    row         = dict((m.id, i) for i, m in enumerate(metabolites))
+
+    indptr  = [0]
+    indices = []
+    data    = []
+    for reaction in reactions:
+        for metabolite, stoichiometry in reaction.participants.items():
+            indices.append(row[metabolite.id])
+            data.append(stoichiometry)
+        indptr.append(len(indices))
+
+    def floats(values):
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    arrays = {'S_data':               np.array(data, dtype=float),
+              'S_indices':            np.array(indices, dtype=np.int32),
+              'S_indptr':             np.array(indptr, dtype=np.int32),
+              'lower_bounds':         floats([r.lower_bound for r in reactions]),
+              'upper_bounds':         floats([r.upper_bound for r in reactions]),
+              'default_lower_bounds': floats([r.default_bounds[0] for r in reactions]),
+              'default_upper_bounds': floats([r.default_bounds[1] for r in reactions]),
+              'objective':            floats([r.objective_coefficient for r in reactions]),
+              'flux_values':          floats([r.flux_value for r in reactions]),
+              'reversible':           np.array([bool(r.reversible) for r in reactions], dtype=bool),
+              'boundary':             np.array([m.boundaryCondition for m in metabolites],
+                                               dtype=bool)}
+
+    header = {'format':           'pyabolism',
+              'version':          BINARY_FORMAT_VERSION,
+              'arrays':           sorted(arrays),
+              'id':               model.id,
+              'name':             model.name,
+              'compartments':     [[c.id, c.name, c.outside] for c in model.compartments()],
+              'unit_definitions': [[u.id, [[unit.kind, unit.scale, unit.exponent,
+                                            unit.multiplier, unit.offset] for unit in u.units]]
+                                   for u in model.unit_definitions()],
+              'genes':            [[g.id, g.name, g.expression] for g in model.genes()],
+              'metabolites':      [[m.id, m.name, m.compartment, m.formula, m.charge, m.notes,
+                                    _text(getattr(m, 'raw_notes', ''))] for m in metabolites],
+              'reactions':        [[r.id, r.name, r.notes, [g.id for g in r.genes]]
+                                   for r in reactions]}
+
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+
+    # the header is written last, such that a complete model is one with a header
+    with open(os.path.join(path, 'header.json'), 'w') as f:
+        json.dump(header, f)
+
+
+def _text(string):
+    """a string as text, decoding the bytes given by ElementTree.tostring under python 3"""
+    return string.decode('utf-8') if isinstance(string, bytes) else string
+
+
+def _read_binary(path, mmap_mode='r'):
+    """the header and arrays of a binary model file"""
+    import json
+    import numpy as np
+
+    try:
+        with open(os.path.join(path, 'header.json')) as f:
+            header = json.load(f)
+    except IOError:
+        raise IOError('No binary model found at %s' % path)
+
+    if header.get('format') != 'pyabolism' or header.get('version') != BINARY_FORMAT_VERSION:
+        raise Exception('Binary model %s is format version %s, only version %d can be read'
+                        % (path, header.get('version'), BINARY_FORMAT_VERSION))
+
+    arrays = dict((name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode))
+                  for name in header['arrays'])
+
+    return header, arrays
+
+
+def _binary_S(header, arrays):
+    """docstring for _binary_S"""
+    from scipy import sparse
+
+    return sparse.csc_matrix((arrays['S_data'], arrays['S_indices'], arrays['S_indptr']),
+                             shape=(len(header['metabolites']), len(header['reactions'])),
+                             copy=False)
+
+
+def _load_binary_S(path, mmap_mode='r'):
+    """docstring for _load_binary_S"""
+    return _binary_S(*_read_binary(path, mmap_mode))
+
+
+def load_matrix(path, mmap_mode='r'):
+    """the StoichiometricMatrix of a binary model file, with no MetaModel
+
+        with the default mmap_mode='r', the arrays are mapped read-only from the files rather
+        than read into memory, and the matrix is passed to worker processes by its path"""
+    return _binary_matrix(path, mmap_mode, *_read_binary(path, mmap_mode))
+
+
+def _binary_matrix(path, mmap_mode, header, arrays):
+    """docstring for _binary_matrix"""
+    from .model import StoichiometricMatrix
+
+    matrix = StoichiometricMatrix.from_arrays(_binary_S(header, arrays),
+                                              [r[0] for r in header['reactions']],
+                                              [m[0] for m in header['metabolites']],
+                                              arrays['boundary'],
+                                              arrays['reversible'],
+                                              arrays['lower_bounds'],
+                                              arrays['upper_bounds'],
+                                              arrays['objective'],
+                                              arrays['flux_values'])
+
+    if mmap_mode is not None:
+        matrix.path = path
+
+    return matrix
+
+
+def load_binary(path, mmap_mode='r'):
+    """load a model saved by save_binary
+
+        the compiled matrix of the model (see MetaModel.matrix) is that of the file,
+        its S memory-mapped where mmap_mode is given"""
+    from .model import Gene
+
+    header, arrays = _read_binary(path, mmap_mode)
+
+    model = MetaModel(id=header['id'])
+    model.name = header['name']
+
+    for (cid, name, outside) in header['compartments']:
+        model.compartment.add(Compartment(cid, name=name, outside=outside))
+
+    for (uid, units) in header['unit_definitions']:
+        unit_definition = UnitDefinition(uid)
+        for (kind, scale, exponent, multiplier, offset) in units:
+            unit_definition.units.append(Unit(kind, scale=scale, exponent=exponent,
+                                              multiplier=multiplier, offset=offset))
+        model.unit_definition[uid] = unit_definition
+
+    for (gid, name, expression) in header['genes']:
+        model.gene.add(Gene(gid, name=name, expression=expression))
+
+    metabolites = []
+    for i, (mid, name, compartment, formula, charge, notes, raw_notes) \
+            in enumerate(header['metabolites']):
+        metabolite = Metabolite(mid, name=name, compartment=compartment, formula=formula,
+                                charge=charge, boundaryCondition=bool(arrays['boundary'][i]))
+        metabolite.notes     = notes
+        metabolite.raw_notes = raw_notes
+        model.metabolite.add(metabolite)
+        metabolites.append(metabolite)
+
+    def value(array, j):
+        v = float(array[j])
+        return None if v != v else v
+
+    data    = arrays['S_data']
+    indices = arrays['S_indices']
+    indptr  = arrays['S_indptr']
+
+    for j, (rid, name, notes, gene_ids) in enumerate(header['reactions']):
+
+        reaction = Reaction(rid, name=name, reversible=bool(arrays['reversible'][j]))
+
+        reaction.lower_bound           = value(arrays['lower_bounds'], j)
+        reaction.upper_bound           = value(arrays['upper_bounds'], j)
+        reaction.default_bounds        = (value(arrays['default_lower_bounds'], j),
+                                          value(arrays['default_upper_bounds'], j))
+        reaction.objective_coefficient = value(arrays['objective'], j)
+        reaction.flux_value            = value(arrays['flux_values'], j)
+        reaction.notes                 = notes
+        reaction.genes                 = [model.gene[gid] if gid in model.gene else Gene(gid)
+                                          for gid in gene_ids]
+
+        for k in range(indptr[j], indptr[j + 1]):
+            reaction.add_participant(metabolites[indices[k]], float(data[k]))
+
+        model.reaction.add(reaction)
+
+    # the matrix of the file is adopted by the model, to save compiling another
+    model._matrix = _binary_matrix(path, mmap_mode, header, arrays)
+    model._matrix.version = model._structure_version()
+    model._matrix.update(model)
+
+    return model
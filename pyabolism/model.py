@@ -1,5 +1,31 @@
 import sys
+from array import array
 from collections import OrderedDict
+from contextlib import contextmanager
+from copy import copy
+
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:
+    from collections import Mapping, MutableMapping
+
+import numpy as np
+
+from .tools import GPR_genes
+
+try:
+    _interned = sys.intern
+except AttributeError:
+    _interned = intern  # NOQA
+
+
+def _intern(string):
+    """the one shared copy of an id string, such that ids repeated across a model
+        (and the models loaded in a session) are held once"""
+    try:
+        return _interned(string)
+    except TypeError:
+        return string
 
 
 class Unit(object):
@@ -46,19 +72,258 @@ class Compartment(object):
         return self.name
 
 
-class Metabolite(object):
+class _Changes(object):
+    """counts of the changes made to the elements of a model, shared by its reactions and
+        metabolites, by which the indexes and matrix made from them are known to be stale:
+        participants added to or removed from its reactions, stoichiometries changed in place,
+        and changes to the compartments and boundary conditions of its metabolites"""
+    def __init__(self):
+        self.participants = 0
+        self.coefficients = 0
+        self.metabolites  = 0
+
+
+class _Coefficients(MutableMapping):
+    """an ordered mapping of keys (the metabolites of a reaction, or the reaction ids of a
+        metabolite) onto stoichiometric coefficients, kept as a list and an array of floats
+
+        it holds the participants and participations of a model in a fraction of the memory
+        of an OrderedDict. keys are found by searching the list, which is quick for the few
+        participants of a reaction; the positions of the keys of longer mappings (such as the
+        participations of protons or ATP) are indexed in a dict, made on first use
+
+        the participants of the reactions of a model count their changes in the _Changes of
+        the model, set as _changes when the reaction is added"""
+    __slots__ = ('_keys', '_values', '_index', '_holes', '_changes')
+
+    # the length beyond which the positions of the keys are indexed
+    indexed = 32
+
+    def __init__(self, items=()):
+        self._index   = None
+        self._holes   = 0
+        self._changes = None
+
+        if not items:
+            self._keys   = []
+            self._values = array('d')
+            return
+
+        items = list(items.items() if hasattr(items, 'items') else items)
+        keys  = [key for (key, _) in items]
+
+        if len(set(keys)) == len(keys):
+            self._keys   = keys
+            self._values = array('d', [value for (_, value) in items])
+        else:
+            # repeated keys take the last of their values, as in a dict
+            self._keys   = []
+            self._values = array('d')
+            for key, value in items:
+                self[key] = value
+
+    def _find(self, key):
+        """the position of a key, or -1"""
+        if self._index is None:
+            if len(self._keys) < self.indexed:
+                return self._keys.index(key) if key in self._keys else -1
+            self._index = dict((k, i) for (i, k) in enumerate(self._keys))
+        return self._index.get(key, -1)
+
+    def __getitem__(self, key):
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._values[index]
+
+    def __setitem__(self, key, value):
+        keys = self._keys
+        if self._index is None and len(keys) < self.indexed:
+            # the common case of a short mapping, searched here to save a call of _find
+            index = keys.index(key) if key in keys else -1
+        else:
+            index = self._find(key)
+        if index < 0:
+            self._keys.append(key)
+            self._values.append(value)
+            if self._index is not None:
+                self._index[key] = len(self._keys) - 1
+            if self._changes is not None:
+                self._changes.participants += 1
+        else:
+            self._values[index] = value
+            if self._changes is not None:
+                self._changes.coefficients += 1
+
+    def __delitem__(self, key):
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        if self._changes is not None:
+            self._changes.participants += 1
+        if self._index is None:
+            del self._keys[index]
+            del self._values[index]
+            return
+        # indexed mappings leave a hole in place of the key, such that the positions of the
+        # others hold. the holes are removed together, once they are half of the mapping or
+        # when it is next iterated
+        del self._index[key]
+        self._keys[index] = _hole
+        self._holes      += 1
+        if 2 * self._holes > len(self._keys):
+            self._compact()
+
+    def _compact(self):
+        """remove the holes left by deleted keys, the positions being indexed afresh when
+            next needed"""
+        if self._holes:
+            kept = [i for (i, key) in enumerate(self._keys) if key is not _hole]
+            self._keys   = [self._keys[i] for i in kept]
+            self._values = array('d', [self._values[i] for i in kept])
+            self._index  = None
+            self._holes  = 0
+
+    def __iter__(self):
+        self._compact()
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys) - self._holes
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        if len(other) != len(self):
+            return False
+        missing = object()
+        return all(other.get(key, missing) == value for key, value in self.items())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (self.__class__, (self.items(),), (None, {'_changes': self._changes}))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.items())
+
+    def keys(self):
+        """docstring for keys"""
+        self._compact()
+        return list(self._keys)
+
+    def values(self):
+        """docstring for values"""
+        self._compact()
+        return self._values.tolist()
+
+    def items(self):
+        """docstring for items"""
+        self._compact()
+        return list(zip(self._keys, self._values.tolist()))
+
+    def clear(self):
+        """docstring for clear"""
+        if self._changes is not None:
+            self._changes.participants += 1
+        del self._keys[:]
+        del self._values[:]
+        self._index = None
+        self._holes = 0
+
+    def copy(self):
+        """docstring for copy"""
+        self._compact()
+        duplicate = self.__class__()
+        duplicate._keys   = list(self._keys)
+        duplicate._values = array('d', self._values)
+        return duplicate
+
+
+# the place of a key deleted from an indexed _Coefficients
+_hole = object()
+
+
+class _Element(object):
+    """the base of Metabolite, Reaction and Gene, which keep their attributes in __slots__
+        rather than a __dict__ of their own, such that large models take little memory
+
+        other attributes may be set as ever, being held in a __dict__ made for the element
+        when first needed. notes are made on first use, and are otherwise None"""
+    __slots__ = ('_notes', '__dict__')
+
+    @property
+    def notes(self):
+        """docstring for notes"""
+        if self._notes is None:
+            self._notes = {}
+        return self._notes
+
+    @notes.setter
+    def notes(self, notes):
+        self._notes = notes
+
+    def __getstate__(self):
+        state = dict((name, getattr(self, name)) for name in _slot_names(self.__class__)
+                     if hasattr(self, name))
+        attributes = _attributes(self)
+        if attributes:
+            state.update(attributes)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class Metabolite(_Element):
     """docstring for Metabolite"""
+    __slots__ = ('id', 'name', 'readable', '_compartment', 'formula', 'charge',
+                 '_boundaryCondition', 'participations', 'lp_constr', 'raw_notes', 'shadow',
+                 '_changes')
+
     def __init__(self, arg, **kwargs):
-        self.id                 = arg
+        self.id                 = _intern(arg)
         self.name               = kwargs.get('name', self.id)
         self.readable           = ''
-        self.compartment        = kwargs.get('compartment', None)
+        self._compartment       = _intern(kwargs.get('compartment', None))
         self.formula            = kwargs.get('formula', None)
         self.charge             = kwargs.get('charge', None)
-        self.boundaryCondition  = kwargs.get('boundaryCondition', False)
-        self.participations     = OrderedDict()
-        self.notes              = {}
+        self._boundaryCondition = kwargs.get('boundaryCondition', False)
+        self.participations     = _Coefficients()
+        self._notes             = None
         self.lp_constr          = None
+        # the _Changes of the model holding the metabolite
+        self._changes           = None
+
+    @property
+    def compartment(self):
+        """docstring for compartment"""
+        return self._compartment
+
+    @compartment.setter
+    def compartment(self, compartment):
+        if self._changes is not None:
+            self._changes.metabolites += 1
+        self._compartment = _intern(compartment)
+
+    @property
+    def boundaryCondition(self):
+        """docstring for boundaryCondition"""
+        return self._boundaryCondition
+
+    @boundaryCondition.setter
+    def boundaryCondition(self, boundaryCondition):
+        if self._changes is not None:
+            self._changes.metabolites += 1
+        self._boundaryCondition = boundaryCondition
 
     def __str__(self):
         return self.id
@@ -67,19 +332,23 @@ class Metabolite(object):
         return self.id
 
 
-class Reaction(object):
+class Reaction(_Element):
     """docstring for Reaction"""
+    __slots__ = ('id', 'name', 'reversible', 'participants', 'lower_bound', 'upper_bound',
+                 'default_bounds', 'objective_coefficient', 'flux_value', 'genes', 'lp_var',
+                 'loaded_flux', 'reduced_cost', 'flux_range', 'category')
+
     def __init__(self, arg, **kwargs):
-        self.id                     = arg
+        self.id                     = _intern(arg)
         self.name                   = kwargs.get('name', self.id)
         self.reversible             = kwargs.get('reversible', None)
-        self.participants           = OrderedDict()
+        self.participants           = _Coefficients()
         self.lower_bound            = -1e4
         self.upper_bound            = 1e4
         self.default_bounds         = (self.lower_bound, self.upper_bound)
         self.objective_coefficient  = 0.0
         self.flux_value             = None
-        self.notes                  = {}
+        self._notes                 = None
         self.genes                  = []
         self.lp_var                 = None
 
@@ -127,12 +396,15 @@ class Reaction(object):
         self.upper_bound = self.default_bounds[1]
 
 
-class Gene(object):
+class Gene(_Element):
     """docstring for Gene"""
+    __slots__ = ('id', 'name', 'expression')
+
     def __init__(self, arg, **kwargs):
-        self.id         = arg
+        self.id         = _intern(arg)
         self.name       = kwargs.get('name', '')
         self.expression = kwargs.get('expression', 1)
+        self._notes     = None
 
     def __str__(self):
         return str(self.expression > 0)
@@ -161,35 +433,102 @@ class _MetaboliteDict(OrderedDict):
     """docstring for Metabolites"""
     def __init__(self, *arg, **kwargs):
         super(_MetaboliteDict, self).__init__(*arg, **kwargs)
+        # incremented on every add/remove, so that compiled matrices can detect they are stale
+        self.version = 0
+        # the changes made to the metabolites added, shared with the reactions of the model
+        self.changes = _Changes()
+        # the metabolites by compartment and boundary condition, made on first use by index()
+        self._index = None
 
     def add(self, metabolite):
         """docstring for _add_metabolite"""
         if metabolite.id in self:
             raise Exception('Error! The metabolite id %s already exists!' % metabolite.id)
         self[metabolite.id] = metabolite
+        metabolite._changes = self.changes
+        self.version += 1
+        if self._index is not None:
+            self._index.add(metabolite)
 
     def remove(self, metabolite):
         """docstring for remove"""
         self.pop(metabolite.id)
+        metabolite._changes = None
+        self.version += 1
+        if self._index is not None:
+            self._index.remove(metabolite)
+
+    def index(self):
+        """the _MetaboliteIndex of the metabolites, made on first use, kept up to date by add
+            and remove, and made afresh after changes to the metabolites themselves"""
+        if self._index is None or self._index.size != len(self) \
+                or self._index.changes != self.changes.metabolites:
+            self._index = _MetaboliteIndex(self.values())
+            self._index.changes = self.changes.metabolites
+        return self._index
+
+    def get_by_compartment(self, compartment):
+        """the metabolites of a compartment (or compartment id)"""
+        return list(self.index().compartment.get(getattr(compartment, 'id', compartment), []))
+
+    def get_boundary(self):
+        """the metabolites with boundaryCondition set"""
+        return list(self.index().boundary)
 
 
 class _ReactionDict(OrderedDict):
     """docstring for Reactions"""
     def __init__(self, *arg, **kwargs):
         super(_ReactionDict, self).__init__(*arg, **kwargs)
+        # incremented on every add/remove, so that compiled matrices can detect they are stale
+        self.version = 0
+        # the changes made to the participants of the reactions added, and to the metabolites
+        # of the model (the _Changes of its _MetaboliteDict, once linked by the MetaModel)
+        self.changes = _Changes()
+        # the reactions by compartment and class, made on first use by index()
+        self._index = None
+        # the _GeneDict of the model, whose gene incidence follows the reactions added and removed
+        self.gene_dict = None
 
     def add(self, reaction):
         """docstring for _add_metabolite"""
         if reaction.id in self:
             raise Exception('Error! That reaction id %s already exists!' % reaction.id)
         self[reaction.id] = reaction
-        for metabolite in reaction.participants:
-            metabolite.participations[reaction.id] = reaction.participants[metabolite]
+        for metabolite, stoichiometry in reaction.participants.items():
+            metabolite.participations[reaction.id] = stoichiometry
+        _attach(reaction, self.changes)
+        self.version += 1
+        if self._index is not None and self._index.changes == self._changes():
+            self._index.add(reaction)
+        if self.gene_dict is not None and self.gene_dict._incidence is not None:
+            self.gene_dict._incidence.add(reaction)
 
     def remove(self, reaction):
         """docstring for remove"""
+        # the reaction is found in the index by its participants, so is removed first
+        if self._index is not None and self._index.changes == self._changes():
+            self._index.remove(reaction)
+        if self.gene_dict is not None and self.gene_dict._incidence is not None:
+            self.gene_dict._incidence.remove(reaction)
+        # the participants of a reaction leaving the model no longer count as its changes
+        _attach(reaction, None)
         reaction.clear_participants()
         self.pop(reaction.id)
+        self.version += 1
+
+    def index(self):
+        """the _ReactionIndex of the reactions, made on first use, kept up to date by add and
+            remove, and made afresh after changes to participants or their metabolites"""
+        changes = self._changes()
+        if self._index is None or self._index.size != len(self) or self._index.changes != changes:
+            self._index = _ReactionIndex(self.values())
+            self._index.changes = changes
+        return self._index
+
+    def _changes(self):
+        """the counts of the changes on which the index depends"""
+        return (self.changes.participants, self.changes.metabolites)
 
     def get_by_contains(self, metabolite):
         """docstring for contains"""
@@ -197,19 +536,125 @@ class _ReactionDict(OrderedDict):
 
     def get_by_consumes(self, metabolite):
         """docstring for contains"""
-        return [self[r_id] for r_id in metabolite.participations
-                if metabolite.participations[r_id] < 0]
+        return [self[r_id] for (r_id, s) in metabolite.participations.items() if s < 0]
 
     def get_by_produces(self, metabolite):
         """docstring for contains"""
-        return [self[r_id] for r_id in metabolite.participations
-                if metabolite.participations[r_id] > 0]
+        return [self[r_id] for (r_id, s) in metabolite.participations.items() if s > 0]
+
+    def get_by_compartment(self, compartment):
+        """the reactions with participants in a compartment (or compartment id)"""
+        return list(self.index().compartment.get(getattr(compartment, 'id', compartment), []))
+
+    def get_by_gene(self, gene):
+        """the reactions whose GPR names a gene (or gene id)"""
+        if self.gene_dict is not None:
+            incidence = self.gene_dict.incidence(self)
+        else:
+            incidence = _GeneIncidence(self.values())
+        return [self[rid] for rid in incidence.genes.get(getattr(gene, 'id', gene), [])]
+
+    def get_exchanges(self):
+        """the exchange reactions: those with a boundary metabolite, or a single participant"""
+        return list(self.index().exchange)
+
+    def get_transports(self):
+        """the transport reactions: those moving metabolites between compartments e and c"""
+        return list(self.index().transport)
+
+
+class _MetaboliteIndex(object):
+    """the metabolites of a _MetaboliteDict by compartment, and those on the boundary,
+        as lists in the order in which they were added"""
+    def __init__(self, metabolites=()):
+        self.compartment = {}
+        self.boundary    = []
+        self.size        = 0
+        for metabolite in metabolites:
+            self.add(metabolite)
+        self.changes     = None
+
+    def add(self, metabolite):
+        """docstring for add"""
+        self.compartment.setdefault(metabolite.compartment, []).append(metabolite)
+        if metabolite.boundaryCondition:
+            self.boundary.append(metabolite)
+        self.size += 1
+
+    def remove(self, metabolite):
+        """docstring for remove"""
+        _discard(self.compartment.get(metabolite.compartment, []), metabolite)
+        _discard(self.boundary, metabolite)
+        self.size -= 1
+
+
+class _ReactionIndex(object):
+    """the reactions of a _ReactionDict by the compartments of their participants, and those
+        that are exchanges or transports, as lists in the order in which they were added, such
+        that each may be found without a search of every reaction (the reactions of each gene
+        are kept by the _GeneIncidence of the model)
+
+        changes holds the counts of changes (to the participants of the reactions, and to the
+        compartments and boundary conditions of metabolites, see _Changes) up to which the
+        index is known to be current. the index is made afresh once they have changed"""
+    def __init__(self, reactions=()):
+        self.compartment = {}
+        self.exchange    = []
+        self.transport   = []
+        self.size        = 0
+        for reaction in reactions:
+            self.add(reaction)
+        self.changes     = None
+
+    def add(self, reaction):
+        """docstring for add"""
+        for elements in self._lists(reaction):
+            elements.append(reaction)
+        self.size += 1
+
+    def remove(self, reaction):
+        """docstring for remove"""
+        for elements in self._lists(reaction):
+            _discard(elements, reaction)
+        self.size -= 1
+
+    def _lists(self, reaction):
+        """the lists in which a reaction is indexed"""
+
+        compartments = set([m.compartment for m in reaction.participants])
+
+        lists = [self.compartment.setdefault(c, []) for c in compartments]
+
+        if len(reaction.participants) == 1 or \
+                [m for m in reaction.participants if m.boundaryCondition]:
+            lists.append(self.exchange)
+        if compartments == set(['e', 'c']):
+            lists.append(self.transport)
+
+        return lists
+
+
+def _attach(reaction, changes):
+    """count the changes to the participants of a reaction in the _Changes of a model (or
+        no longer, with None)"""
+    if isinstance(reaction.participants, _Coefficients):
+        reaction.participants._changes = changes
+
+
+def _discard(elements, element):
+    """remove an element from a list, if it is there"""
+    try:
+        elements.remove(element)
+    except ValueError:
+        pass
 
 
 class _GeneDict(OrderedDict):
     """docstring for Genes"""
     def __init__(self, *arg, **kwargs):
         super(_GeneDict, self).__init__(*arg, **kwargs)
+        # the genes named by the GPR of each reaction, made on first use by incidence()
+        self._incidence = None
 
     def add(self, gene):
         """docstring for add"""
@@ -221,6 +666,97 @@ class _GeneDict(OrderedDict):
         """docstring for remove"""
         self.pop(gene.id)
 
+    def incidence(self, reactions):
+        """the _GeneIncidence of the reactions of the model (a _ReactionDict), made from them
+            on first use, kept up to date as reactions are added and removed, and made afresh
+            once the GPR of any reaction has changed"""
+        if self._incidence is None or not self._incidence.current(reactions):
+            self._incidence = _GeneIncidence(reactions.values())
+        return self._incidence
+
+
+class _GeneIncidence(object):
+    """the ids of the genes named by the GPR (GENE_ASSOCIATION) of each reaction, and the
+        ids of the reactions naming each gene, both in order of appearance, such that either
+        may be found for a few genes or reactions without a search of every GPR. genes is
+        keyed on gene id, and reactions on reaction id
+
+        matrix() gives the same incidence as a sparse matrix of genes by reactions. the GPR
+        strings read are kept in gene_associations, by which current() finds whether any have
+        changed since, as compile_GPRs does"""
+    def __init__(self, reactions=()):
+        self.genes     = OrderedDict()
+        self.reactions = OrderedDict()
+
+        self.gene_associations = {}
+        # incremented on every add/remove, so that matrices made by matrix() can be reused
+        self.version   = 0
+        self._matrix   = None
+        for reaction in reactions:
+            self.add(reaction)
+
+    def add(self, reaction):
+        """docstring for add"""
+        gene_association = _gene_association(reaction)
+        gene_ids = [_intern(gid) for gid in GPR_genes(gene_association)]
+        self.reactions[reaction.id]         = gene_ids
+        self.gene_associations[reaction.id] = gene_association
+        for gid in gene_ids:
+            self.genes.setdefault(gid, []).append(reaction.id)
+        self.version += 1
+
+    def remove(self, reaction):
+        """docstring for remove"""
+        self.gene_associations.pop(reaction.id, None)
+        for gid in self.reactions.pop(reaction.id, []):
+            reaction_ids = self.genes[gid]
+            reaction_ids.remove(reaction.id)
+            if not reaction_ids:
+                del self.genes[gid]
+        self.version += 1
+
+    def current(self, reactions):
+        """whether the incidence is of the reactions given (a _ReactionDict), with the GPRs
+            they have now"""
+        gene_associations = self.gene_associations
+        if len(gene_associations) != len(reactions):
+            return False
+        missing = object()
+        return all(gene_associations.get(rid, missing) == _gene_association(reaction)
+                   for rid, reaction in reactions.items())
+
+    def matrix(self, reaction_ids):
+        """a sparse (csr) matrix of ones, one row per gene (in the order of self.genes) and one
+            column per reaction id given, marking the genes named by the GPR of each reaction"""
+        from scipy import sparse
+
+        reaction_ids = list(reaction_ids)
+
+        if self._matrix is not None and self._matrix[0] == (self.version, reaction_ids):
+            return self._matrix[1]
+
+        gene_index = dict((gid, i) for (i, gid) in enumerate(self.genes))
+
+        rows = []
+        cols = []
+        for j, rid in enumerate(reaction_ids):
+            for gid in self.reactions.get(rid, []):
+                rows.append(gene_index[gid])
+                cols.append(j)
+
+        matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                   shape=(len(gene_index), len(reaction_ids)))
+
+        self._matrix = ((self.version, reaction_ids), matrix)
+
+        return matrix
+
+
+def _gene_association(reaction):
+    """the GPR string of a reaction, without making notes for reactions that have none"""
+    notes = reaction._notes
+    return notes.get('GENE_ASSOCIATION', '') if notes else ''
+
 
 class MetaModel(object):
     """docstring for MetaModel"""
@@ -232,23 +768,321 @@ class MetaModel(object):
         self.compartment     = kwargs.get('compartments', _CompartmentDict())
         self.gene            = kwargs.get('genes', _GeneDict())
         self.unit_definition = kwargs.get('unit_definitions', OrderedDict())
+        self._matrix         = None
+
+        if isinstance(self.reaction, _ReactionDict):
+            self.reaction.gene_dict = self.gene
+            if isinstance(self.metabolite, _MetaboliteDict):
+                _share_changes(self.reaction, self.metabolite.changes)
 
     def metabolites(self):
         """docstring for metabolites"""
-        return self.metabolite.values()
+        return list(self.metabolite.values())
 
     def reactions(self):
         """docstring for metabolites"""
-        return self.reaction.values()
+        return list(self.reaction.values())
 
     def compartments(self):
         """docstring for metabolites"""
-        return self.compartment.values()
+        return list(self.compartment.values())
 
     def genes(self):
         """docstring for metabolites"""
-        return self.gene.values()
+        return list(self.gene.values())
+
+    def gene_incidence(self):
+        """the _GeneIncidence of the model: the genes named by the GPR of each reaction, and
+            the reactions naming each gene, with matrix() giving the same as a sparse matrix"""
+        return self.gene.incidence(self.reaction)
 
     def unit_definitions(self):
         """docstring for unit_definitions"""
-        return self.unit_definition.values()
+        return list(self.unit_definition.values())
+
+    def copy(self):
+        """a copy of the model that may be altered independently of the original (its bounds,
+            objective, participants and the set of its reactions and metabolites), made without
+            the expense of deepcopy
+
+            only the objects of the model and the links between them are duplicated, along
+            with a shallow copy of the notes of each reaction, metabolite and gene. names and
+            their other attributes are shared with the original, as are compartments, unit
+            definitions and the compiled structure of the matrix, and so should be replaced
+            rather than altered in place. the copy has no LP until one is built"""
+
+        model = MetaModel.__new__(MetaModel)
+        model.__dict__.update(self.__dict__)
+
+        for attribute in ['lp', 'lp_session', 'lp_columns', 'lp_rows']:
+            model.__dict__.pop(attribute, None)
+
+        model.gene = _GeneDict()
+        for gid, gene in self.gene.items():
+            model.gene[gid] = _shallow_copy(gene)
+
+        # the copy counts its own changes, from those of the original, such that their
+        # indexes and matrices are each made stale only by changes to their own elements
+        changes = copy(self.metabolite.changes)
+
+        model.metabolite = _MetaboliteDict()
+        model.metabolite.changes = changes
+        for mid, metabolite in self.metabolite.items():
+            metabolite                = _shallow_copy(metabolite)
+            metabolite.participations = metabolite.participations.copy()
+            metabolite.lp_constr      = None
+            metabolite._changes       = changes
+            model.metabolite[mid]     = metabolite
+
+        model.reaction = _ReactionDict()
+        model.reaction.changes = changes
+        for rid, reaction in self.reaction.items():
+            reaction              = _shallow_copy(reaction)
+            reaction.participants = _Coefficients([(model.metabolite[m.id], stoichiometry)
+                                                   for m, stoichiometry
+                                                   in reaction.participants.items()])
+            reaction.participants._changes = changes
+            reaction.genes        = [model.gene.get(g.id, g) for g in reaction.genes]
+            reaction.lp_var       = None
+            model.reaction[rid] = reaction
+
+        model.reaction.gene_dict = model.gene
+
+        model.compartment     = _CompartmentDict(self.compartment)
+        model.unit_definition = OrderedDict(self.unit_definition)
+
+        # the copy has the same structure as the original, so its compiled matrix is shared;
+        # the bounds and objective are refreshed from the copy on every call of matrix()
+        model.metabolite.version = self.metabolite.version
+        model.reaction.version   = self.reaction.version
+
+        matrix = getattr(self, '_matrix', None)
+        if matrix is not None and matrix.version == self._structure_version():
+            model._matrix = copy(matrix)
+        else:
+            model._matrix = None
+
+        return model
+
+    def reindex(self):
+        """discard the indexes of the reactions, metabolites and genes (see _ReactionIndex and
+            _GeneIncidence), to be made afresh when next used. they follow changes made through
+            reactions and metabolites, so this is needed only where those are bypassed (as by
+            replacing the participants of a reaction already in the model)"""
+        self.reaction._index   = None
+        self.metabolite._index = None
+        self.gene._incidence   = None
+
+    @contextmanager
+    def temporary_changes(self, bounds=None):
+        """a context on leaving which the bounds and objective coefficients of the reactions
+            are restored, undoing any changes made within it. bounds may give new
+            (lower_bound, upper_bound) pairs for reactions (or reaction ids) on entering:
+
+                with model.temporary_changes({'R_EX_glc_e_': (-5.0, 0.0)}):
+                    FBA(model)
+
+            reactions added within the context are left in place"""
+
+        reactions = self.reactions()
+        saved     = [(r.lower_bound, r.upper_bound, r.objective_coefficient) for r in reactions]
+
+        try:
+            for reaction, (lower_bound, upper_bound) in (bounds or {}).items():
+                reaction = self.reaction[getattr(reaction, 'id', reaction)]
+                reaction.lower_bound = lower_bound
+                reaction.upper_bound = upper_bound
+
+            yield self
+
+        finally:
+            for reaction, (lower_bound, upper_bound, coefficient) in zip(reactions, saved):
+                reaction.lower_bound           = lower_bound
+                reaction.upper_bound           = upper_bound
+                reaction.objective_coefficient = coefficient
+
+    def matrix(self, recompile=False):
+        """return the StoichiometricMatrix of the model, compiling it on first use
+
+            the compiled structure is reused for as long as no reactions or metabolites are
+            added or removed, and the participants of the reactions and the boundary conditions
+            of the metabolites are unchanged (see _Changes), while bounds, objective and fluxes
+            are refreshed on every call. recompile=True is needed only where those changes are
+            bypassed, as by replacing the participants of a reaction already in the model"""
+
+        matrix = getattr(self, '_matrix', None)
+
+        if recompile or matrix is None or matrix.version != self._structure_version():
+            matrix = StoichiometricMatrix(self)
+            self._matrix = matrix
+        else:
+            matrix.update(self)
+
+        return matrix
+
+    def _element_version(self):
+        """the version of the sets of reactions and metabolites of the model"""
+        return (getattr(self.reaction, 'version', None), getattr(self.metabolite, 'version', None),
+                len(self.reaction), len(self.metabolite))
+
+    def _structure_version(self):
+        """the version of the compiled structure of the model: its elements, the participants
+            of its reactions and the boundary conditions of its metabolites"""
+        changes = getattr(self.reaction, 'changes', None)
+        if changes is None:
+            return self._element_version()
+        return self._element_version() + (changes.participants, changes.coefficients,
+                                          changes.metabolites)
+
+
+def _share_changes(reactions, changes):
+    """count the changes to a _ReactionDict in the _Changes of the metabolites of its model"""
+    if reactions.changes is not changes:
+        reactions.changes = changes
+        reactions._index  = None
+        for reaction in reactions.values():
+            _attach(reaction, changes)
+
+
+def _shallow_copy(element):
+    """a copy of an element sharing its attributes but for a shallow copy of its notes, made
+        more cheaply than by copy.copy"""
+    duplicate = element.__class__.__new__(element.__class__)
+    for name in _slot_names(element.__class__):
+        value = getattr(element, name, _unset)
+        if value is not _unset:
+            setattr(duplicate, name, value)
+    attributes = _attributes(element)
+    if attributes:
+        duplicate.__dict__.update(attributes)
+    if duplicate._notes is not None:
+        duplicate._notes = duplicate._notes.copy()
+    return duplicate
+
+
+def _attributes(element):
+    """the __dict__ of an element, or None where it has none. reading __dict__ makes an empty
+        one for the element, which is dropped again so that it keeps to its slots"""
+    attributes = element.__dict__
+    if not attributes:
+        del element.__dict__
+        return None
+    return attributes
+
+
+_slots = {}
+_unset = object()
+
+
+def _slot_names(cls):
+    """the names of the slots of a class and its bases, other than __dict__"""
+    names = _slots.get(cls)
+    if names is None:
+        names = [n for c in cls.__mro__ for n in getattr(c, '__slots__', ()) if n != '__dict__']
+        _slots[cls] = names
+    return names
+
+
+class StoichiometricMatrix(object):
+    """sparse array representation of a MetaModel
+
+        S has one row per metabolite and one column per reaction, in the order in which they
+        appear in the model. reaction_index and metabolite_index map ids onto rows and columns.
+
+        a matrix read from a binary model file (see io.load_matrix) holds S memory-mapped from
+        that file; such a matrix is pickled by its path, so that each process receiving it
+        maps the file rather than being sent a copy of S. the matrices of models read from the
+        model cache (see io.uncache_model) are pickled by value, as the cache may be evicted."""
+    def __init__(self, model):
+        from scipy import sparse
+
+        self.version          = model._structure_version()
+        self.path             = None
+
+        self.reaction_ids     = [r.id for r in model.reactions()]
+        self.metabolite_ids   = [m.id for m in model.metabolites()]
+        self.reaction_index   = dict((rid, j) for j, rid in enumerate(self.reaction_ids))
+        self.metabolite_index = dict((mid, i) for i, mid in enumerate(self.metabolite_ids))
+
+        rows   = []
+        cols   = []
+        values = []
+        for j, reaction in enumerate(model.reactions()):
+            for metabolite, stoichiometry in reaction.participants.items():
+                rows.append(self.metabolite_index[metabolite.id])
+                cols.append(j)
+                values.append(stoichiometry)
+
+        self.S = sparse.csr_matrix((np.array(values, dtype=float), (rows, cols)),
+                                   shape=(len(self.metabolite_ids), len(self.reaction_ids)))
+
+        self.boundary   = np.array([m.boundaryCondition for m in model.metabolites()], dtype=bool)
+        self.reversible = np.array([bool(r.reversible) for r in model.reactions()], dtype=bool)
+
+        self.update(model)
+
+    @classmethod
+    def from_arrays(cls, S, reaction_ids, metabolite_ids, boundary, reversible,
+                    lower_bounds, upper_bounds, objective, flux_values=None, version=None):
+        """a matrix made directly from its arrays, without a MetaModel"""
+
+        matrix = cls.__new__(cls)
+
+        matrix.version          = version
+        matrix.path             = None
+        matrix.reaction_ids     = list(reaction_ids)
+        matrix.metabolite_ids   = list(metabolite_ids)
+        matrix.reaction_index   = dict((rid, j) for j, rid in enumerate(matrix.reaction_ids))
+        matrix.metabolite_index = dict((mid, i) for i, mid in enumerate(matrix.metabolite_ids))
+
+        matrix.S            = S
+        matrix.boundary     = boundary
+        matrix.reversible   = reversible
+        matrix.lower_bounds = lower_bounds
+        matrix.upper_bounds = upper_bounds
+        matrix.objective    = objective
+
+        if flux_values is None:
+            flux_values = np.nan * np.ones(len(matrix.reaction_ids))
+        matrix.flux_values = flux_values
+
+        return matrix
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if state.get('path') is not None:
+            state['S'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.S is None:
+            from .io import _load_binary_S
+            self.S = _load_binary_S(self.path)
+
+    def update(self, model):
+        """refresh the bound, objective and flux arrays from the reactions of the model"""
+        reactions = list(model.reactions())
+
+        self.lower_bounds = np.array([r.lower_bound for r in reactions], dtype=float)
+        self.upper_bounds = np.array([r.upper_bound for r in reactions], dtype=float)
+        self.objective    = np.array([r.objective_coefficient for r in reactions], dtype=float)
+        # reactions that have not yet been simulated have flux_value None, stored as nan
+        self.flux_values  = np.array([r.flux_value for r in reactions], dtype=float)
+
+    @property
+    def shape(self):
+        return self.S.shape
+
+    def constrained(self):
+        """the rows of S subject to the steady-state constraint (non-boundary metabolites)"""
+        return self.S[np.flatnonzero(~self.boundary), :]
+
+    def reaction_indices(self, reactions):
+        """column indices for a list of reactions (or reaction ids)"""
+        return np.array([self.reaction_index[getattr(r, 'id', r)] for r in reactions], dtype=int)
+
+    def metabolite_indices(self, metabolites):
+        """row indices for a list of metabolites (or metabolite ids)"""
+        return np.array([self.metabolite_index[getattr(m, 'id', m)] for m in metabolites],
+                        dtype=int)
@@ -2,53 +2,27 @@
 import numpy as np
 
 from .FBA import FBA
+from .LP import build_matrix_lp, add_negative_parts, _lp_lower_bounds
+from .solvers import OPTIMAL, MAXIMIZE, MINIMIZE
 
-from ..tools import get_transport_reactions, get_exchange_reactions, GPR_string2tree
+from ..tools import get_transport_reactions, get_exchange_reactions, compile_GPRs
 
-import networkx as nx
 
+def EFlux(model, expressions, norm='L2', show=False, unlimited_transports=False, solver=None,
+          write_back=True):
+    """implementation of the EF-Flux algorithm (Colijn et al), returning the Solution of FBA
 
-def _get_capacity(gene_association, expressions):
-    """find the upper bound on a reaction with the given gene_association string"""
+        the bounds of the model are limited by the expression data in place, while its
+        fluxes are only stored in the model with write_back (the default)"""
 
-    gprTree = GPR_string2tree(gene_association)
-
-    for node in reversed(nx.topological_sort(gprTree)):
-
-        if gprTree.out_degree(node) == 0:
-            gprTree.node[node]['capacity'] = expressions.get(node, np.infty)
-        else:
-            if gprTree.node[node].get('operation', '') == 'or':
-                gprTree.node[node]['capacity'] = \
-                    sum([gprTree.node[child]['capacity'] for child in gprTree.successors(node)])
-
-            elif gprTree.node[node].get('operation', '') == 'and':
-                gprTree.node[node]['capacity'] = \
-                    min([gprTree.node[child]['capacity'] for child in gprTree.successors(node)])
-
-            else:
-                if len(gprTree.successors(node)) > 1:
-                    raise Exception('missing operation instructions!')
-                gprTree.node[node]['capacity'] = \
-                    [gprTree.node[child]['capacity'] for child in gprTree.successors(node)][0]
-
-    return gprTree.node['root']['capacity']
-
-
-def EFlux(model, expressions, norm='L2', show=False, unlimited_transports=False):
-    """implementation of the EF-Flux algorithm (Colijn et al)"""
-
-    exchanges  = get_exchange_reactions(model)
-    transports = get_transport_reactions(model)
+    exchanges  = set(get_exchange_reactions(model))
+    transports = set(get_transport_reactions(model))
 
     # every reaction gets a maxiumum capacity, dictated by its GPR string
-    capacities = {}
-    for r in model.reactions():
-        gene_association = r.notes.get('GENE_ASSOCIATION', '')
+    # the GPRs are compiled once per model, and evaluated together
+    capacities = compile_GPRs(model).capacities(expressions).tolist()
 
-        capacities[r.id] = _get_capacity(gene_association, expressions)
-
-    for r in model.reactions():
+    for r, capacity in zip(model.reactions(), capacities):
 
         if r in exchanges:
             continue
@@ -56,8 +30,6 @@ def EFlux(model, expressions, norm='L2', show=False, unlimited_transports=False)
         if unlimited_transports and r in transports:
             continue
 
-        capacity = capacities[r.id]
-
         # in order to avoid destroying limits determined by curators of the model
         # we only allow our expression data to constrict existing constraints, not
         # relax them
@@ -71,6 +43,187 @@ def EFlux(model, expressions, norm='L2', show=False, unlimited_transports=False)
             r.lower_bound = -capacity
 
     # our problem can now be solved using the standard FBA algorithm
-    FBA(model, show=show, norm=norm)
+    return FBA(model, show=show, norm=norm, solver=solver, write_back=write_back)
+
+
+def EFlux_batch(model, expressions, genes=None, norm='L2', unlimited_transports=False,
+                processes=1, solver=None):
+    """EFlux for many expression samples, returning an array of samples by reactions
+
+        expressions is an array of samples by genes (with genes naming its columns, and
+        defaulting to the genes of the model's compiled GPRs), a list of dicts, or a pandas
+        DataFrame, for which a DataFrame indexed alike is returned.
+
+        each sample limits the bounds of the model as they stand, which are left untouched.
+        a single LP is reused for every sample, being restored between them, and with
+        processes > 1 the samples are shared between a pool of worker processes.
+        samples for which no optimal solution is found have fluxes of nan"""
+
+    if norm and norm not in ('L1', 'L2'):
+        raise Exception('Unknown norm type...')
+
+    gprs   = compile_GPRs(model)
+    matrix = model.matrix()
+
+    X, index = gprs.samples(expressions, genes)
+
+    # exchanges, and where requested transports, are never limited by expression
+    unlimited = get_exchange_reactions(model)
+    if unlimited_transports:
+        unlimited = unlimited + get_transport_reactions(model)
+    limited = np.ones(len(matrix.reaction_ids), dtype=bool)
+    limited[matrix.reaction_indices(unlimited)] = False
+
+    lower_bounds, upper_bounds = _sample_bounds(matrix, gprs.capacities(X), limited)
+
+    if processes > 1:
+        fluxes = _parallel_sample_fluxes(matrix, lower_bounds, upper_bounds, norm, processes,
+                                         solver)
+    else:
+        lp, columns, negative = _build_sample_lp(matrix, norm, 'EFlux_batch', solver=solver)
+        fluxes = _sample_fluxes(lp, columns, negative, matrix, lower_bounds, upper_bounds, norm)
+
+    if index is not None:
+        import pandas as pd
+        return pd.DataFrame(fluxes, index=index, columns=matrix.reaction_ids)
+
+    return fluxes
+
+
+def _sample_bounds(matrix, capacities, limited):
+    """the LP bounds of every reaction for each sample, given the capacities of each
+        (samples by reactions), as EFlux applies them"""
+
+    lower_bounds = np.tile(_lp_lower_bounds(matrix), (len(capacities), 1))
+    upper_bounds = np.tile(matrix.upper_bounds, (len(capacities), 1))
+
+    # as in EFlux, expression may only constrict the existing bounds, never relax them
+    tighten = limited & (0.0 < capacities) & (capacities < upper_bounds)
+    upper_bounds[tighten] = capacities[tighten]
+
+    tighten = limited & (lower_bounds < -capacities) & (-capacities < 0.0)
+    lower_bounds[tighten] = -capacities[tighten]
+
+    return lower_bounds, upper_bounds
+
+
+def _build_sample_lp(matrix, norm, name, private_env=False, solver=None):
+    """the LP used for every sample, returning it with its columns and, for the L1 norm,
+        the columns of the negative parts of the reversible reactions"""
+
+    lp, columns = build_matrix_lp(matrix, name, private_env=private_env, solver=solver)
+
+    negative = None
+    if norm == 'L1':
+        negative = add_negative_parts(lp, columns[np.flatnonzero(matrix.reversible)])
+
+    return lp, columns, negative
+
+
+def _sample_fluxes(lp, columns, negative, matrix, lower_bounds, upper_bounds, norm):
+    """solve FBA on lp for the bounds of each sample in turn (each row of lower_bounds and
+        upper_bounds), minimising the norm where requested. between samples, only the columns
+        that were altered are restored, so that the solver keeps a warm start"""
+
+    base_lower = _lp_lower_bounds(matrix)
+    base_upper = matrix.upper_bounds
+
+    objectives = np.flatnonzero(matrix.objective)
+
+    objective = np.zeros(lp.num_variables)
+    objective[columns] = matrix.objective
+
+    if norm == 'L1':
+        weights = np.zeros(lp.num_variables)
+        weights[columns]  = 1.0
+        weights[negative] = 2.0
+
+    elif norm == 'L2':
+        weights = np.zeros(lp.num_variables)
+        weights[columns] = 1.0
+
+    fluxes = np.nan * np.ones(lower_bounds.shape)
+
+    touched = np.array([], dtype=int)
+    for k in range(len(lower_bounds)):
+
+        changed = np.flatnonzero((lower_bounds[k] != base_lower) | (upper_bounds[k] != base_upper))
+
+        # the columns altered for the last sample are restored along with those of this sample
+        reset = np.union1d(touched, changed)
+        lp.set_bounds(columns[reset], lower_bounds[k][reset], upper_bounds[k][reset])
+        touched = changed
+
+        if norm:
+            lp.set_objective(linear=objective, sense=MAXIMIZE)
+
+        if lp.solve() != OPTIMAL:
+            continue
+
+        values = lp.primal_values(columns)
+
+        if norm:
+            # the objective is held (almost exactly) at its optimum while the norm is minimised
+            lp.set_bounds(columns[objectives],
+                          values[objectives] * (1. - 1e-12),
+                          np.infty * np.ones(len(objectives)))
+            touched = np.union1d(touched, objectives)
+
+            if norm == 'L1':
+                lp.set_objective(linear=weights, sense=MINIMIZE)
+            else:
+                lp.set_objective(quadratic=weights, sense=MINIMIZE)
+
+            if lp.solve() != OPTIMAL:
+                continue
+
+            values = lp.primal_values(columns)
+
+        fluxes[k] = values
+
+    return fluxes
+
+
+def _parallel_sample_fluxes(matrix, lower_bounds, upper_bounds, norm, processes, solver=None):
+    """docstring for _parallel_sample_fluxes"""
+
+    from multiprocessing import Pool
+
+    n_chunks = max(1, min(len(lower_bounds), 4 * processes))
+    chunks   = [(lower_bounds[c], upper_bounds[c])
+                for c in np.array_split(np.arange(len(lower_bounds)), n_chunks)]
+
+    pool = Pool(processes, initializer=_initialise_worker, initargs=(matrix, norm, solver))
+    try:
+        results = pool.map(_worker_sample_fluxes, chunks)
+    finally:
+        pool.close()
+        pool.join()
+
+    return np.vstack(results)
+
+
+# each worker process holds its own LP, built once by _initialise_worker
+_worker = {}
+
+
+def _initialise_worker(matrix, norm, solver):
+    """docstring for _initialise_worker"""
+
+    lp, columns, negative = _build_sample_lp(matrix, norm, 'EFlux_worker', private_env=True,
+                                             solver=solver)
+
+    _worker['lp']       = lp
+    _worker['columns']  = columns
+    _worker['negative'] = negative
+    _worker['matrix']   = matrix
+    _worker['norm']     = norm
+
+
+def _worker_sample_fluxes(args):
+    """docstring for _worker_sample_fluxes"""
+
+    lower_bounds, upper_bounds = args
 
-    return
+    return _sample_fluxes(_worker['lp'], _worker['columns'], _worker['negative'],
+                          _worker['matrix'], lower_bounds, upper_bounds, _worker['norm'])
@@ -1,125 +1,113 @@
 
-import re
 import numpy as np
 
-from .LP import grb, GRB, generate_basic_lp
-from .simtools import irreversify, deirreversify
+from .LP import get_lp_session
+from .solvers import INFEASIBLE, INFEASIBLE_OR_UNBOUNDED, MINIMIZE
+from .solution import Solution
 
 
-def FBA(model, show=False, norm=''):
-    """builds and solves an FBA linear program,
-       updating the flux_value property of each reaction accordingly"""
+def FBA(model, show=False, norm='', solver=None, write_back=True, fraction=1.0):
+    """builds and solves an FBA linear program, returning a Solution
 
-    # if we are using the L1 norm, we must first convert the model
-    # into undirectional form
-    if norm == 'L1':
-        model = irreversify(model)
+       with write_back (the default), the flux_value property of each reaction (and the shadow
+       of each metabolite) is updated accordingly. otherwise the model is left untouched.
 
-    generate_basic_lp(model)
+       solver names the optimisation library to use (see pyabolism.simulate.solvers)
 
-    model.lp.optimize()
+       norm ('L1' or 'L2') selects parsimonious FBA (see pFBA), in which case fraction is the
+       proportion of the maximal objective flux that the fluxes of least norm must attain"""
 
-    if model.lp.status == GRB.status.INFEASIBLE:
-        if show:
-            print 'model infeasible : no LP solution'
-        model.growing = False
-        model.total_objective = None
-        return
+    # the LP attached to the model is reused, updated only where the model has changed
+    session = get_lp_session(model, solver=solver)
 
-    # the fluxes are extracted from the LP and stored in the reactions of the MetaModel
-        # preserving the fluxes as found in the model before FBA
-    for reaction in model.reactions():
-        reaction.loaded_flux = reaction.flux_value
-        reaction.flux_value  = reaction.lp_var.X
+    matrix = model.matrix()
 
-    # shadow price of a constraint is a property that can be useful for some analyses
-    for metabolite in model.metabolites():
-        metabolite.shadow = None
-        if metabolite.lp_constr:
-            try:
-                metabolite.shadow = metabolite.lp_constr.getAttr('Pi')
-            except grb.GurobiError:
-                pass
+    status = model.lp.solve()
 
-    # default behaviour is that *all* reactions are included in the
-    # minisation of overall norm
-    limiteds = model.reactions()
+    if status in (INFEASIBLE, INFEASIBLE_OR_UNBOUNDED):
+        if show:
+            print('model infeasible : no LP solution')
+        if write_back:
+            model.growing = False
+            model.total_objective = None
+        return Solution(matrix, status, fluxes=np.nan * np.ones(len(matrix.reaction_ids)))
 
-    # limiteds = [r for r in model.reactions()
-    #             if re.findall(model.gene_regex, r.notes.get('GENE_ASSOCIATION', ''))]
+    # the fluxes are extracted from the LP, as are the reduced costs
+    fluxes        = model.lp.primal_values(session.columns)
+    reduced_costs = model.lp.reduced_costs(session.columns)
+
+    # shadow price of a constraint is a property that can be useful for some analyses
+    constrained = session.rows >= 0
+    duals       = model.lp.dual_values(session.rows[constrained])
+    shadows     = np.nan * np.ones(len(matrix.metabolite_ids))
+    if duals is not None:
+        shadows[constrained] = duals
 
     # in general the flux vector returned by FBA is not unique,
     # so optional minimization of the norm is offered
     if norm:
+        fluxes = _minimise_norm(model, session, fluxes, norm, fraction)
 
-        # the 'taxicab' norm (L1)
-        if norm == 'L1':
-            objective = grb.LinExpr()
+    # the total objective achieved is the objective-weighted sum of fluxes
+    solution = Solution(matrix, status, float(np.dot(matrix.objective, fluxes)),
+                        fluxes=fluxes, reduced_costs=reduced_costs, shadow_prices=shadows)
 
-            for reaction in model.reactions():
+    # where required, the flux through targeted reactions is output to the console
+    if show:
+        for j in np.flatnonzero(matrix.objective):
+            print('%s flux = %18.10f' % (matrix.reaction_ids[j], fluxes[j]))
 
-                var        = reaction.lp_var
-                flux_value = reaction.flux_value
+    # the results are stored in the reactions and metabolites of the MetaModel,
+    # preserving the fluxes as found in the model before FBA as loaded_flux
+    if write_back:
+        solution.write_back(model)
 
-                if reaction.objective_coefficient != 0:
-                    # to avoid potential numerical issues in floating point calculations,
-                    # we slightly loosen bounds on the objective
-                    var.lb = flux_value * (1. - 1e-12)
-                    var.ub = np.infty
+    return solution
 
-                # if reaction is in the limited list
-                # then flux is in the objective function,
-                # such that we can minimise the *magnitudes*
-                if reaction in limiteds:
-                    objective += var
 
-        # the euclidean norm (L2) requires non-linear objective
-        elif norm == 'L2':
+def pFBA(model, norm='L1', fraction=1.0, show=False, solver=None, write_back=True):
+    """parsimonious FBA: the fluxes of least norm (the sum of their magnitudes, for 'L1',
+        or of their squares, for 'L2') among those attaining fraction of the maximal flux
+        through the objective, returned as a Solution
 
-            objective = grb.QuadExpr()
+        this is FBA with the given norm. both stages run on the LP attached to the model,
+        the objective of the second stage being made once and kept by the LP session
+        (see LPSession.norm_objective), so that repeated calls only swap the two objectives"""
+    return FBA(model, show=show, norm=norm, solver=solver, write_back=write_back,
+               fraction=fraction)
 
-            for reaction in model.reactions():
-                var        = reaction.lp_var
-                flux_value = reaction.flux_value
 
-                if reaction.objective_coefficient != 0:
-                    # to avoid potential numerical issues in floating point calculations,
-                    # we slightly loosen bounds on the objective
-                    var.lb = flux_value * (1. - 1e-12)
-                    var.ub = np.infty
+def _minimise_norm(model, session, fluxes, norm, fraction=1.0):
+    """the second stage of parsimonious FBA, given the fluxes of the first, returning
+        the fluxes of least norm among those keeping the objective fluxes"""
 
-                # if reaction is in the limited list
-                # the square of the flux is in the objective function
-                if reaction in limiteds:
-                    objective += var * var
-        else:
-            raise Exception('Unknown norm type...')
+    if norm not in ('L1', 'L2'):
+        raise Exception('Unknown norm type...')
 
-        # we set the objective function
-        model.lp.setObjective(objective)
+    matrix = model.matrix()
 
-        # we now wish to minimise the total (squared) flux
-        model.lp.modelSense = GRB.MINIMIZE
+    objectives = np.flatnonzero(matrix.objective)
 
-        model.lp.optimize()
+    # to avoid potential numerical issues in floating point calculations,
+    # we slightly loosen bounds on the objective
+    model.lp.set_bounds(session.columns[objectives],
+                        fluxes[objectives] * (float(fraction) * (1. - 1e-12)),
+                        np.infty * np.ones(len(objectives)))
 
-        # we store the new fluxes found thanks to the minimisation
-        for reaction in model.reactions():
-            reaction.flux_value = reaction.lp_var.X
+    # the bounds of the objective reactions were altered directly in the LP,
+    # and must be restored from the model before the LP is next used
+    session.mark_dirty([model.reaction[matrix.reaction_ids[j]] for j in objectives])
 
-    # if we used the L1 norm, we must now convert back to
-    # a model that permist reversible reactions
-    if norm == 'L1':
-        model = deirreversify(model)
+    # we set the objective function, and now wish to minimise the total (squared) flux.
+    # the 'taxicab' norm (L1) minimises the *magnitudes* of the fluxes, the flux of each
+    # reversible reaction being split into its positive and negative parts within the LP;
+    # the euclidean norm (L2) requires non-linear objective, the square of each flux
+    linear, quadratic = session.norm_objective(norm)
 
-    # we store the total objective achieved as a property of the model
-    model.total_objective = 0
-    for reaction in [reaction for reaction in model.reactions()
-                     if reaction.objective_coefficient != 0]:
-            model.total_objective += reaction.flux_value * reaction.objective_coefficient
+    model.lp.set_objective(linear=linear, quadratic=quadratic, sense=MINIMIZE)
+    session.objective_replaced = True
 
-            # where required, the flux through targeted reactions is output to the console
-            if show:
-                print '%s flux = %18.10f' % (reaction.id, reaction.flux_value)
+    model.lp.solve()
 
-    return
+    # we keep the new fluxes found thanks to the minimisation
+    return model.lp.primal_values(session.columns)
@@ -1,57 +1,206 @@
-
 import numpy as np
 
-from .LP import GRB
-from FBA import FBA
+from .LP import build_matrix_lp
+from .FBA import FBA
+from .solvers import MAXIMIZE, MINIMIZE
+
+
+def FVA(model, norm='L2', obj_ratio=1.0, show=False, processes=1, reactions=None, prune=True,
+        solver=None, write_back=True):
+    """flux variability analysis, returning a Solution holding the (min, max) flux range of
+        every reaction along with the FBA solution. with write_back (the default), the results
+        are also stored in the model, as the flux_range of every reaction
 
+        reactions restricts the analysis to a subset of reactions (or reaction ids).
 
-def FVA(model, norm='L2', obj_ratio=1.0, show=False):
+        with prune=True, the solution of every LP is checked for fluxes sitting at their bounds;
+        any such bound is necessarily the min (or max) of that flux, so its LP is skipped.
+        the numbers of LPs solved and saved are stored as model.fva_lps_solved/fva_lps_saved.
+
+        with processes > 1 the reactions are shared between a pool of worker processes,
+        each of which solves its share on a private copy of the optimality-constrained LP.
+        solver names the optimisation library to use (see pyabolism.simulate.solvers)"""
 
     assert obj_ratio > 0.0, 'obj_ratio must be strictly positive.'
 
     # we run standard FBA to find the maximum objective attainable
-    FBA(model, show=False, norm=norm)
+    solution = FBA(model, show=False, norm=norm, solver=solver, write_back=False)
 
     # we extract the linear program built for the original FBA problem
-    lp = model.lp
+    lp      = model.lp
+    session = model.lp_session
 
     # we add constraints to the linear program such that the objective value is maintained
     # up to the proportion indicated by obj_ratio
-    for r in [r for r in model.reactions() if r.objective_coefficient != 0]:
-        if r.flux_value > 0:
-            r.lp_var.lb = float(obj_ratio) * r.flux_value
-            r.lp_var.ub = r.flux_value * np.infty
+    matrix = model.matrix()
+
+    objectives       = np.flatnonzero(matrix.objective)
+    objective_bounds = _objective_bounds(solution.fluxes[objectives], obj_ratio)
+
+    if reactions is None:
+        indices = range(len(matrix.reaction_ids))
+    else:
+        indices = list(matrix.reaction_indices(reactions))
+
+    if processes > 1:
+        ranges, saved = _parallel_flux_ranges(matrix, objective_bounds, indices, processes, prune,
+                                              type(lp))
+
+    else:
+        lp.set_bounds(session.columns[objectives],
+                      [lower_bound for (lower_bound, _) in objective_bounds],
+                      [upper_bound for (_, upper_bound) in objective_bounds])
+
+        # once FVA is complete, these bounds and the objective must be restored
+        # before the LP is next used
+        session.mark_dirty([model.reaction[matrix.reaction_ids[j]] for j in objectives])
+        session.objective_replaced = True
+
+        # we reuse the existing LP, saving the overheard of building from scratch and allowing
+        # the optimization library a 'hot start' on solving each problem
+        ranges, saved = _flux_ranges(lp, session.columns, indices, prune)
+
+    # the solution to this problem is no longer a single flux value for each reaction
+    # but instead we store the min and max values
+    solution.flux_ranges = np.nan * np.ones((len(matrix.reaction_ids), 2))
+    if len(indices):
+        solution.flux_ranges[list(indices)] = ranges
+
+    solution.lps_solved = 2 * len(indices) - saved
+    solution.lps_saved  = saved
+
+    if write_back:
+        solution.write_back(model)
+        model.fva_lps_solved = solution.lps_solved
+        model.fva_lps_saved  = solution.lps_saved
+
+    if show:
+        print('FVA : %d LPs solved, %d saved' % (solution.lps_solved, solution.lps_saved))
+
+    return solution
+
+
+def _objective_bounds(fluxes, obj_ratio):
+    """the bounds that hold each objective reaction within obj_ratio of its FBA flux"""
+
+    bounds = []
+    for flux_value in fluxes:
+        if flux_value > 0:
+            bounds.append((float(obj_ratio) * flux_value, flux_value * np.infty))
         else:
             # in the case the we have (for whatever reason) a negative objective flux
             # the bounds must be set such that the objective remains just as *negative*
             # as the original solution
-            r.lp_var.ub = float(obj_ratio) * r.flux_value
-            r.lp_var.lb = r.flux_value * np.infty
+            bounds.append((flux_value * np.infty, float(obj_ratio) * flux_value))
+
+    return bounds
+
+
+def _flux_ranges(lp, columns, indices, prune=True, tolerance=1e-9):
+    """minimise and then maximise the fluxes of columns[indices] in turn,
+        returning a list of (min, max) and the number of LPs skipped through pruning"""
+
+    lower_bounds, upper_bounds = lp.get_bounds(columns)
+
+    # a flux found at its bound in *any* feasible solution has that bound as its min (or max)
+    at_lower = np.zeros(len(columns), dtype=bool)
+    at_upper = np.zeros(len(columns), dtype=bool)
+
+    def record_solution():
+        values = lp.primal_values(columns)
+        at_lower[values <= lower_bounds + tolerance] = True
+        at_upper[values >= upper_bounds - tolerance] = True
 
-    # we iterate over all the reactions in the model to determine the range of freedom available
+    ranges = []
+    saved  = 0
+
+    # we iterate over all the variables to determine the range of freedom available
     # in each flux value
-    # we reuse the existing LP, saving the overheard of building from scratch and allowing
-    # the optimization library a 'hot start' on solving each problem
-    for r in model.reactions():
+    lp.set_objective()
+
+    previous = None
+    for j in indices:
+
+        column = columns[j]
 
-        # we can extract the variable tied to each reaction
-        variable = r.lp_var
-        # and set it as the sole objective for the LP
-        lp.setObjective(variable)
+        # each variable in turn is set as the sole objective for the LP
+        if previous is not None:
+            lp.set_objective_coefficients([previous], [0.0])
+        lp.set_objective_coefficients([column], [1.0])
+        previous = column
 
         # we first extract the minimum permitted value for the flux...
-        lp.modelSense = GRB.MINIMIZE
-        lp.optimize()
-        minimum = variable.X
+        if prune and at_lower[j]:
+            minimum = lower_bounds[j]
+            saved  += 1
+        else:
+            lp.set_sense(MINIMIZE)
+            lp.solve()
+            minimum = lp.primal_values([column])[0]
+            if prune:
+                record_solution()
 
         # ...and then likewise obtain the maximum
-        lp.modelSense = GRB.MAXIMIZE
-        lp.optimize()
-        maximum = variable.X
+        if prune and at_upper[j]:
+            maximum = upper_bounds[j]
+            saved  += 1
+        else:
+            lp.set_sense(MAXIMIZE)
+            lp.solve()
+            maximum = lp.primal_values([column])[0]
+            if prune:
+                record_solution()
+
+        ranges.append((minimum, maximum))
+
+    return ranges, saved
+
+
+def _parallel_flux_ranges(matrix, objective_bounds, indices, processes, prune, solver=None):
+    """docstring for _parallel_flux_ranges"""
+
+    from multiprocessing import Pool
+
+    objective_indices = list(np.flatnonzero(matrix.objective))
+
+    # reactions are dealt out in small contiguous chunks, so that the pool stays balanced;
+    # results come back in the order of the chunks, and hence of the reactions
+    n_chunks = max(1, min(len(indices), 4 * processes))
+    chunks   = [(list(c), prune) for c in np.array_split(np.array(indices, dtype=int), n_chunks)]
+
+    pool = Pool(processes, initializer=_initialise_worker,
+                initargs=(matrix, list(zip(objective_indices, objective_bounds)), solver))
+    try:
+        results = pool.map(_worker_flux_ranges, chunks)
+    finally:
+        pool.close()
+        pool.join()
+
+    ranges = [flux_range for (result, _) in results for flux_range in result]
+    saved  = sum([saved for (_, saved) in results])
+
+    return ranges, saved
+
+
+# each worker process holds its own LP, built once by _initialise_worker
+_worker = {}
+
+
+def _initialise_worker(matrix, objective_bounds, solver):
+    """docstring for _initialise_worker"""
+
+    lp, columns = build_matrix_lp(matrix, 'FVA_worker', private_env=True, solver=solver)
+
+    for j, (lower_bound, upper_bound) in objective_bounds:
+        lp.set_bounds([columns[j]], [lower_bound], [upper_bound])
+
+    _worker['lp']      = lp
+    _worker['columns'] = columns
+
 
-        # the solution to this problem is no longer a single flux value for each reaction
-        # but instead we store a tuple with the min and max values
-        r.flux_range = (minimum, maximum)
+def _worker_flux_ranges(args):
+    """docstring for _worker_flux_ranges"""
 
-    return
+    indices, prune = args
 
+    return _flux_ranges(_worker['lp'], _worker['columns'], indices, prune)
@@ -1,263 +1,315 @@
 
-from copy import copy, deepcopy
-
 import numpy as np
-import networkx as nx
 
-from ..model import Reaction, Gene
-from ..tools import get_transport_reactions, GPR_string2tree
+from ..model import StoichiometricMatrix
+from ..tools import get_transport_reactions, compile_GPRs
+
+from .LP import add_matrix_to_lp, _differs
+from .solvers import get_solver, as_solver, OPTIMAL, SUBOPTIMAL, LESS_EQUAL, GREATER_EQUAL, \
+    MAXIMIZE, MINIMIZE
 
-from .LP import grb, GRB, generate_basic_lp
+from .simtools import split_directions, merge_directions
+from .solution import Solution, stack
 
-from .simtools import irreversify, deirreversify
 
+def _convert_model(model):
+    """docstring for _convert_model"""
+    return _GCFluxModel(model)
 
-def _get_sufficient_complexes(gene_association):
-    """from a complex gene association string,
-    retrieve a list of all feasible gene complexes (as a list)"""
 
-    gprTree = GPR_string2tree(gene_association)
+class _GCFluxModel(object):
+    """a model in the form required by GC-Flux, held as arrays over the columns of its LP
 
-    for node in reversed(nx.topological_sort(gprTree)):
+        every reaction is split into irreversible directions (see split_directions), and each
+        direction into one column per sufficient gene complex of the reaction. no copy of the
+        model is made: column k carries the flux of reaction reactions[k] in the direction
+        signs[k], catalysed by all of the genes in complexes[k]"""
+    def __init__(self, model):
+        from scipy import sparse
 
-        if gprTree.out_degree(node) == 0:
-            complexes = [[node, ], ]
+        self.model = model
+        self.name  = model.name
+        self.lp    = None
 
-        elif gprTree.node[node].get('operation', '') == 'or':
+        matrix = model.matrix()
 
-            complexes = []
-            for child in gprTree.successors(node):
-                for c_element in gprTree.node[child]['complexes']:
-                    complexes.append(c_element)
+        directions, signs, lower_bounds, upper_bounds = split_directions(matrix)
 
-        elif gprTree.node[node].get('operation', '') == 'and':
+        # the sufficient complexes are found once per reaction, and shared by both directions
+        gprs               = compile_GPRs(model)
+        reaction_complexes = gprs.complexes()
 
-            for i, child in enumerate(gprTree.successors(node)):
+        self.genes = list(gprs.genes)
 
-                if i == 0:
-                    complexes = gprTree.node[child]['complexes']
+        reactions    = []
+        column_signs = []
+        reaction_ids = []
 
-                else:
-                    new_complexes = []
-                    for j in range(len(complexes)):
-                        for k in range(len(gprTree.node[child]['complexes'])):
-                            new_complexes.append(complexes[j] + gprTree.node[child]['complexes'][k])
+        self.complexes  = []
+        self.duplicates = []
 
-                    complexes = new_complexes
+        for j, sign in zip(directions, signs):
 
-        else:
-            if len(gprTree.successors(node)) > 1:
-                raise Exception('branching internal node with no operation label! This is wrong!!')
-            child     = gprTree.successors(node)[0]
-            complexes = gprTree.node[child]['complexes']
+            suffix = '_f' if sign > 0 else '_b'
 
-        gprTree.node[node]['complexes'] = complexes
+            # each feasible complex of the reaction becomes an individual column
+            duplicates = []
+            for suff_complex in reaction_complexes[j]:
+                reaction_ids.append(matrix.reaction_ids[j] + suffix + '%03d' % len(duplicates))
+                duplicates.append(len(reactions))
+                reactions.append(j)
+                column_signs.append(sign)
+                self.complexes.append(suff_complex)
 
-    return gprTree.node['root']['complexes']
+            self.duplicates.append(duplicates)
 
+        self.reactions = np.array(reactions, dtype=int)
+        self.signs     = np.array(column_signs, dtype=float)
 
-def _convert_model(model):
+        # to ensure that all original flux constraints present in the model are preserved
+        # in the GC-Flux representation, the bounds of each direction apply to the sum of
+        # its duplicates, which are themselves unbounded
+        self.duplicate_ids = [matrix.reaction_ids[j] + ('_f' if sign > 0 else '_b')
+                              for (j, sign) in zip(directions, signs)]
+        self.lower_bounds  = lower_bounds
+        self.upper_bounds  = upper_bounds
 
-    model = irreversify(model)
+        # the stoichiometry of each column is that of its reaction, negated when backwards.
+        # as for the backward reactions made by irreversify, the objective coefficient is
+        # kept (not negated) for both directions
+        S = sparse.csc_matrix(matrix.S)[:, self.reactions] * sparse.diags(self.signs)
 
-    # to ensure that all orginal flux constraints present in the model
-    # are preserved in the GC-Flux representation, we keep a record of
-    # which reactions are duplicated, for later use
-    duplicates_and_bounds = []
+        self.split = StoichiometricMatrix.from_arrays(
+            S, reaction_ids, matrix.metabolite_ids, matrix.boundary,
+            np.zeros(len(reactions), dtype=bool),
+            np.zeros(len(reactions)), np.infty * np.ones(len(reactions)),
+            matrix.objective[self.reactions])
 
-    # exchanges = get_exchange_reactions(model)
+        self.n_reactions = len(matrix.reaction_ids)
 
-    # now we duplicate reactions such that each gene association clause
-    # is attached to a different reaction
-    for r in model.reaction.values():
+    def fluxes(self, values):
+        """the net flux of each reaction of the model, from the values of the columns"""
+        return merge_directions(values, self.reactions, self.signs, self.n_reactions)
 
-        # # exchanges are left unaltered
-        # if r in exchanges:
-        #     continue
 
-        gene_association = r.notes.get('GENE_ASSOCIATION', '')
+def _build_GCFlux_lp(model, expressions, add_to_existing=False, unlimited_transports=False,
+                     solver=None):
+    """build the GC-Flux LP of a _GCFluxModel, stored as model.lp
 
-        suff_complexes = _get_sufficient_complexes(gene_association)
+        with add_to_existing, the variables and constraints are added to the LP already held
+        as model.lp, such that several GC-Flux problems may be solved as one"""
 
-        duplicates = []
-        # we iterate over all the feasible complexes, each becoming an individual reaction
-        for suff_complex in suff_complexes:
+    from scipy import sparse
 
-            # the duplicates each get a unique identifier
-            new_r = Reaction(r.id + '%03d' % len(duplicates))
+    if model.lp is not None and add_to_existing:
+        model.lp = as_solver(model.lp)
+    else:
+        model.lp = get_solver(solver)('LP_' + model.name)
 
-            new_r.name                   = r.name
-            new_r.reversible             = False
-            new_r.lower_bound            = 0.0
-            new_r.upper_bound            = np.infty
-            new_r.default_bounds         = r.default_bounds
-            new_r.objective_coefficient  = r.objective_coefficient
-            new_r.flux_value             = r.flux_value
-            new_r.notes                  = copy(r.notes)
-            new_r.participants           = copy(r.participants)
+    model.lp.set_sense(MAXIMIZE)
 
-            new_r.notes['GENE_ASSOCIATION'] = '( %s )' % (' and '.join(suff_complex))
+    model.lp_columns = add_matrix_to_lp(model.lp, model.split, prefix=model.name)[0]
 
-            # all genes in the 'and' clause are required, and the list is recorded
-            new_r.genes = [Gene(g_string.strip()) for g_string in suff_complex]
+    column = model.lp_columns
 
-            new_r.notes['original_rid']             = r.notes['original_rid']
-            new_r.notes['original_rid_multiplier']  = r.notes['original_rid_multiplier']
+    # to set the bounds we need to know the list of columns catalysed by each gene
+    gene_index   = dict((gid, i) for (i, gid) in enumerate(model.genes))
+    gene_columns = [[] for _ in model.genes]
 
-            model.reaction.add(new_r)
-            duplicates.append(new_r)
+    # build list of all transport reactions (external to cytoplasm compartments)
+    matrix     = model.model.matrix()
+    transports = set(matrix.reaction_indices(get_transport_reactions(model.model)))
+
+    for k, genes in enumerate(model.complexes):
+        # in some cases we may to restrict constraints to internal reactions,
+        # and leave transports unrestricted. typically, we need the columns of *every*
+        # reaction that is catalysed by the gene
+        if unlimited_transports and model.reactions[k] in transports:
+            continue
+        for gid in genes:
+            gene_columns[gene_index[gid]].append(k)
+
+    def sum_of_fluxes(columns_per_row):
+        """a sparse matrix, each row summing the fluxes of the given columns"""
+        indices = [column[k] for columns in columns_per_row for k in columns]
+        indptr  = np.cumsum([0] + [len(columns) for columns in columns_per_row])
+        return sparse.csr_matrix((np.ones(len(indices)), indices, indptr),
+                                 shape=(len(columns_per_row), model.lp.num_variables))
+
+    # each gene in the model becomes a constraint on the associated reactions
+    # with upper bound on total flux dictated by expression of the gene (where available)
+    # these are added in bulk, as a single matrix, with one row per gene of model.genes
+    model.gene_rows = model.lp.add_constraints(sum_of_fluxes(gene_columns),
+                                               LESS_EQUAL,
+                                               [expressions.get(gid, np.infty)
+                                                for gid in model.genes],
+                                               names=['sum_flux_%s' % gid for gid in model.genes])
+
+    # as well as the expression-related bounds, we must re-apply the bounds
+    # from the original model definition to each set of duplicates
+    model.lp.add_constraints(sum_of_fluxes(model.duplicates),
+                             GREATER_EQUAL,
+                             model.lower_bounds,
+                             names=['duplicate_lower_%s' % rid for rid in model.duplicate_ids])
+
+    model.lp.add_constraints(sum_of_fluxes(model.duplicates),
+                             LESS_EQUAL,
+                             model.upper_bounds,
+                             names=['duplicate_upper_%s' % rid for rid in model.duplicate_ids])
+
+
+class GCFluxSession(object):
+    """GC-Flux for many expression samples, converting the model and building its LP once
+
+        only the right-hand sides of the sum_flux_<gene> constraints depend on the expression
+        data, so each sample updates those alone (and only for the genes whose expression
+        differs from the last sample) before the LP is solved again, with the solver keeping
+        its warm start. the model itself is left untouched"""
+    def __init__(self, model, norm='L2', unlimited_transports=False, solver=None):
+
+        if norm and norm not in ('L1', 'L2'):  # tax-cab or 'L1' norm, euclidean or 'L2' norm
+            raise Exception('Unknown norm type...')
 
-        # the duplicates set and the original bounds are recorded
-        duplicates_and_bounds.append((duplicates, r.lower_bound, r.upper_bound))
+        self.model = model
+        self.norm  = norm
+        self.gprs  = compile_GPRs(model)
 
-        # finally, once the reaction has been replaced by duplicates, we remove the original
-        model.reaction.remove(r)
+        self.gcflux = _convert_model(model)
 
-    model.duplicates_and_bounds = duplicates_and_bounds
+        # the LP is built with every gene unlimited, the expression data being set by solve()
+        _build_GCFlux_lp(self.gcflux, {}, unlimited_transports=unlimited_transports,
+                         solver=solver)
 
-    return model
+        self.lp      = self.gcflux.lp
+        self.columns = self.gcflux.lp_columns
+        self.rows    = np.asarray(self.gcflux.gene_rows, dtype=int)
 
+        # the expression values last set as the right-hand sides of the rows of the genes
+        self.rhs = np.infty * np.ones(len(self.rows))
 
-def _build_GCFlux_lp(model, expressions, add_to_existing=False, unlimited_transports=False):
+        self.objectives = np.flatnonzero(self.gcflux.split.objective)
 
-    generate_basic_lp(model, add_to_existing=add_to_existing)
+        self.objective = np.zeros(self.lp.num_variables)
+        self.objective[self.columns] = self.gcflux.split.objective
 
-    from collections import defaultdict
-    # to set the bounds we need to know the list of reactions catalysed by each gene
-    gene2reaction = defaultdict(list)
-    for r in model.reactions():
-        for gid in [gene.id for gene in r.genes]:
-            gene2reaction[gid].append(r.id)
+        # all fluxes are in the norm, such that we can minimise the magnitudes
+        self.weights = np.zeros(self.lp.num_variables)
+        self.weights[self.columns] = 1.0
 
-    # build list of all transport reactions (external to cytoplasm compartments)
-    transports = get_transport_reactions(model)
+    def solve(self, expressions):
+        """solve GC-Flux for one sample, being a dict of expression values or an array over
+            the genes of self.gprs. returns a Solution holding the net flux of every reaction
+            of the model, being nan where no optimal solution was found"""
 
-    for gid, rids in gene2reaction.items():
-        if unlimited_transports:
-            # in some cases we may to restrict constraints to internal reactions,
-            # and leave transports unrestricted
-            r_vars = [model.reaction[rid].lp_var
-                      for rid in rids if model.reaction[rid] not in transports]
-        else:
-            # typically, we need to get a list of the gurobi variables for *every*
-            # reaction that is catalysed by the gene
-            r_vars = [model.reaction[rid].lp_var for rid in rids]
+        lp = self.lp
 
-        # each gene in the model becomes a constraint on the associated reactions
-        # with upper bound on total flux dictated by expression of the gene (where available)
-        model.lp.addConstr(grb.LinExpr(np.ones(len(r_vars)), r_vars),
-                           GRB.LESS_EQUAL,
-                           expressions.get(gid, np.infty),
-                           'sum_flux_%s' % gid)
+        if isinstance(expressions, dict):
+            expressions = self.gprs.expression_matrix(expressions)[0]
 
-    # as well as the expression-related bounds, we must use the duplicate sets stored
-    # earlier to re-apply the bounds from the original model definition
-    for duplicates, lower_bound, upper_bound in model.duplicates_and_bounds:
+        expressions = np.asarray(expressions, dtype=float)
 
-        # print duplicates[0].id[:-3], lower_bound, upper_bound
+        changed = np.flatnonzero(_differs(expressions, self.rhs))
+        if len(changed):
+            lp.set_rhs(self.rows[changed], expressions[changed])
+            self.rhs[changed] = expressions[changed]
+
+        # the objective, and the bounds holding it during the last minimisation, are restored
+        lp.set_bounds(self.columns[self.objectives],
+                      np.zeros(len(self.objectives)), np.infty * np.ones(len(self.objectives)))
+        lp.set_objective(linear=self.objective, sense=MAXIMIZE)
+
+        status = lp.solve()
+        if status != OPTIMAL:
+            return self._solution(status)
+
+        values = lp.primal_values(self.columns)
+
+        # we don't yet have a unique solution to our problem,
+        # but rather an abitrary flux vector from the solution space
+        # to deal with this, we generally minimise the norm while maintaining total objective
+        if self.norm:
+
+            # for those reactions that are part of the objective,
+            # we constrain them to have (almost exactly) the same value
+            lp.set_bounds(self.columns[self.objectives],
+                          values[self.objectives] * (1. - 1e-12),
+                          np.infty * np.ones(len(self.objectives)))
+
+            # we set the objective function, and now wish to minimise the norm of the fluxes
+            if self.norm == 'L1':
+                lp.set_objective(linear=self.weights, sense=MINIMIZE)
+            else:
+                lp.set_objective(quadratic=self.weights, sense=MINIMIZE)
 
-        r_vars = [model.reaction[r.id].lp_var for r in duplicates]
+            status = lp.solve()
 
-        model.lp.addConstr(grb.LinExpr(np.ones(len(r_vars)), r_vars),
-                           GRB.GREATER_EQUAL,
-                           lower_bound,
-                           'duplicate_lower_%s' % duplicates[0].id[:-3])
+            count = 0
+            # for some problems, we need to relax the tolerances of the solver
+            # in order to achieve an optimal solution
+            while status == SUBOPTIMAL and lp.relax_tolerances():
+                status = lp.solve()
+                count += 1
+                if count > 6:
+                    raise Exception('Error: relaxing BarConvTol failed to permit optimal solution')
 
-        model.lp.addConstr(grb.LinExpr(np.ones(len(r_vars)), r_vars),
-                           GRB.LESS_EQUAL,
-                           upper_bound,
-                           'duplicate_upper_%s' % duplicates[0].id[:-3])
+            if status != OPTIMAL:
+                return self._solution(status)
 
-    model.lp.update()
+            values = lp.primal_values(self.columns)
+
+        # the fluxes of the duplicates of each reaction are summed back into the reaction
+        return self._solution(status, self.gcflux.fluxes(values))
+
+    def _solution(self, status, fluxes=None):
+        """docstring for _solution"""
+
+        matrix = self.model.matrix()
+
+        if fluxes is None:
+            return Solution(matrix, status, fluxes=np.nan * np.ones(len(matrix.reaction_ids)))
+
+        return Solution(matrix, status, float(np.dot(matrix.objective, fluxes)), fluxes=fluxes)
+
+    def batch(self, expressions, genes=None):
+        """the fluxes of the model under each of many samples, as an array of samples by
+            reactions. expressions may take any form accepted by CompiledGPRs.samples, with a
+            pandas DataFrame returned for a DataFrame. failed samples have fluxes of nan"""
+
+        X, index = self.gprs.samples(expressions, genes)
+
+        fluxes = stack([self.solve(x) for x in X]).reshape(len(X), len(self.model.reaction))
+
+        if index is not None:
+            import pandas as pd
+            return pd.DataFrame(fluxes, index=index, columns=self.model.matrix().reaction_ids)
+
+        return fluxes
 
 
 def GCFlux(model, expressions, limit_unpaired=False,
-           norm='L2', show=False, unlimited_transports=False):
+           norm='L2', show=False, unlimited_transports=False, solver=None):
     """implementation of the GC-Flux algorithm
-    Gene complex-centric simulation of cellular metabolism"""
-
-    # we make a duplicate model in order that the original remain in tact
-    model = _convert_model(model)
-
-    _build_GCFlux_lp(model, expressions)
-
-    # finally, with the complete model we can run the optimization
-    model.lp.optimize()
-
-    # we extract results from the linear program and add them to the GC-Flux model
-    for reaction in model.reactions():
-        try:
-            reaction.flux_value  = reaction.lp_var.X
-        except Exception as e:
-            print model.lp.status
-            raise e
-
-    # we don't yet have a unique solution to our problem,
-    # but rather an abitrary flux vector from the solution space
-    # to deal with this, we generally minimise the norm while maintaining total objective value
-    if norm:
-
-        if norm == 'L1':  # tax-cab or 'L1' norm
-            objective = grb.LinExpr()
-        elif norm == 'L2':  # euclidean or 'L2' norm
-            objective = grb.QuadExpr()
-        else:
-            raise Exception('Unknown norm type...')
+    Gene complex-centric simulation of cellular metabolism
 
-        for reaction in model.reactions():
+    as ever, the net fluxes are written back into the reactions of the model given (with
+    the previous values kept as loaded_flux, and the objective value as total_objective),
+    and that same model is returned. nothing else of the model is changed, the split into
+    irreversible, complex-specific fluxes being made within the LP alone.
+    to simulate many samples, see GCFluxSession"""
 
-            var        = reaction.lp_var
-            flux_value = reaction.flux_value
+    session = GCFluxSession(model, norm=norm, unlimited_transports=unlimited_transports,
+                            solver=solver)
 
-            if reaction.objective_coefficient != 0.0:
-                # for those reactions that are part of the objective,
-                # we constrain them to have (almost exactly) the same value
-                var.lb = flux_value * (1. - 1e-12)
-                var.ub = np.infty
+    solution = session.solve(expressions)
 
-            # all fluxes are in the objective function, such that we can minimise the magnitudes
-            if norm == 'L1':
-                objective += var
-            else:
-                objective += var * var
-
-        # we add the objective function that was built in the last section
-        model.lp.setObjective(objective)
-
-        # we now wish to minimise the norm of the flux vector
-        model.lp.modelSense = GRB.MINIMIZE
-
-        model.lp.optimize()
-
-        count = 0
-        # for some problems, we need to relax the BarConvTol parameter
-        # in order to achieve an optimal solution
-        while model.lp.status == 13:
-            model.lp.setParam('BarConvTol', model.lp.getParamInfo('BarConvTol')[2] * 10.0)
-            model.lp.optimize()
-            count += 1
-            if count > 6:
-                raise Exception('Error: relaxing BarConvTol failed to permit optimal solution')
-
-        if model.lp.status != 2:
-            raise Exception('non-optimal solution... ' + str(model.lp.status))
-
-    # with the optimisation complete, we need to extract the results
-    # and add them back to the original model
-    # the fluxes from this LP are transferred to the relevant reactions in model
-    for reaction in model.reactions():
-        try:
-            reaction.flux_value  = reaction.lp_var.X
-        except Exception as e:
-            print model.lp.status
-            raise e
-
-    model = deirreversify(model)
-
-    model.total_objective = 0.0
-    for reaction in [r for r in model.reactions() if r.objective_coefficient != 0]:
-        model.total_objective += reaction.flux_value * reaction.objective_coefficient
-        if show:
-            print '%s flux = %18.10f\n' % (reaction.id, reaction.flux_value)
+    if solution.status != OPTIMAL:
+        raise Exception('non-optimal solution... ' + str(solution.status))
+
+    # the fluxes are stored in the reactions of the model
+    solution.write_back(model)
+
+    if show:
+        for reaction in [r for r in model.reactions() if r.objective_coefficient != 0]:
+            print('%s flux = %18.10f\n' % (reaction.id, reaction.flux_value))
 
     return model
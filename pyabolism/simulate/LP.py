@@ -1,68 +1,422 @@
 
-import os
+import sys
 
-import gurobipy as grb
-from gurobipy import GRB
+import numpy as np
 
-grb.setParam('OutputFlag', 0)
-grb.setParam('LogFile', os.getenv("HOME") + '/gurobi.log')
-try:
-    os.unlink('gurobi.log')
-except:
-    pass
+from .solvers import get_solver, as_solver, EQUAL, GREATER_EQUAL, MAXIMIZE
 
 
-def generate_basic_lp(model, add_to_existing=False):
-    """docstring for generate_basic_lp"""
+# gurobipy remains available from here as grb and GRB, for code that works with gurobi models
+# directly, but is imported only when first used (these are None where it is not installed)
+def _gurobi(name):
+    """docstring for _gurobi"""
+    try:
+        from .solvers import gurobi
+    except ImportError:
+        return None
+    return getattr(gurobi, name)
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in ('grb', 'GRB'):
+            return _gurobi(name)
+        raise AttributeError('module %s has no attribute %s' % (__name__, name))
+else:
+    class _LazyGurobi(object):
+        """a stand-in for grb or GRB, which imports gurobipy on first use of an attribute"""
+        def __init__(self, name):
+            self._name = name
+
+        def __getattr__(self, attribute):
+            return getattr(_gurobi(self._name), attribute)
+
+    grb = _LazyGurobi('grb')
+    GRB = _LazyGurobi('GRB')
+
+
+def generate_basic_lp(model, add_to_existing=False, bulk=True, solver=None):
+    """build the linear program for a model, stored as model.lp (a Solver, see .solvers)
+
+        solver names the optimisation library to use, defaulting to the first available.
+        with add_to_existing, the variables and constraints are added to the LP already held
+        as model.lp, which may also be a library's own model object (e.g. a gurobipy Model).
+
+        by default the variables and steady-state constraints are added in a single call each,
+        from the compiled stoichiometric matrix of the model. bulk=False adds them one reaction
+        and one metabolite at a time.
+
+        the columns of the reactions and rows of the metabolites (-1 where unconstrained) are
+        stored as model.lp_columns and model.lp_rows, and the library's handles for each as
+        reaction.lp_var and metabolite.lp_constr"""
     # we first initialise the linear program
-    if hasattr(model, 'lp') and add_to_existing:
-        pass
+    if getattr(model, 'lp', None) is not None and add_to_existing:
+        model.lp = as_solver(model.lp)
     else:
-        model.lp = grb.Model('LP_' + model.name)
+        model.lp = get_solver(solver)('LP_' + model.name)
+
+    model.lp.set_sense(MAXIMIZE)
+
+    if bulk:
+        columns, rows = add_matrix_to_lp(model.lp, model.matrix(), prefix=model.name)
+    else:
+        columns, rows = _add_lp_by_element(model)
+
+    model.lp_columns = columns
+    model.lp_rows    = rows
+
+    for reaction, var in zip(model.reactions(), model.lp.native_variables(columns)):
+        reaction.lp_var = var
+
+    constraints = iter(model.lp.native_constraints(rows[rows >= 0]))
+    for metabolite, row in zip(model.metabolites(), rows):
+        metabolite.lp_constr = next(constraints) if row >= 0 else None
+
+
+def add_matrix_to_lp(lp, matrix, prefix=''):
+    """add the variables and steady-state constraints of a StoichiometricMatrix to a Solver
+
+        this requires nothing but the compiled arrays, such that an LP can be built in processes
+        that hold no MetaModel. returns the new columns (one per column of S) and the new row
+        of each row of S, being -1 for those rows left unconstrained"""
+    from scipy import sparse
+
+    # the variables and constraints are appended after any already in the LP
+    columns = lp.add_variables(_lp_lower_bounds(matrix),
+                               matrix.upper_bounds,
+                               matrix.objective,
+                               names=[prefix + rid for rid in matrix.reaction_ids])
+
+    # by the nomenclature of SBML, being a boundary metabolite means
+    # the net production is *not* constrained, so these rows are dropped
+    constrained = np.flatnonzero(~matrix.boundary)
+
+    S = matrix.S[constrained, :].tocsr()
+    A = sparse.csr_matrix((S.data, S.indices + columns[0], S.indptr),
+                          shape=(len(constrained), lp.num_variables))
+
+    rows = -np.ones(len(matrix.metabolite_ids), dtype=int)
+    rows[constrained] = lp.add_constraints(A, EQUAL, np.zeros(len(constrained)),
+                                           names=[prefix + matrix.metabolite_ids[i]
+                                                  for i in constrained])
+
+    return columns, rows
+
+
+def build_matrix_lp(matrix, name='LP', private_env=False, solver=None):
+    """a stand-alone LP, maximising the objective, built from a StoichiometricMatrix
+
+        returns the LP and its columns (one per column of S). worker processes must pass
+        private_env=True, since solver environments must not be shared across processes"""
+
+    lp = get_solver(solver)(name, private_env=private_env)
 
-    model.lp.modelSense = GRB.MAXIMIZE
+    lp.set_sense(MAXIMIZE)
+
+    columns, _ = add_matrix_to_lp(lp, matrix)
+
+    return lp, columns
+
+
+def add_negative_parts(lp, columns, names=None):
+    """split the flux v of each of columns into non-negative parts, as v = p - n
+
+        only the negative parts n are added as variables, each constrained by v + n >= 0,
+        such that the existing columns keep their bounds and p = v + n need not be stored.
+        when the sum of magnitudes |v| = v + 2n is minimised, each n settles at max(0, -v).
+        this takes the place of copying the model into irreversible form, at the cost of
+        one variable and one constraint per column. returns the columns of n"""
+    from scipy import sparse
+
+    columns = np.asarray(columns, dtype=int)
+    n       = len(columns)
+
+    negative = lp.add_variables(np.zeros(n), np.infty * np.ones(n), np.zeros(n), names=names)
+
+    A = sparse.csr_matrix((np.ones(2 * n), np.column_stack([columns, negative]).ravel(),
+                           2 * np.arange(n + 1)),
+                          shape=(n, lp.num_variables))
+
+    lp.add_constraints(A, GREATER_EQUAL, np.zeros(n),
+                       names=None if names is None else [name + '_split' for name in names])
+
+    return negative
+
+
+def _lp_lower_bounds(matrix):
+    """irreversible reactions may not run backwards, whatever their stated lower bound"""
+    return np.where(matrix.reversible, matrix.lower_bounds, np.maximum(matrix.lower_bounds, 0.0))
+
+
+def _differs(new, old):
+    """elementwise inequality of two arrays, treating nan as equal to nan"""
+    return ~((new == old) | (np.isnan(new) & np.isnan(old)))
+
+
+def _add_lp_by_element(model):
+    """docstring for _add_lp_by_element"""
+
+    lp = model.lp
 
     # reaction fluxes are the variables in the linear model
     # we take the objective coefficient from the corresponding reaction property,
     # which generally be non-zero for only the biomass reaction
+    columns = {}
     for reaction in model.reactions():
 
         if reaction.reversible:
-            var = model.lp.addVar(reaction.lower_bound,
-                                  reaction.upper_bound,
-                                  reaction.objective_coefficient,
-                                  GRB.CONTINUOUS,
-                                  model.name + reaction.id)
+            lower_bound = reaction.lower_bound
         else:
-            var = model.lp.addVar(max(reaction.lower_bound, 0.0),
-                                  reaction.upper_bound,
-                                  reaction.objective_coefficient,
-                                  GRB.CONTINUOUS,
-                                  model.name + reaction.id)
-        reaction.lp_var = var
+            lower_bound = max(reaction.lower_bound, 0.0)
 
-    model.lp.update()
+        columns[reaction.id] = lp.add_variables([lower_bound],
+                                                [reaction.upper_bound],
+                                                [reaction.objective_coefficient],
+                                                names=[model.name + reaction.id])[0]
 
     # each metabolite becomes a constraint,
     # since subject to stoichiometry of reactions the net production must be zero
+    rows = []
     for metabolite in model.metabolites():
 
         # each reaction that features the metabolite becomes an element in the constraint
         variables       = []
         stoichiometries = []
         for reaction in model.reaction.get_by_contains(metabolite):
-            variables.append(reaction.lp_var)
+            variables.append(columns[reaction.id])
             stoichiometries.append(reaction.participants[metabolite])
 
         if metabolite.boundaryCondition:
             # by the nomenclature of SBML, being a boundary metabolite means
             # the net production is *not* constrained
-            # metabolite.lp_constr = None
-            pass
+            rows.append(-1)
         else:
             # the weighted sum of all the reactions featuring the metabolite
             # must have a net total of zero
-            constr = model.lp.addConstr(grb.LinExpr(stoichiometries, variables),
-                                        GRB.EQUAL, 0.0, model.name + metabolite.id)
-            metabolite.lp_constr = constr
-    model.lp.update()
+            rows.append(lp.add_constraint(variables, stoichiometries, EQUAL, 0.0,
+                                          model.name + metabolite.id))
+
+    return (np.array([columns[r.id] for r in model.reactions()], dtype=int),
+            np.array(rows, dtype=int))
+
+
+def get_lp_session(model, solver=None):
+    """return the LPSession attached to a model, creating it on first use
+        and otherwise bringing it up to date with any changes made to the model.
+        naming a solver other than that of the existing session rebuilds the LP"""
+
+    session = getattr(model, 'lp_session', None)
+
+    if session is None or session.model is not model \
+            or (solver is not None and not isinstance(session.lp, get_solver(solver))):
+        model.lp_session = LPSession(model, solver=solver)
+    else:
+        session.sync()
+
+    return model.lp_session
+
+
+class LPSession(object):
+    """a linear program that persists alongside its model
+
+        rather than rebuilding the LP for every simulation, sync() compares the model against
+        the state last pushed into the LP and updates only those bounds, objective coefficients
+        and stoichiometries that have changed. stoichiometries are compared only when the
+        compiled matrix of the model has been remade for changes to participants. the solver
+        retains its basis between solves, so that repeated simulations of similar models get
+        a warm start.
+
+        algorithms that alter the LP directly (such as fixing the objective before minimising
+        the norm) must report the reactions they touched via mark_dirty(), and replace the
+        objective via set_objective(), so that the next sync() restores them."""
+    def __init__(self, model, solver=None):
+        self.model  = model
+        self.solver = solver
+        self.build()
+
+    def build(self):
+        """construct the LP from scratch"""
+
+        model = self.model
+
+        # the LP is built from the compiled matrix, which is kept to compare stoichiometries
+        matrix = model.matrix()
+
+        generate_basic_lp(model, solver=self.solver)
+
+        self.lp       = model.lp
+        self.version  = matrix.version
+        self.elements = model._element_version()
+        self.S        = matrix.S
+        self.columns  = model.lp_columns
+        self.rows     = model.lp_rows
+
+        self.boundary     = matrix.boundary.copy()
+        self.lower_bounds = _lp_lower_bounds(matrix)
+        self.upper_bounds = matrix.upper_bounds.copy()
+        self.objective    = matrix.objective.copy()
+
+        self.objective_replaced = False
+
+        # the columns of negative parts of the fluxes, added on first use by negative_parts()
+        self.negative = -np.ones(len(self.columns), dtype=int)
+
+        # the objectives minimising the norm of the fluxes, made on first use by norm_objective()
+        self.norm_objectives = {}
+
+    def sync(self):
+        """push any changes made to the model into the LP,
+            returning the number of reactions whose column was modified"""
+
+        model = self.model
+
+        matrix = model.matrix()
+
+        # changes to the set of reactions or metabolites, or to the metabolites left
+        # unconstrained, or an LP replaced from outside the session, require the LP be rebuilt
+        if model.lp is not self.lp or model._element_version() != self.elements \
+                or np.any(matrix.boundary != self.boundary):
+            self.build()
+            return len(self.columns)
+
+        touched = set()
+
+        lower_bounds = _lp_lower_bounds(matrix)
+        changed = np.flatnonzero(_differs(lower_bounds, self.lower_bounds)
+                                 | _differs(matrix.upper_bounds, self.upper_bounds))
+        if len(changed):
+            self.lp.set_bounds(self.columns[changed],
+                               lower_bounds[changed], matrix.upper_bounds[changed])
+            self.lower_bounds[changed] = lower_bounds[changed]
+            self.upper_bounds[changed] = matrix.upper_bounds[changed]
+            touched.update(changed)
+
+        if self.objective_replaced:
+            # the objective may hold quadratic terms, so it is replaced in full
+            self.lp.set_objective(linear=self._full_length(matrix.objective))
+            self.objective          = matrix.objective.copy()
+            self.objective_replaced = False
+        else:
+            changed = np.flatnonzero(_differs(matrix.objective, self.objective))
+            if len(changed):
+                self.lp.set_objective_coefficients(self.columns[changed],
+                                                   matrix.objective[changed])
+                self.objective[changed] = matrix.objective[changed]
+                touched.update(changed)
+
+        self.lp.set_sense(MAXIMIZE)
+
+        # with the same reactions and metabolites, a new version of the matrix is one remade
+        # for changes to participants
+        if matrix.version != self.version:
+            touched.update(self._push_stoichiometry(matrix))
+            self.version = matrix.version
+
+        return len(touched)
+
+    def _push_stoichiometry(self, matrix):
+        """set the coefficients of S that differ from those last pushed into the LP,
+            returning the columns of S that changed"""
+
+        difference = (matrix.S - self.S).tocoo()
+        changed    = difference.data != 0
+
+        i = difference.row[changed]
+        j = difference.col[changed]
+
+        if len(j):
+            values = np.asarray(matrix.S[i, j]).ravel()
+            for row, column, value in zip(self.rows[i], self.columns[j], values):
+                if row >= 0:
+                    self.lp.set_coefficient(row, column, value)
+
+        self.S = matrix.S
+
+        return set(j.tolist())
+
+    def _full_length(self, values):
+        """spread values over the columns of the model's reactions into an array
+            over every column of the LP (which may hold other variables)"""
+
+        if values is None:
+            return None
+
+        full = np.zeros(self.lp.num_variables)
+        full[self.columns] = values
+
+        return full
+
+    def negative_parts(self):
+        """the column of the negative part of the flux of each reaction (see add_negative_parts),
+            being -1 for irreversible reactions, whose fluxes are never negative
+
+            the negative parts are added to the LP on first use, and remain in place (unbounded,
+            with no cost) for as long as the LP does, having no effect on other simulations"""
+
+        matrix = self.model.matrix()
+
+        missing = np.flatnonzero(matrix.reversible & (self.negative < 0))
+        if len(missing):
+            self.negative[missing] = add_negative_parts(
+                self.lp, self.columns[missing],
+                names=[self.model.name + matrix.reaction_ids[j] + '_neg' for j in missing])
+
+        return self.negative
+
+    def norm_objective(self, norm):
+        """the linear and quadratic objective arrays (over every column of the LP, either
+            being None) that minimised give the fluxes of least L1 or L2 norm
+
+            these are made once and kept, such that switching to them between the stages of
+            parsimonious FBA costs no more than passing the arrays to the solver"""
+
+        cached = self.norm_objectives.get(norm)
+
+        # the arrays must span the LP, which may have grown since they were made
+        if cached is not None and cached[0] == self.lp.num_variables:
+            return cached[1:]
+
+        weights = np.ones(len(self.columns))
+
+        if norm == 'L1':
+            # the magnitude of each flux |v| = v + 2n is linear in its negative part n
+            negative = self.negative_parts()
+            split    = negative >= 0
+
+            linear = self._full_length(weights)
+            linear[negative[split]] = 2.0 * weights[split]
+
+            quadratic = None
+
+        elif norm == 'L2':
+            linear    = None
+            quadratic = self._full_length(weights)
+
+        else:
+            raise Exception('Unknown norm type...')
+
+        self.norm_objectives[norm] = (self.lp.num_variables, linear, quadratic)
+
+        return linear, quadratic
+
+    def mark_dirty(self, reactions):
+        """record that the LP columns of reactions were altered outside of the session,
+            such that the next sync() will restore them from the model"""
+
+        reaction_index = self.model.matrix().reaction_index
+
+        for reaction in reactions:
+            j = reaction_index[reaction.id]
+            self.lower_bounds[j] = np.nan
+            self.upper_bounds[j] = np.nan
+            self.objective[j]    = np.nan
+
+    def set_objective(self, sense, linear=None, quadratic=None):
+        """replace the objective of the LP, to be restored by the next sync()
+
+            linear and quadratic are arrays with one coefficient per reaction of the model"""
+
+        self.lp.set_objective(linear=self._full_length(linear),
+                              quadratic=self._full_length(quadratic),
+                              sense=sense)
+        self.objective_replaced = True
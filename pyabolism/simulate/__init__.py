@@ -1,4 +1,8 @@
-from FBA import FBA  # NOQA
-from FVA import FVA  # NOQA
-from EFlux import EFlux  # NOQA
-from GCFlux import GCFlux  # NOQA
+from .FBA import FBA, pFBA  # NOQA
+from .FVA import FVA  # NOQA
+from .FASTCC import FASTCC  # NOQA
+from .envelope import production_envelope  # NOQA
+from .EFlux import EFlux, EFlux_batch  # NOQA
+from .GCFlux import GCFlux, GCFluxSession  # NOQA
+from .solution import Solution  # NOQA
+from .sampling import sample  # NOQA
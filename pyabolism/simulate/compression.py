@@ -0,0 +1,307 @@
+from collections import OrderedDict
+from copy import copy
+
+import numpy as np
+
+from ..model import MetaModel, Reaction, StoichiometricMatrix, _Coefficients
+from ..model import _MetaboliteDict, _ReactionDict, _GeneDict
+from .LP import _lp_lower_bounds
+from .solution import Solution
+
+
+def compress(original, blocked=None, tolerance=1e-9):
+    """a reduced copy of the model, on which simulations need solve smaller LPs
+
+        reactions that can never carry flux are removed: those fixed at zero by their bounds,
+        those consuming or producing a dead-end metabolite (one that cannot be both produced
+        and consumed at steady state), and those with no flux in any steady state. reactions
+        whose fluxes are fully coupled (always in fixed ratio, as in a linear pathway) are
+        lumped into a single reaction, named after the first of them, with suffix _lumped.
+        metabolites left in no reaction are removed. blocked may name further reactions
+        (or reaction ids) known to be blocked.
+
+        the bounds and objective of the original are folded into the reduced model when it is
+        made, so changes to them afterwards require compressing afresh. lumped reactions
+        require all the genes of their members. the mapping is stored as model.compression
+        (see Compression), and the original as model.original; decompress() expands results
+        found on the reduced model back onto the reactions of the original.
+
+        minimising the norm of the fluxes of the reduced model counts each lumped reaction
+        once, so such solutions need not match those of the original"""
+
+    matrix = original.matrix()
+
+    compression = Compression(matrix, blocked, tolerance)
+
+    model = MetaModel(id=original.id, name=original.name,
+                      metabolites=_MetaboliteDict(), reactions=_ReactionDict(),
+                      compartments=original.compartment, genes=_GeneDict(original.gene),
+                      unit_definitions=OrderedDict(original.unit_definition))
+
+    for i in np.flatnonzero(compression.rows >= 0):
+        metabolite = copy(original.metabolite[matrix.metabolite_ids[i]])
+        metabolite.participations = _Coefficients()
+        metabolite.notes          = copy(metabolite.notes)
+        metabolite.lp_constr      = None
+        model.metabolite.add(metabolite)
+
+    reduced = compression.reduced
+    members = compression.members()
+    S       = reduced.S.tocsc()
+
+    for k, rid in enumerate(reduced.reaction_ids):
+
+        first = original.reaction[matrix.reaction_ids[members[k][0]]]
+
+        reaction = Reaction(rid, name=first.name if len(members[k]) == 1 else rid,
+                            reversible=bool(reduced.reversible[k]))
+
+        reaction.lower_bound           = reduced.lower_bounds[k]
+        reaction.upper_bound           = reduced.upper_bounds[k]
+        reaction.default_bounds        = (reaction.lower_bound, reaction.upper_bound)
+        reaction.objective_coefficient = reduced.objective[k]
+
+        if len(members[k]) == 1:
+            reaction.notes = copy(first.notes)
+            reaction.genes = copy(first.genes)
+        else:
+            lumped = [original.reaction[matrix.reaction_ids[j]] for j in members[k]]
+            gprs   = [r.notes.get('GENE_ASSOCIATION', '') for r in lumped]
+            reaction.notes = {'GENE_ASSOCIATION': ' and '.join(['( %s )' % gpr for gpr in gprs
+                                                                if gpr.strip()])}
+            reaction.genes = [g for r in lumped for g in r.genes]
+
+        reaction.notes['original_rids']            = [matrix.reaction_ids[j] for j in members[k]]
+        reaction.notes['original_rid_multipliers'] = compression.ratios[members[k]].tolist()
+
+        start, stop = S.indptr[k], S.indptr[k + 1]
+        for i, stoichiometry in zip(S.indices[start:stop], S.data[start:stop]):
+            reaction.add_participant(model.metabolite[reduced.metabolite_ids[i]], stoichiometry)
+
+        model.reaction.add(reaction)
+
+    model.original    = original
+    model.compression = compression
+
+    return model
+
+
+def decompress(model, solution=None):
+    """expand a Solution found on a compressed model (by default, the flux values of its
+        reactions) into one over the reactions of the original model, written back into it.
+        blocked reactions carry no flux. returns the expanded Solution"""
+
+    compression = model.compression
+
+    if solution is None:
+        fluxes   = np.array([r.flux_value for r in model.reactions()], dtype=float)
+        solution = Solution(compression.reduced, fluxes=fluxes,
+                            objective_value=getattr(model, 'total_objective', None))
+
+    expanded = compression.expand_solution(solution)
+    expanded.write_back(model.original)
+
+    return expanded
+
+
+class Compression(object):
+    """the mapping between the reactions of a StoichiometricMatrix and those of its
+        compressed form (see compress), as arrays
+
+        each original reaction j carries flux ratios[j] times that of reduced reaction
+        columns[j], or is blocked (columns[j] == -1). each original metabolite i is row rows[i]
+        of the reduced matrix, or -1 where removed. reduced holds the reduced matrix itself,
+        and expansion the sparse matrix taking fluxes of the reduced reactions to the original"""
+    def __init__(self, matrix, blocked=None, tolerance=1e-9):
+        from scipy import sparse
+
+        self.original  = matrix
+        self.tolerance = tolerance
+
+        n = len(matrix.reaction_ids)
+
+        lower_bounds = _lp_lower_bounds(matrix)
+        upper_bounds = matrix.upper_bounds
+
+        # reactions fixed at zero by their bounds, and any the caller knows to be blocked
+        self.blocked = (np.abs(lower_bounds) <= tolerance) & (np.abs(upper_bounds) <= tolerance)
+        if blocked is not None:
+            self.blocked[matrix.reaction_indices(blocked)] = True
+
+        S = matrix.constrained().tocsc()
+
+        self._block_dead_ends(S, lower_bounds, upper_bounds)
+
+        # fluxes at steady state are combinations of a basis of the null space of S, so
+        # reactions with zero rows in that basis are blocked, and proportional rows are coupled
+        active  = np.flatnonzero(~self.blocked)
+        basis   = _null_space(S[:, active].toarray(), tolerance)
+        norms   = np.sqrt((basis ** 2).sum(axis=1))
+        blocked = norms <= tolerance
+
+        self.blocked[active[blocked]] = True
+
+        self._block_dead_ends(S, lower_bounds, upper_bounds)
+
+        keep   = ~self.blocked[active]
+        active = active[keep]
+        basis  = basis[keep] / norms[keep, np.newaxis]
+        norms  = norms[keep]
+
+        self.columns = -np.ones(n, dtype=int)
+        self.ratios  = np.zeros(n)
+
+        # rows are coupled where they are parallel as unit vectors, to within a distance of
+        # 1e-6 (such that the scaling of the basis found by the SVD is of no account). each
+        # group is made of the rows parallel to its first, the cosine between unit rows u and
+        # v being 1 - |u - v|**2 / 2
+        remaining = np.arange(len(active))
+        groups    = 0
+        while len(remaining):
+            first   = remaining[0]
+            cosines = basis[remaining].dot(basis[first])
+            coupled = np.abs(cosines) >= 1.0 - 0.5 * 1e-6 ** 2
+
+            rows = remaining[coupled]
+            self.columns[active[rows]] = groups
+            self.ratios[active[rows]]  = np.sign(cosines[coupled]) * norms[rows] / norms[first]
+
+            groups   += 1
+            remaining = remaining[~coupled]
+
+        unblocked = np.flatnonzero(self.columns >= 0)
+
+        self.expansion = sparse.csr_matrix((self.ratios[unblocked],
+                                            (unblocked, self.columns[unblocked])),
+                                           shape=(n, groups))
+
+        self.reduced = self._reduced_matrix(matrix, lower_bounds, upper_bounds)
+
+    def _block_dead_ends(self, S, lower_bounds, upper_bounds):
+        """block, until none remain, the reactions of metabolites that the unblocked reactions
+            can only produce or only consume"""
+
+        positive = (S > 0).astype(float)
+        negative = (S < 0).astype(float)
+        touches  = (S != 0).astype(float)
+
+        while True:
+            forward  = ((upper_bounds > self.tolerance) & ~self.blocked).astype(float)
+            backward = ((lower_bounds < -self.tolerance) & ~self.blocked).astype(float)
+
+            produced = positive.dot(forward) + negative.dot(backward) > 0
+            consumed = negative.dot(forward) + positive.dot(backward) > 0
+
+            dead = ~(produced & consumed)
+
+            blocked = (touches[np.flatnonzero(dead), :].sum(axis=0).A1 > 0) & ~self.blocked
+            if not blocked.any():
+                return
+            self.blocked |= blocked
+
+    def _reduced_matrix(self, matrix, lower_bounds, upper_bounds):
+        """docstring for _reduced_matrix"""
+        from scipy import sparse
+
+        k       = self.expansion.shape[1]
+        members = self.members()
+
+        S = sparse.csc_matrix(matrix.S.dot(self.expansion))
+        S.data[np.abs(S.data) <= self.tolerance] = 0.0
+        S.eliminate_zeros()
+
+        # the bounds of a lumped reaction are the tightest its members allow
+        lower = -np.infty * np.ones(k)
+        upper = np.infty * np.ones(k)
+        for j in np.flatnonzero(self.columns >= 0):
+            ratio  = self.ratios[j]
+            bounds = sorted([lower_bounds[j] / ratio, upper_bounds[j] / ratio])
+            lower[self.columns[j]] = max(lower[self.columns[j]], bounds[0])
+            upper[self.columns[j]] = min(upper[self.columns[j]], bounds[1])
+
+        objective = self.expansion.T.dot(matrix.objective)
+
+        # metabolites in none of the remaining reactions are dropped
+        kept      = np.flatnonzero(np.diff(S.tocsr().indptr) > 0)
+        self.rows = -np.ones(len(matrix.metabolite_ids), dtype=int)
+        self.rows[kept] = np.arange(len(kept))
+
+        reaction_ids = [matrix.reaction_ids[m[0]] + ('_lumped' if len(m) > 1 else '')
+                        for m in members]
+
+        return StoichiometricMatrix.from_arrays(S.tocsr()[kept, :], reaction_ids,
+                                                [matrix.metabolite_ids[i] for i in kept],
+                                                matrix.boundary[kept], lower < 0.0,
+                                                lower, upper, objective)
+
+    def members(self):
+        """the indices of the original reactions lumped into each reduced reaction"""
+        order = np.argsort(self.columns, kind='mergesort')
+        order = order[self.columns[order] >= 0]
+        return np.split(order, np.flatnonzero(np.diff(self.columns[order])) + 1)
+
+    def expand(self, values):
+        """the fluxes of the original reactions, from those of the reduced reactions
+            (an array over reduced reactions, or of samples by reduced reactions)"""
+        return self.expansion.dot(np.asarray(values, dtype=float).T).T
+
+    def expand_ranges(self, ranges):
+        """the (min, max) flux ranges of the original reactions, from those of the reduced"""
+
+        ranges   = np.asarray(ranges, dtype=float)
+        expanded = np.zeros((len(self.columns), 2))
+
+        unblocked = np.flatnonzero(self.columns >= 0)
+        scaled    = ranges[self.columns[unblocked]] * self.ratios[unblocked, np.newaxis]
+
+        expanded[unblocked, 0] = scaled.min(axis=1)
+        expanded[unblocked, 1] = scaled.max(axis=1)
+
+        # the range of a reaction whose lumped reaction was not analysed is unknown
+        expanded[unblocked[np.isnan(scaled).any(axis=1)]] = np.nan
+
+        return expanded
+
+    def expand_solution(self, solution):
+        """a Solution over the reactions and metabolites of the original, from one found on
+            the reduced matrix. reduced costs carry over to reactions that were not lumped,
+            shadow prices to metabolites that were not removed"""
+
+        matrix = self.original
+
+        expanded = Solution(matrix, solution.status, solution.objective_value)
+
+        if solution.fluxes is not None:
+            expanded.fluxes = self.expand(solution.fluxes)
+
+        if solution.flux_ranges is not None:
+            expanded.flux_ranges = self.expand_ranges(solution.flux_ranges)
+
+        if solution.reduced_costs is not None:
+            sizes  = np.bincount(self.columns[self.columns >= 0],
+                                 minlength=len(solution.reduced_costs))
+            single = np.flatnonzero(self.columns >= 0)
+            single = single[sizes[self.columns[single]] == 1]
+
+            expanded.reduced_costs = np.nan * np.ones(len(matrix.reaction_ids))
+            expanded.reduced_costs[single] = solution.reduced_costs[self.columns[single]]
+
+        if solution.shadow_prices is not None:
+            kept = np.flatnonzero(self.rows >= 0)
+
+            expanded.shadow_prices = np.nan * np.ones(len(matrix.metabolite_ids))
+            expanded.shadow_prices[kept] = solution.shadow_prices[self.rows[kept]]
+
+        return expanded
+
+
+def _null_space(A, tolerance):
+    """an orthonormal basis of the null space of a dense array, as columns"""
+
+    if A.shape[0] == 0:
+        return np.eye(A.shape[1])
+
+    _, s, V = np.linalg.svd(A, full_matrices=True)
+    rank    = int((s > tolerance * max(1.0, s.max())).sum())
+
+    return V[rank:].T
@@ -0,0 +1,133 @@
+import numpy as np
+
+from ..tools import get_exchange_reactions
+from .LP import get_lp_session, build_matrix_lp
+from .FVA import _flux_ranges
+from .solvers import OPTIMAL, MAXIMIZE
+
+
+def production_envelope(model, reactions, points=20, ranges=None, objective=None, processes=1,
+                        solver=None):
+    """the maximum of the objective over a grid of fixed fluxes through one or two exchange
+        reactions (or reaction ids), as in a phenotypic phase plane
+
+        each reaction is swept over points evenly spaced values from ranges (a (min, max) pair
+        per reaction), by default the full range its flux may take. objective names a reaction
+        to maximise in place of the model's own objective.
+
+        the points are solved one after another on the LP attached to the model, fixing the
+        bounds of the swept reactions in turn. with two reactions, alternate rows of the grid
+        are swept in opposite directions, such that every solve starts from the basis of a
+        neighbouring point. with processes > 1, the rows of the grid are instead shared
+        between a pool of worker processes, each with its own LP.
+
+        returns an array of points by 2 (the flux swept, then the objective), or with two
+        reactions, of points by points by 3. the objective is nan where a point is infeasible"""
+
+    exchanges = set([r.id for r in get_exchange_reactions(model)])
+
+    rids = [getattr(r, 'id', r) for r in reactions]
+    if len(rids) not in (1, 2):
+        raise Exception('an envelope sweeps the fluxes of one or two reactions')
+    for rid in rids:
+        if rid not in exchanges:
+            raise Exception('%s is not an exchange reaction' % rid)
+
+    session = get_lp_session(model, solver=solver)
+
+    matrix = model.matrix()
+    swept  = matrix.reaction_indices(rids)
+
+    if objective is None:
+        linear = matrix.objective.copy()
+    else:
+        linear = np.zeros(len(matrix.reaction_ids))
+        linear[matrix.reaction_index[getattr(objective, 'id', objective)]] = 1.0
+
+    # the bounds of the swept reactions, and the objective, are restored by the next sync()
+    session.mark_dirty([model.reaction[rid] for rid in rids])
+
+    if ranges is None:
+        ranges, _ = _flux_ranges(model.lp, session.columns, swept, prune=False)
+        session.objective_replaced = True
+
+    axes = [np.linspace(lower_bound, upper_bound, points) for (lower_bound, upper_bound) in ranges]
+
+    if processes > 1:
+        values = _parallel_sweep(matrix, linear, swept, axes, processes, type(model.lp))
+    else:
+        session.set_objective(MAXIMIZE, linear=linear)
+        values = _sweep(model.lp, session.columns[swept], axes, range(len(axes[0])))
+
+    grid = np.meshgrid(*axes, indexing='ij')
+
+    if len(axes) == 1:
+        return np.column_stack([grid[0], values[:, 0]])
+
+    return np.stack(grid + [values], axis=-1)
+
+
+def _sweep(lp, columns, axes, rows):
+    """the objective at each point of the given rows of the grid (along the first axis),
+        as an array of rows by points along the second axis (or by 1)"""
+
+    values = np.nan * np.ones((len(rows), len(axes[1]) if len(axes) > 1 else 1))
+
+    for k, i in enumerate(rows):
+
+        if len(axes) == 1:
+            order = [None]
+        else:
+            # alternate rows run backwards, so that each point neighbours the last
+            order = range(len(axes[1]))
+            order = order if i % 2 == 0 else list(reversed(order))
+
+        for j in order:
+
+            fixed = [axes[0][i]] if j is None else [axes[0][i], axes[1][j]]
+            lp.set_bounds(columns, fixed, fixed)
+
+            if lp.solve() == OPTIMAL:
+                values[k, 0 if j is None else j] = lp.objective_value()
+
+    return values
+
+
+def _parallel_sweep(matrix, linear, swept, axes, processes, solver=None):
+    """docstring for _parallel_sweep"""
+
+    from multiprocessing import Pool
+
+    # rows are dealt out in contiguous chunks, so that each worker sweeps neighbouring points
+    chunks = [list(c) for c in np.array_split(np.arange(len(axes[0])), processes) if len(c)]
+
+    pool = Pool(processes, initializer=_initialise_worker,
+                initargs=(matrix, linear, swept, axes, solver))
+    try:
+        results = pool.map(_worker_sweep, chunks)
+    finally:
+        pool.close()
+        pool.join()
+
+    return np.vstack(results)
+
+
+# each worker process holds its own LP, built once by _initialise_worker
+_worker = {}
+
+
+def _initialise_worker(matrix, linear, swept, axes, solver):
+    """docstring for _initialise_worker"""
+
+    lp, columns = build_matrix_lp(matrix, 'envelope_worker', private_env=True, solver=solver)
+
+    lp.set_objective(linear=linear, sense=MAXIMIZE)
+
+    _worker['lp']      = lp
+    _worker['columns'] = columns[swept]
+    _worker['axes']    = axes
+
+
+def _worker_sweep(rows):
+    """docstring for _worker_sweep"""
+    return _sweep(_worker['lp'], _worker['columns'], _worker['axes'], rows)
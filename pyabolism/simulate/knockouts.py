@@ -0,0 +1,213 @@
+from collections import OrderedDict
+from itertools import combinations
+
+import numpy as np
+
+from ..tools import compile_GPRs
+
+from .LP import get_lp_session, build_matrix_lp
+from .solvers import OPTIMAL
+
+
+def single_reaction_deletions(model, reactions=None, processes=1, solver=None):
+    """the objective value achieved with each reaction (or reaction id) deleted in turn,
+        as an OrderedDict keyed on reaction id. infeasible deletions are reported as nan"""
+
+    reaction_ids = _ids(reactions if reactions is not None else model.reactions())
+
+    matrix    = model.matrix()
+    deletions = [[matrix.reaction_index[rid]] for rid in reaction_ids]
+
+    return OrderedDict(zip(reaction_ids, _screen(model, deletions, processes, solver)))
+
+
+def double_reaction_deletions(model, reactions=None, processes=1, solver=None):
+    """the objective value achieved with every pair of reactions deleted,
+        as an OrderedDict keyed on (reaction id, reaction id)"""
+
+    reaction_ids = _ids(reactions if reactions is not None else model.reactions())
+
+    pairs     = list(combinations(reaction_ids, 2))
+    matrix    = model.matrix()
+    deletions = [[matrix.reaction_index[a], matrix.reaction_index[b]] for (a, b) in pairs]
+
+    return OrderedDict(zip(pairs, _screen(model, deletions, processes, solver)))
+
+
+def single_gene_deletions(model, genes=None, processes=1, solver=None):
+    """the objective value achieved with each gene deleted in turn, as an OrderedDict keyed
+        on gene id. the genes default to every gene named in a GENE_ASSOCIATION"""
+
+    gpr = _GeneReactionMap(model)
+
+    gene_ids = _ids(genes) if genes is not None else gpr.genes
+
+    deletions = gpr.knocked_out([[gid] for gid in gene_ids])
+
+    return OrderedDict(zip(gene_ids, _screen(model, deletions, processes, solver)))
+
+
+def double_gene_deletions(model, genes=None, processes=1, solver=None):
+    """the objective value achieved with every pair of genes deleted,
+        as an OrderedDict keyed on (gene id, gene id)"""
+
+    gpr = _GeneReactionMap(model)
+
+    gene_ids = _ids(genes) if genes is not None else gpr.genes
+
+    pairs     = list(combinations(gene_ids, 2))
+    deletions = gpr.knocked_out(pairs)
+
+    return OrderedDict(zip(pairs, _screen(model, deletions, processes, solver)))
+
+
+def _ids(elements):
+    """docstring for _ids"""
+    return [getattr(element, 'id', element) for element in elements]
+
+
+class _GeneReactionMap(object):
+    """the compiled GPRs of a model (see tools.compile_GPRs) and its gene incidence (see
+        MetaModel.gene_incidence), for finding the reactions disabled by sets of gene deletions"""
+    def __init__(self, model):
+
+        self.gprs      = compile_GPRs(model)
+        self.incidence = model.gene_incidence()
+        self.index     = model.matrix().reaction_index
+
+        # genes are listed in order of their first appearance in a GENE_ASSOCIATION
+        self.genes = list(self.gprs.genes)
+
+        # the columns disabled by deleting each gene alone, found on first use
+        self.singles = {}
+
+    def knocked_out(self, deletions, chunk=256):
+        """for each set of deleted genes, the columns of S for reactions that can no longer run
+
+            only reactions whose GPR names a deleted gene can be disabled. those disabled by
+            deleting one of the genes alone are found for every gene at once, chunk at a time,
+            leaving only the GPRs naming two or more of the genes of a set to be evaluated
+            for that set"""
+
+        deletions = [[gid for gid in set(deleted) if gid in self.gprs.gene_index]
+                     for deleted in deletions]
+
+        genes = set([gid for deleted in deletions for gid in deleted]) - set(self.singles)
+        genes = [gid for gid in self.genes if gid in genes]
+        for start in range(0, len(genes), chunk):
+            active = self.gprs.active([[gid] for gid in genes[start:start + chunk]])
+            for gid, row in zip(genes[start:start + chunk], active):
+                self.singles[gid] = set(np.flatnonzero(~row).tolist())
+
+        knocked = []
+        for deleted in deletions:
+
+            columns = set()
+            for gid in deleted:
+                columns |= self.singles[gid]
+
+            if len(deleted) > 1:
+                # reactions named by more than one of the genes may need them all deleted
+                seen   = set()
+                shared = set()
+                for gid in deleted:
+                    for rid in self.incidence.genes.get(gid, []):
+                        (shared if rid in seen else seen).add(rid)
+
+                columns.update([self.index[rid] for rid in shared
+                                if self.index[rid] not in columns
+                                and not self.gprs.satisfied(self.index[rid], deleted)])
+
+            knocked.append(sorted(columns))
+
+        return knocked
+
+
+def _screen(model, deletions, processes, solver=None):
+    """the objective values of the model under each set of deleted columns"""
+
+    # gene deletions that disable no reactions need no LP of their own
+    unique = sorted(set([tuple(columns) for columns in deletions if columns]))
+
+    if processes > 1:
+        values = _parallel_knockout_objectives(model.matrix(), unique, processes, solver)
+    else:
+        session = get_lp_session(model, solver=solver)
+        values  = _knockout_objectives(session.lp, session.columns, unique)
+
+    objectives = dict(zip(unique, values))
+
+    if len(unique) < len(deletions):
+        session = get_lp_session(model, solver=solver)
+        objectives[()] = _objective_value(session.lp, session.lp.solve())
+
+    return [objectives[tuple(columns)] for columns in deletions]
+
+
+def _knockout_objectives(lp, columns, deletions):
+    """fix the fluxes of each set of reaction indices to zero in turn, solve the LP,
+        and restore their bounds; the LP is left exactly as it was found"""
+
+    values = np.empty(len(deletions))
+
+    for k, indices in enumerate(deletions):
+
+        knocked = [columns[j] for j in indices]
+
+        lower_bounds, upper_bounds = lp.get_bounds(knocked)
+
+        lp.set_bounds(knocked, np.zeros(len(knocked)), np.zeros(len(knocked)))
+
+        values[k] = _objective_value(lp, lp.solve())
+
+        lp.set_bounds(knocked, lower_bounds, upper_bounds)
+
+    return values
+
+
+def _objective_value(lp, status):
+    """docstring for _objective_value"""
+    if status == OPTIMAL:
+        return lp.objective_value()
+    return np.nan
+
+
+def _parallel_knockout_objectives(matrix, deletions, processes, solver=None):
+    """docstring for _parallel_knockout_objectives"""
+
+    from multiprocessing import Pool
+
+    if not deletions:
+        return []
+
+    n_chunks = min(len(deletions), 4 * processes)
+    bounds   = np.linspace(0, len(deletions), n_chunks + 1).astype(int)
+    chunks   = [deletions[bounds[i]:bounds[i + 1]] for i in range(n_chunks)]
+
+    pool = Pool(processes, initializer=_initialise_worker, initargs=(matrix, solver))
+    try:
+        results = pool.map(_worker_knockout_objectives, chunks)
+    finally:
+        pool.close()
+        pool.join()
+
+    return np.concatenate(results)
+
+
+# each worker process holds its own LP, built once by _initialise_worker
+_worker = {}
+
+
+def _initialise_worker(matrix, solver):
+    """docstring for _initialise_worker"""
+
+    lp, columns = build_matrix_lp(matrix, 'knockout_worker', private_env=True, solver=solver)
+
+    _worker['lp']      = lp
+    _worker['columns'] = columns
+
+
+def _worker_knockout_objectives(deletions):
+    """docstring for _worker_knockout_objectives"""
+
+    return _knockout_objectives(_worker['lp'], _worker['columns'], deletions)
@@ -0,0 +1,214 @@
+import numpy as np
+
+from .LP import build_matrix_lp, _lp_lower_bounds
+from .solvers import OPTIMAL, MAXIMIZE, MINIMIZE
+
+
+def sample(model, n, chains=8, thinning=100, processes=1, output=None, warmup=None, seed=None,
+           solver=None):
+    """n samples of the fluxes of a model, drawn from the space of steady states within its
+        bounds by artificial centering hit-and-run (in the parallel form of optGpSampler)
+
+        every chain starts at the center of the warmup points (by default, the minimum and
+        maximum of each flux in turn, found by LP) and moves along the direction from that
+        center to a randomly chosen warmup point, to a point drawn uniformly from the feasible
+        segment. the chains advance together as arrays, keeping one sample in every thinning
+        steps. with processes > 1, the chains are shared between a pool of worker processes.
+
+        returns an array of n samples by reactions. where output names a file, the samples
+        are instead streamed into it as they are drawn, in .npy format, and the array returned
+        is memory-mapped from it. warmup may give the warmup points (points by reactions)
+        of an earlier run, to be reused"""
+
+    matrix = model.matrix()
+
+    if warmup is None:
+        warmup = warmup_points(matrix, solver=solver)
+
+    sampler = _Sampler(matrix, warmup)
+
+    if output is not None:
+        samples = np.lib.format.open_memmap(output, mode='w+', dtype=float,
+                                            shape=(n, len(matrix.reaction_ids)))
+    else:
+        samples = np.empty((n, len(matrix.reaction_ids)))
+
+    seed = np.random.randint(2**31 - 1) if seed is None else seed
+
+    # the chains, and the samples they are to draw, are shared as evenly as possible
+    processes = max(1, min(processes, chains, n))
+    rows      = np.linspace(0, n, processes + 1).astype(int)
+    blocks    = [(rows[i], rows[i + 1], len(c), seed + i)
+                 for (i, c) in enumerate(np.array_split(np.arange(chains), processes))]
+
+    if processes > 1:
+        from multiprocessing import Pool
+
+        pool = Pool(processes, initializer=_initialise_worker, initargs=(sampler, thinning, output))
+        try:
+            results = pool.map(_worker_sample, blocks)
+        finally:
+            pool.close()
+            pool.join()
+
+        if output is None:
+            for (start, stop, _, _), result in zip(blocks, results):
+                samples[start:stop] = result
+
+    else:
+        for start, stop, n_chains, block_seed in blocks:
+            sampler.run(samples[start:stop], n_chains, thinning, block_seed)
+
+    if output is not None:
+        samples.flush()
+
+    return samples
+
+
+def warmup_points(matrix, solver=None):
+    """the solutions found minimising and then maximising each flux of a StoichiometricMatrix
+        in turn, as an array of points by reactions. fluxes that cannot vary are skipped"""
+
+    lp, columns = build_matrix_lp(matrix, 'warmup', solver=solver)
+
+    lp.set_objective()
+
+    points   = []
+    previous = None
+    for column in columns:
+
+        if previous is not None:
+            lp.set_objective_coefficients([previous], [0.0])
+        lp.set_objective_coefficients([column], [1.0])
+        previous = column
+
+        extremes = []
+        for sense in [MINIMIZE, MAXIMIZE]:
+            lp.set_sense(sense)
+            if lp.solve() == OPTIMAL:
+                extremes.append(lp.primal_values(columns))
+
+        if len(extremes) == 2 and not np.allclose(extremes[0], extremes[1]):
+            points.extend(extremes)
+
+    if not points:
+        raise Exception('no fluxes of the model can vary; there is nothing to sample')
+
+    return np.array(points)
+
+
+class _Sampler(object):
+    """the arrays defining the space of steady states, for hit-and-run from warmup points"""
+    def __init__(self, matrix, warmup, tolerance=1e-9):
+
+        self.warmup    = np.asarray(warmup, dtype=float)
+        self.center    = self.warmup.mean(axis=0)
+        self.tolerance = tolerance
+
+        lower_bounds = _lp_lower_bounds(matrix)
+        upper_bounds = matrix.upper_bounds.copy()
+
+        # infinite bounds are replaced by the largest finite one, such that every line
+        # through the space meets its boundary
+        finite = np.abs(np.concatenate([lower_bounds, upper_bounds]))
+        finite = finite[np.isfinite(finite)]
+        limit  = finite.max() if len(finite) else 1e3
+
+        self.lower_bounds = np.maximum(lower_bounds, -limit)
+        self.upper_bounds = np.minimum(upper_bounds, limit)
+
+        # an orthonormal basis of the null space of the steady-state constraints,
+        # onto which the chains are projected to correct numerical drift
+        S       = matrix.constrained().toarray()
+        _, s, V = np.linalg.svd(S, full_matrices=True)
+        rank    = int((s > tolerance * max(1.0, s.max() if len(s) else 1.0)).sum())
+
+        self.null_space = V[rank:].T
+
+    def run(self, samples, chains, thinning, seed):
+        """fill samples (an array of samples by reactions) from chains run together"""
+
+        random = np.random.RandomState(seed)
+
+        points = np.tile(self.center, (chains, 1))
+
+        taken = 0
+        while taken < len(samples):
+
+            for _ in range(thinning):
+                points = self.step(points, random)
+
+            points = self.project(points)
+
+            k = min(chains, len(samples) - taken)
+            samples[taken:taken + k] = points[:k]
+            taken += k
+
+        return samples
+
+    def step(self, points, random):
+        """move every point along the direction from the center to a random warmup point"""
+
+        directions = self.warmup[random.randint(len(self.warmup), size=len(points))] - self.center
+
+        positive = directions > self.tolerance
+        negative = directions < -self.tolerance
+
+        # the steps that take each flux to its upper and lower bounds
+        with np.errstate(divide='ignore', invalid='ignore'):
+            to_upper = (self.upper_bounds - points) / directions
+            to_lower = (self.lower_bounds - points) / directions
+
+        largest  = np.where(positive, to_upper, np.where(negative, to_lower, np.infty)).min(axis=1)
+        smallest = np.where(positive, to_lower, np.where(negative, to_upper, -np.infty)).max(axis=1)
+
+        # points within rounding error of a bound may give a segment that excludes themselves
+        largest  = np.maximum(largest, 0.0)
+        smallest = np.minimum(smallest, 0.0)
+
+        steps = smallest + random.rand(len(points)) * (largest - smallest)
+
+        return points + steps[:, np.newaxis] * directions
+
+    def project(self, points):
+        """return points to the steady-state space, correcting the drift of the steps
+
+            the steps themselves keep points within bounds, so the projection only moves them
+            by rounding error. a point whose projection would leave the bounds is kept as it
+            is, rather than clipped (which would take it off the steady-state space again)"""
+
+        projected = np.dot(np.dot(points, self.null_space), self.null_space.T)
+
+        within = ((projected >= self.lower_bounds - self.tolerance) &
+                  (projected <= self.upper_bounds + self.tolerance)).all(axis=1)
+
+        return np.where(within[:, np.newaxis], projected, points)
+
+
+# each worker process holds the sampler, and writes to the output file if there is one
+_worker = {}
+
+
+def _initialise_worker(sampler, thinning, output):
+    """docstring for _initialise_worker"""
+
+    _worker['sampler']  = sampler
+    _worker['thinning'] = thinning
+    _worker['output']   = output
+
+
+def _worker_sample(args):
+    """docstring for _worker_sample"""
+
+    start, stop, chains, seed = args
+
+    sampler  = _worker['sampler']
+    thinning = _worker['thinning']
+
+    if _worker['output'] is not None:
+        samples = np.load(_worker['output'], mmap_mode='r+')
+        sampler.run(samples[start:stop], chains, thinning, seed)
+        samples.flush()
+        return None
+
+    return sampler.run(np.empty((stop - start, len(sampler.center))), chains, thinning, seed)
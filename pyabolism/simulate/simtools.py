@@ -1,18 +1,50 @@
 
-from copy import copy, deepcopy
+from copy import copy
+
+import numpy as np
 
 from ..model import Reaction
 
 
+def split_directions(matrix):
+    """the irreversible directions of the reactions of a StoichiometricMatrix
+
+        this is the array form of irreversify, making no copy of the model. every reaction
+        runs forwards, and reversible reactions also backwards, directly after. returns for each
+        direction the index of its reaction, its sign (1.0 forwards, -1.0 backwards) and its
+        (non-negative) lower and upper bounds"""
+
+    n = len(matrix.reaction_ids)
+
+    reactions = np.concatenate([np.arange(n), np.flatnonzero(matrix.reversible)])
+    signs     = np.concatenate([np.ones(n), -np.ones(len(reactions) - n)])
+
+    # the backward direction is bounded by the magnitudes of the negative bounds
+    lower_bounds = np.where(signs > 0, np.maximum(0.0, matrix.lower_bounds[reactions]),
+                            np.abs(np.minimum(0.0, matrix.upper_bounds[reactions])))
+    upper_bounds = np.where(signs > 0, np.maximum(0.0, matrix.upper_bounds[reactions]),
+                            np.abs(np.minimum(0.0, matrix.lower_bounds[reactions])))
+
+    # a stable sort places each backward direction alongside its forward one
+    order = np.argsort(reactions, kind='mergesort')
+
+    return reactions[order], signs[order], lower_bounds[order], upper_bounds[order]
+
+
+def merge_directions(values, reactions, signs, n):
+    """the net flux of each of n reactions, from the values of their irreversible directions
+        (the array form of deirreversify)"""
+    return np.bincount(reactions, weights=signs * np.asarray(values, dtype=float), minlength=n)
+
+
 def irreversify(original):
+    """a copy of the model in which every reaction is irreversible, reversible reactions
+        being replaced by a forward (_f) and backward (_b) pair
 
-    original.lp = None
-    for r in original.reactions():
-        r.lp_var = None
-    for m in original.metabolites():
-        m.lp_constr = None
+        the simulations of pyabolism no longer make this copy, splitting fluxes within the LP
+        instead (see split_directions and LP.add_negative_parts)"""
 
-    model = deepcopy(original)
+    model = original.copy()
 
     model.original = original
 
@@ -78,6 +110,7 @@ def irreversify(original):
 
 
 def deirreversify(model):
+    """sum the fluxes of an irreversified model back into its original"""
 
     original = model.original
 
@@ -103,34 +136,31 @@ def unidirectionise_duplicates(model):
     in splitting reversible reactions into foward and backward components),s
     can be constrained such that only one runs at a time."""
 
-    from gurobipy import GRB
+    from .solvers import LESS_EQUAL
 
     # for good measure, we use the naming convention of _f and _b to indicate duplicated
     # reactions, and ensure that only one of them runs at a time
     from collections import defaultdict
     paired_reactions = defaultdict(list)
-    for r in model.reactions():
+    for r, column in zip(model.reactions(), model.lp_columns):
         if 'original_rid' in r.notes:
-            paired_reactions[r.notes['original_rid']].append(r.lp_var)
+            paired_reactions[r.notes['original_rid']].append(column)
 
     constant = 1e1
 
-    for orid, variables in paired_reactions.items():
+    for orid, columns in paired_reactions.items():
 
         # it shouldn't be possible for the number of paired reactions to be more than 2
-        assert len(variables) < 3
+        assert len(columns) < 3
 
         # we only need to worry about additional constraint if there are two paired reactions
-        if len(variables) == 2:
-
-            bin_var = model.lp.addVar(0.0, 1.0, 0.0, GRB.BINARY, orid + '_binary')
-
-            model.lp.update()
+        if len(columns) == 2:
 
-            model.lp.addConstr(variables[0] - constant * bin_var,
-                               GRB.LESS_EQUAL, 0.0, model.name + orid + 'directional_1')
+            binary = model.lp.add_variables([0.0], [1.0], [0.0],
+                                            names=[orid + '_binary'], integer=True)[0]
 
-            model.lp.addConstr(variables[1] - constant + constant * bin_var,
-                               GRB.LESS_EQUAL, 0.0, model.name + orid + 'directional_2')
+            model.lp.add_constraint([columns[0], binary], [1.0, -constant],
+                                    LESS_EQUAL, 0.0, model.name + orid + 'directional_1')
 
-    model.lp.update()
+            model.lp.add_constraint([columns[1], binary], [1.0, constant],
+                                    LESS_EQUAL, constant, model.name + orid + 'directional_2')
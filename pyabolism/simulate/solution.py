@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class Solution(object):
+    """the result of a simulation, held as arrays rather than as attributes of the model
+
+        fluxes and reduced_costs are arrays over reaction_ids, shadow_prices an array over
+        metabolite_ids (nan for unconstrained metabolites, or where the solver provides no
+        duals) and flux_ranges an array of (min, max) rows over reaction_ids (nan for
+        reactions not analysed). any of these may be None where the simulation does not
+        provide them.
+
+        the ids and their indices are shared with the StoichiometricMatrix of the model,
+        such that the solutions of many runs cost little more than their arrays, and may be
+        stacked (see stack). write_back() copies the results into the model's objects, as
+        the simulations themselves do by default"""
+    def __init__(self, matrix, status=None, objective_value=None, fluxes=None,
+                 reduced_costs=None, shadow_prices=None, flux_ranges=None):
+
+        self.reaction_ids     = matrix.reaction_ids
+        self.metabolite_ids   = matrix.metabolite_ids
+        self.reaction_index   = matrix.reaction_index
+        self.metabolite_index = matrix.metabolite_index
+
+        self.status          = status
+        self.objective_value = objective_value
+        self.fluxes          = fluxes
+        self.reduced_costs   = reduced_costs
+        self.shadow_prices   = shadow_prices
+        self.flux_ranges     = flux_ranges
+
+    def __repr__(self):
+        if self.objective_value is None:
+            return '<Solution %s>' % self.status
+        return '<Solution %s : objective %.6g>' % (self.status, self.objective_value)
+
+    def flux(self, reaction):
+        """the flux of a reaction (or reaction id)"""
+        return self.fluxes[self.reaction_index[getattr(reaction, 'id', reaction)]]
+
+    def flux_range(self, reaction):
+        """the (min, max) flux of a reaction (or reaction id)"""
+        return tuple(self.flux_ranges[self.reaction_index[getattr(reaction, 'id', reaction)]])
+
+    def shadow_price(self, metabolite):
+        """the shadow price of a metabolite (or metabolite id)"""
+        return self.shadow_prices[self.metabolite_index[getattr(metabolite, 'id', metabolite)]]
+
+    def to_frame(self, metabolites=False):
+        """a pandas DataFrame of the results for each reaction (or each metabolite),
+            with one column per result available"""
+        import pandas as pd
+
+        if metabolites:
+            return pd.DataFrame({'shadow_price': self.shadow_prices}, index=self.metabolite_ids)
+
+        columns = {}
+        for name, values in [('flux', self.fluxes), ('reduced_cost', self.reduced_costs)]:
+            if values is not None:
+                columns[name] = values
+        if self.flux_ranges is not None:
+            columns['minimum'] = self.flux_ranges[:, 0]
+            columns['maximum'] = self.flux_ranges[:, 1]
+
+        return pd.DataFrame(columns, index=self.reaction_ids,
+                            columns=[c for c in ['flux', 'reduced_cost', 'minimum', 'maximum']
+                                     if c in columns])
+
+    def write_back(self, model):
+        """copy the results into the reactions and metabolites of model (matched by id),
+            as flux_value (the previous value kept as loaded_flux), reduced_cost, flux_range
+            and shadow, and the objective value into model.total_objective"""
+
+        reactions = [model.reaction[rid] for rid in self.reaction_ids]
+
+        if self.fluxes is not None:
+            for reaction, flux_value in zip(reactions, self.fluxes.tolist()):
+                reaction.loaded_flux = reaction.flux_value
+                reaction.flux_value  = flux_value
+
+        if self.reduced_costs is not None:
+            for reaction, reduced_cost in zip(reactions, self.reduced_costs.tolist()):
+                reaction.reduced_cost = reduced_cost
+
+        if self.flux_ranges is not None:
+            for reaction, flux_range in zip(reactions, self.flux_ranges.tolist()):
+                if not np.isnan(flux_range[0]):
+                    reaction.flux_range = tuple(flux_range)
+
+        if self.shadow_prices is not None:
+            for mid, shadow in zip(self.metabolite_ids, self.shadow_prices.tolist()):
+                model.metabolite[mid].shadow = None if np.isnan(shadow) else shadow
+
+        model.total_objective = self.objective_value
+
+
+def stack(solutions, attribute='fluxes'):
+    """an array of the given result of many solutions, one row per solution"""
+    return np.vstack([getattr(solution, attribute) for solution in solutions])
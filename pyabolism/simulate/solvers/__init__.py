@@ -0,0 +1,85 @@
+"""interfaces to the optimisation libraries available to pyabolism
+
+    each backend is imported only when first requested, such that pyabolism can run
+    wherever at least one of the libraries is installed. the solver used by default is the
+    first available of those listed in SOLVERS, unless set otherwise via set_default_solver()"""
+
+from .base import Solver  # NOQA
+from .base import OPTIMAL, INFEASIBLE, UNBOUNDED, INFEASIBLE_OR_UNBOUNDED, SUBOPTIMAL  # NOQA
+from .base import EQUAL, LESS_EQUAL, GREATER_EQUAL, MAXIMIZE, MINIMIZE  # NOQA
+
+# backend name: (library, module, class)
+SOLVERS = [('gurobi', ('gurobipy', 'gurobi', 'GurobiSolver')),
+           ('highs',  ('highspy', 'highs', 'HighsSolver'))]
+
+_default = {'solver': None}
+
+
+def get_solver(name=None):
+    """return the Solver class of the named backend (or of the default backend)"""
+
+    from importlib import import_module
+
+    if isinstance(name, type) and issubclass(name, Solver):
+        return name
+
+    if name is None:
+        name = default_solver()
+
+    backends = dict(SOLVERS)
+    if name not in backends:
+        raise Exception('Unknown solver %s, options are %s' % (name, [s for (s, _) in SOLVERS]))
+
+    _, module_name, class_name = backends[name]
+
+    return getattr(import_module('.' + module_name, __name__), class_name)
+
+
+def available_solvers():
+    """the names of those backends whose library is installed
+
+        the libraries are located but not imported, since importing them is slow"""
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        # python 2
+        from pkgutil import find_loader as find_spec
+
+    return [name for (name, (library, _, _)) in SOLVERS if find_spec(library) is not None]
+
+
+def default_solver():
+    """docstring for default_solver"""
+
+    if _default['solver'] is None:
+        available = available_solvers()
+        if not available:
+            raise ImportError('No solver library available, please install one of %s'
+                              % [s for (s, _) in SOLVERS])
+        _default['solver'] = available[0]
+
+    return _default['solver']
+
+
+def set_default_solver(name):
+    """docstring for set_default_solver"""
+
+    get_solver(name)
+
+    _default['solver'] = name
+
+
+def as_solver(lp):
+    """wrap a library's own model object (e.g. a gurobipy Model) in the matching Solver"""
+
+    if isinstance(lp, Solver):
+        return lp
+
+    # only the backend whose library defined the type of lp need be imported
+    library = type(lp).__module__.split('.')[0]
+
+    for name, (backend_library, _, _) in SOLVERS:
+        if backend_library == library and get_solver(name).is_native(lp):
+            return get_solver(name)(lp=lp)
+
+    raise Exception('Unable to find a solver for %s' % lp)
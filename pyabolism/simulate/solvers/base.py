@@ -0,0 +1,130 @@
+import numpy as np
+
+# the statuses reported by Solver.solve()
+OPTIMAL                 = 'optimal'
+INFEASIBLE              = 'infeasible'
+UNBOUNDED               = 'unbounded'
+INFEASIBLE_OR_UNBOUNDED = 'infeasible_or_unbounded'
+SUBOPTIMAL              = 'suboptimal'
+OTHER                   = 'other'
+
+# constraint senses, as used by add_constraints()
+EQUAL         = '='
+LESS_EQUAL    = '<'
+GREATER_EQUAL = '>'
+
+MAXIMIZE = 'max'
+MINIMIZE = 'min'
+
+
+class Solver(object):
+    """common interface to the optimisation libraries used by pyabolism
+
+        variables and constraints are addressed by integer column and row indices,
+        in the order in which they were added. every method acting on columns or rows
+        takes a sequence of indices together with an array of values, so that
+        changes can be pushed to the library in bulk.
+
+        the library's own model object is available as .lp, and any attribute not defined
+        here is looked up on it"""
+
+    name = None
+
+    def __init__(self, name='LP', lp=None, private_env=False):
+        raise NotImplementedError
+
+    @classmethod
+    def is_native(cls, lp):
+        """whether lp is a model object of this solver's library"""
+        raise NotImplementedError
+
+    @property
+    def num_variables(self):
+        raise NotImplementedError
+
+    @property
+    def num_constraints(self):
+        raise NotImplementedError
+
+    def add_variables(self, lower_bounds, upper_bounds, objective, names=None, integer=False):
+        """add one variable per element of the arrays, returning their column indices"""
+        raise NotImplementedError
+
+    def add_constraints(self, A, sense, rhs, names=None):
+        """add the rows of the sparse matrix A as constraints (A x sense rhs),
+            returning their row indices. A may have fewer columns than the LP"""
+        raise NotImplementedError
+
+    def add_constraint(self, columns, coefficients, sense, rhs, name=None):
+        """add a single constraint over the given columns, returning its row index"""
+        from scipy import sparse
+
+        A = sparse.csr_matrix((np.asarray(coefficients, dtype=float),
+                               (np.zeros(len(columns), dtype=int), np.asarray(columns, dtype=int))),
+                              shape=(1, self.num_variables))
+
+        names = [name] if name is not None else None
+
+        return self.add_constraints(A, sense, np.array([rhs], dtype=float), names)[0]
+
+    def get_bounds(self, columns):
+        """the (lower, upper) bounds of the given columns, as two arrays"""
+        raise NotImplementedError
+
+    def set_bounds(self, columns, lower_bounds, upper_bounds):
+        raise NotImplementedError
+
+    def set_rhs(self, rows, values):
+        raise NotImplementedError
+
+    def set_coefficient(self, row, column, value):
+        raise NotImplementedError
+
+    def set_objective(self, linear=None, quadratic=None, sense=None):
+        """replace the objective with linear . x + sum(quadratic * x * x),
+            where linear and quadratic are arrays over all columns (None meaning zeros)"""
+        raise NotImplementedError
+
+    def set_objective_coefficients(self, columns, values):
+        """change the linear objective coefficients of the given columns"""
+        raise NotImplementedError
+
+    def set_sense(self, sense):
+        raise NotImplementedError
+
+    def solve(self):
+        """optimise, returning one of the status strings defined in this module"""
+        raise NotImplementedError
+
+    def relax_tolerances(self):
+        """loosen convergence tolerances after a SUBOPTIMAL solve,
+            returning False if there is nothing left to relax"""
+        return False
+
+    def objective_value(self):
+        raise NotImplementedError
+
+    def primal_values(self, columns=None):
+        raise NotImplementedError
+
+    def reduced_costs(self, columns=None):
+        raise NotImplementedError
+
+    def dual_values(self, rows=None):
+        """the shadow prices of the given rows, or None if unavailable (e.g. for a QP)"""
+        raise NotImplementedError
+
+    def __getattr__(self, name):
+        # anything not offered by the common interface is passed through to the library,
+        # so that code written against e.g. a gurobipy Model continues to work
+        if name == 'lp':
+            raise AttributeError(name)
+        return getattr(self.lp, name)
+
+    def native_variables(self, columns):
+        """the library's own handles for the given columns"""
+        return list(columns)
+
+    def native_constraints(self, rows):
+        """the library's own handles for the given rows"""
+        return list(rows)
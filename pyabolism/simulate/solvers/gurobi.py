@@ -0,0 +1,241 @@
+import numpy as np
+
+import gurobipy as grb
+from gurobipy import GRB
+
+from .base import Solver, OPTIMAL, INFEASIBLE, UNBOUNDED, INFEASIBLE_OR_UNBOUNDED, SUBOPTIMAL, \
+    OTHER, MAXIMIZE, MINIMIZE
+
+# solves are silent, and write no log file
+try:
+    grb.setParam('OutputFlag', 0)
+    grb.setParam('LogFile', '')
+except grb.GurobiError:
+    pass
+
+_STATUSES = {GRB.OPTIMAL:     OPTIMAL,
+             GRB.INFEASIBLE:  INFEASIBLE,
+             GRB.UNBOUNDED:   UNBOUNDED,
+             GRB.INF_OR_UNBD: INFEASIBLE_OR_UNBOUNDED,
+             GRB.SUBOPTIMAL:  SUBOPTIMAL}
+
+_SENSES = {MAXIMIZE: GRB.MAXIMIZE, MINIMIZE: GRB.MINIMIZE}
+
+
+class GurobiSolver(Solver):
+    """Solver backed by a gurobipy Model
+
+        an existing Model may be wrapped by passing it as lp. variables and constraints added
+        to that Model by other means after wrapping are not seen by the wrapper."""
+
+    name = 'gurobi'
+
+    def __init__(self, name='LP', lp=None, private_env=False):
+
+        if lp is None:
+            if private_env:
+                # gurobi environments must not be shared across processes
+                env = grb.Env()
+                env.setParam('OutputFlag', 0)
+                lp = grb.Model(name, env=env)
+            else:
+                lp = grb.Model(name)
+
+        self.lp = lp
+        self.lp.update()
+
+        self.variables   = self.lp.getVars()
+        self.constraints = self.lp.getConstrs()
+
+    @classmethod
+    def is_native(cls, lp):
+        return isinstance(lp, grb.Model)
+
+    @property
+    def num_variables(self):
+        return len(self.variables)
+
+    @property
+    def num_constraints(self):
+        return len(self.constraints)
+
+    def add_variables(self, lower_bounds, upper_bounds, objective, names=None, integer=False):
+        """docstring for add_variables"""
+
+        start = len(self.variables)
+        vtype = GRB.INTEGER if integer else GRB.CONTINUOUS
+
+        if hasattr(self.lp, 'addMVar'):
+            self.lp.addMVar(len(lower_bounds),
+                            lb=np.asarray(lower_bounds, dtype=float),
+                            ub=np.asarray(upper_bounds, dtype=float),
+                            obj=np.asarray(objective, dtype=float),
+                            vtype=vtype)
+        else:
+            for lb, ub, obj in zip(lower_bounds, upper_bounds, objective):
+                self.lp.addVar(lb, ub, obj, vtype)
+        self.lp.update()
+
+        new = self.lp.getVars()[start:]
+        if names is not None:
+            self.lp.setAttr('VarName', new, list(names))
+            self.lp.update()
+
+        self.variables.extend(new)
+
+        return np.arange(start, len(self.variables))
+
+    def add_constraints(self, A, sense, rhs, names=None):
+        """docstring for add_constraints"""
+        from scipy import sparse
+
+        start = len(self.constraints)
+
+        A   = sparse.csr_matrix(A)
+        A   = sparse.csr_matrix((A.data, A.indices, A.indptr),
+                                shape=(A.shape[0], len(self.variables)))
+        rhs = np.asarray(rhs, dtype=float)
+
+        if hasattr(self.lp, 'addMConstr'):
+            self.lp.addMConstr(A, None, sense, rhs)
+        else:
+            for i in range(A.shape[0]):
+                row = slice(A.indptr[i], A.indptr[i + 1])
+                self.lp.addConstr(grb.LinExpr(A.data[row],
+                                              [self.variables[j] for j in A.indices[row]]),
+                                  sense, rhs[i])
+        self.lp.update()
+
+        new = self.lp.getConstrs()[start:]
+        if names is not None:
+            self.lp.setAttr('ConstrName', new, list(names))
+            self.lp.update()
+
+        self.constraints.extend(new)
+
+        return np.arange(start, len(self.constraints))
+
+    def get_bounds(self, columns):
+        """docstring for get_bounds"""
+        # any pending changes must be applied before bounds are read
+        self.lp.update()
+        variables = self.native_variables(columns)
+        return (np.array(self.lp.getAttr('LB', variables), dtype=float),
+                np.array(self.lp.getAttr('UB', variables), dtype=float))
+
+    def set_bounds(self, columns, lower_bounds, upper_bounds):
+        """docstring for set_bounds"""
+        variables = self.native_variables(columns)
+        self.lp.setAttr('LB', variables, [float(lb) for lb in lower_bounds])
+        self.lp.setAttr('UB', variables, [float(ub) for ub in upper_bounds])
+
+    def set_rhs(self, rows, values):
+        """docstring for set_rhs"""
+        self.lp.setAttr('RHS', self.native_constraints(rows), [float(v) for v in values])
+
+    def set_coefficient(self, row, column, value):
+        """docstring for set_coefficient"""
+        self.lp.chgCoeff(self.constraints[row], self.variables[column], value)
+
+    def set_objective(self, linear=None, quadratic=None, sense=None):
+        """docstring for set_objective"""
+
+        # the objective is passed in matrix form where the variables of the Model are
+        # exactly those of the wrapper, rather than being built up as an expression
+        if hasattr(self.lp, 'setMObjective') and self.lp.NumVars == len(self.variables):
+            self._set_matrix_objective(linear, quadratic)
+            if sense is not None:
+                self.set_sense(sense)
+            return
+
+        objective = grb.LinExpr()
+
+        if linear is not None:
+            columns = np.flatnonzero(linear)
+            objective = grb.LinExpr(np.asarray(linear, dtype=float)[columns],
+                                    self.native_variables(columns))
+
+        if quadratic is not None and np.any(quadratic):
+            columns   = np.flatnonzero(quadratic)
+            variables = self.native_variables(columns)
+            objective = grb.QuadExpr(objective)
+            objective.addTerms(np.asarray(quadratic, dtype=float)[columns], variables, variables)
+
+        self.lp.setObjective(objective)
+
+        if sense is not None:
+            self.set_sense(sense)
+
+    def _set_matrix_objective(self, linear, quadratic):
+        """docstring for _set_matrix_objective"""
+        from scipy import sparse
+
+        n = len(self.variables)
+
+        linear = np.zeros(n) if linear is None else np.asarray(linear, dtype=float)
+
+        Q = None
+        if quadratic is not None and np.any(quadratic):
+            columns = np.flatnonzero(quadratic)
+            Q = sparse.coo_matrix((np.asarray(quadratic, dtype=float)[columns], (columns, columns)),
+                                  shape=(n, n))
+
+        self.lp.setMObjective(Q, linear, 0.0)
+
+    def set_objective_coefficients(self, columns, values):
+        """docstring for set_objective_coefficients"""
+        self.lp.setAttr('Obj', self.native_variables(columns), [float(v) for v in values])
+
+    def set_sense(self, sense):
+        """docstring for set_sense"""
+        self.lp.modelSense = _SENSES[sense]
+
+    def solve(self):
+        """docstring for solve"""
+        self.lp.optimize()
+        return _STATUSES.get(self.lp.status, OTHER)
+
+    def relax_tolerances(self):
+        """for some problems, we need to relax the BarConvTol parameter
+            in order to achieve an optimal solution"""
+        _, _, current, _, maximum, _ = self.lp.getParamInfo('BarConvTol')
+
+        relaxed = min(current * 10.0, maximum)
+        if relaxed <= current:
+            return False
+
+        self.lp.setParam('BarConvTol', relaxed)
+        return True
+
+    def objective_value(self):
+        """docstring for objective_value"""
+        return self.lp.ObjVal
+
+    def primal_values(self, columns=None):
+        """docstring for primal_values"""
+        variables = self.variables if columns is None else self.native_variables(columns)
+        return np.array(self.lp.getAttr('X', variables), dtype=float)
+
+    def reduced_costs(self, columns=None):
+        """docstring for reduced_costs"""
+        variables = self.variables if columns is None else self.native_variables(columns)
+        try:
+            return np.array(self.lp.getAttr('RC', variables), dtype=float)
+        except grb.GurobiError:
+            return None
+
+    def dual_values(self, rows=None):
+        """docstring for dual_values"""
+        constraints = self.constraints if rows is None else self.native_constraints(rows)
+        try:
+            return np.array(self.lp.getAttr('Pi', constraints), dtype=float)
+        except grb.GurobiError:
+            return None
+
+    def native_variables(self, columns):
+        """docstring for native_variables"""
+        return [self.variables[j] for j in columns]
+
+    def native_constraints(self, rows):
+        """docstring for native_constraints"""
+        return [self.constraints[i] for i in rows]
@@ -0,0 +1,222 @@
+import numpy as np
+
+import highspy
+
+from .base import Solver, OPTIMAL, INFEASIBLE, UNBOUNDED, INFEASIBLE_OR_UNBOUNDED, OTHER, \
+    MAXIMIZE, EQUAL, LESS_EQUAL, GREATER_EQUAL
+
+_STATUSES = {highspy.HighsModelStatus.kOptimal:                OPTIMAL,
+             highspy.HighsModelStatus.kInfeasible:             INFEASIBLE,
+             highspy.HighsModelStatus.kUnbounded:              UNBOUNDED,
+             highspy.HighsModelStatus.kUnboundedOrInfeasible:  INFEASIBLE_OR_UNBOUNDED}
+
+
+def _indices(columns):
+    """HiGHS expects its index arrays as 32 bit integers"""
+    return np.asarray(columns, dtype=np.int32)
+
+
+class HighsSolver(Solver):
+    """Solver backed by the open-source HiGHS library (via highspy), requiring no license
+
+        HiGHS solves LPs, convex QPs (which it can only minimise) and MILPs. a quadratic
+        objective is held as a diagonal Hessian, which is all that pyabolism requires."""
+
+    name = 'highs'
+
+    def __init__(self, name='LP', lp=None, private_env=False):
+
+        if lp is None:
+            lp = highspy.Highs()
+            lp.setOptionValue('output_flag', False)
+
+        self.lp = lp
+
+        # HiGHS stores each row as lower <= a.x <= upper, so the sense of each row is
+        # recorded in order that its right-hand side can later be changed
+        self.senses = []
+
+        # bounds are mirrored here, since reading them back from HiGHS copies the whole LP
+        self.lower_bounds = np.array(lp.getLp().col_lower_, dtype=float)
+        self.upper_bounds = np.array(lp.getLp().col_upper_, dtype=float)
+
+        self.has_hessian = False
+        self.has_integer = False
+
+    @classmethod
+    def is_native(cls, lp):
+        return isinstance(lp, highspy.Highs)
+
+    @property
+    def num_variables(self):
+        return self.lp.getNumCol()
+
+    @property
+    def num_constraints(self):
+        return self.lp.getNumRow()
+
+    def add_variables(self, lower_bounds, upper_bounds, objective, names=None, integer=False):
+        """docstring for add_variables"""
+
+        start = self.num_variables
+        n     = len(lower_bounds)
+
+        empty = np.array([], dtype=np.int32)
+        self.lp.addCols(n,
+                        np.asarray(objective, dtype=float),
+                        np.asarray(lower_bounds, dtype=float),
+                        np.asarray(upper_bounds, dtype=float),
+                        0, empty, empty, np.array([], dtype=float))
+
+        columns = np.arange(start, start + n)
+
+        self.lower_bounds = np.append(self.lower_bounds, np.asarray(lower_bounds, dtype=float))
+        self.upper_bounds = np.append(self.upper_bounds, np.asarray(upper_bounds, dtype=float))
+
+        if integer:
+            self.lp.changeColsIntegrality(n, _indices(columns),
+                                          np.array([highspy.HighsVarType.kInteger] * n))
+            self.has_integer = True
+
+        if names is not None:
+            for j, name in zip(columns, names):
+                self.lp.passColName(int(j), name)
+
+        return columns
+
+    def add_constraints(self, A, sense, rhs, names=None):
+        """docstring for add_constraints"""
+        from scipy import sparse
+
+        start = self.num_constraints
+
+        A   = sparse.csr_matrix(A)
+        rhs = np.asarray(rhs, dtype=float)
+
+        lower, upper = self._row_bounds(sense, rhs)
+
+        self.lp.addRows(A.shape[0], lower, upper, A.nnz, _indices(A.indptr[:-1]),
+                        _indices(A.indices), np.asarray(A.data, dtype=float))
+
+        self.senses.extend([sense] * A.shape[0])
+
+        rows = np.arange(start, start + A.shape[0])
+
+        if names is not None:
+            for i, name in zip(rows, names):
+                self.lp.passRowName(int(i), name)
+
+        return rows
+
+    def _row_bounds(self, sense, rhs):
+        """docstring for _row_bounds"""
+
+        infinite = np.ones(len(rhs)) * highspy.kHighsInf
+
+        if sense == EQUAL:
+            return rhs, rhs
+        elif sense == LESS_EQUAL:
+            return -infinite, rhs
+        elif sense == GREATER_EQUAL:
+            return rhs, infinite
+        raise Exception('Unknown constraint sense %s' % sense)
+
+    def get_bounds(self, columns):
+        """docstring for get_bounds"""
+        columns = _indices(columns)
+        return self.lower_bounds[columns].copy(), self.upper_bounds[columns].copy()
+
+    def set_bounds(self, columns, lower_bounds, upper_bounds):
+        """docstring for set_bounds"""
+        columns      = _indices(columns)
+        lower_bounds = np.asarray(lower_bounds, dtype=float)
+        upper_bounds = np.asarray(upper_bounds, dtype=float)
+
+        self.lp.changeColsBounds(len(columns), columns, lower_bounds, upper_bounds)
+
+        self.lower_bounds[columns] = lower_bounds
+        self.upper_bounds[columns] = upper_bounds
+
+    def set_rhs(self, rows, values):
+        """docstring for set_rhs"""
+        rows   = _indices(rows)
+        values = np.asarray(values, dtype=float)
+        senses = [self.senses[i] for i in rows]
+
+        lower = np.empty(len(rows))
+        upper = np.empty(len(rows))
+        for sense in set(senses):
+            mask = np.array([s == sense for s in senses], dtype=bool)
+            lower[mask], upper[mask] = self._row_bounds(sense, values[mask])
+
+        self.lp.changeRowsBounds(len(rows), rows, lower, upper)
+
+    def set_coefficient(self, row, column, value):
+        """docstring for set_coefficient"""
+        self.lp.changeCoeff(int(row), int(column), float(value))
+
+    def set_objective(self, linear=None, quadratic=None, sense=None):
+        """docstring for set_objective"""
+
+        n = self.num_variables
+
+        linear = np.zeros(n) if linear is None else np.asarray(linear, dtype=float)
+        self.lp.changeColsCost(n, _indices(np.arange(n)), linear)
+
+        if quadratic is not None and np.any(quadratic):
+            # HiGHS minimises c.x + x.Q.x / 2, so the diagonal of Q is twice our coefficients
+            columns = np.flatnonzero(quadratic)
+            start   = np.searchsorted(columns, np.arange(n + 1))
+            self.lp.passHessian(n, len(columns), highspy.HessianFormat.kTriangular,
+                                _indices(start), _indices(columns),
+                                2.0 * np.asarray(quadratic, dtype=float)[columns])
+            self.has_hessian = True
+
+        elif self.has_hessian:
+            self.lp.passHessian(n, 0, highspy.HessianFormat.kTriangular,
+                                _indices(np.zeros(n + 1)), _indices([]), np.array([], dtype=float))
+            self.has_hessian = False
+
+        if sense is not None:
+            self.set_sense(sense)
+
+    def set_objective_coefficients(self, columns, values):
+        """docstring for set_objective_coefficients"""
+        self.lp.changeColsCost(len(columns), _indices(columns), np.asarray(values, dtype=float))
+
+    def set_sense(self, sense):
+        """docstring for set_sense"""
+        if sense == MAXIMIZE:
+            self.lp.changeObjectiveSense(highspy.ObjSense.kMaximize)
+        else:
+            self.lp.changeObjectiveSense(highspy.ObjSense.kMinimize)
+
+    def solve(self):
+        """docstring for solve"""
+        self.lp.run()
+        return _STATUSES.get(self.lp.getModelStatus(), OTHER)
+
+    def objective_value(self):
+        """docstring for objective_value"""
+        return self.lp.getInfo().objective_function_value
+
+    def primal_values(self, columns=None):
+        """docstring for primal_values"""
+        values = np.array(self.lp.getSolution().col_value, dtype=float)
+        return values if columns is None else values[_indices(columns)]
+
+    def reduced_costs(self, columns=None):
+        """docstring for reduced_costs"""
+        solution = self.lp.getSolution()
+        if not solution.dual_valid:
+            return None
+        values = np.array(solution.col_dual, dtype=float)
+        return values if columns is None else values[_indices(columns)]
+
+    def dual_values(self, rows=None):
+        """docstring for dual_values"""
+        solution = self.lp.getSolution()
+        if not solution.dual_valid:
+            return None
+        values = np.array(solution.row_dual, dtype=float)
+        return values if rows is None else values[_indices(rows)]
@@ -1,28 +1,16 @@
+import numpy as np
 
-def get_exchange_reactions(model):
-    """exchange reactions are those that convert boundary metabolites into external metabolites"""
-    exchanges = []
-
-    for r in model.reactions():
-
-        if [m for (m, s) in r.participants.items() if m.boundaryCondition]:
-            exchanges.append(r)
-            continue
-
-        if len(r.participants) == 1:
-            exchanges.append(r)
-            continue
 
-    return exchanges
+def get_exchange_reactions(model):
+    """exchange reactions are those that convert boundary metabolites into external metabolites,
+        or have a single participant (as indexed by model.reaction)"""
+    return model.reaction.get_exchanges()
 
 
 def get_transport_reactions(model):
-    """return all reactions that move metabolites across compartment boundaries"""
-    transports = []
-    for r in model.reactions():
-        if set(['e', 'c']) == set([m.compartment for m in r.participants.keys()]):
-            transports.append(r)
-    return transports
+    """return all reactions that move metabolites across compartment boundaries
+        (as indexed by model.reaction)"""
+    return model.reaction.get_transports()
 
 
 def GPR_string2tree(gene_association):
@@ -70,6 +58,300 @@ def GPR_string2tree(gene_association):
     return graph
 
 
+def _tokenize_GPR(gene_association):
+    """split a GPR string into brackets, operators and gene ids, as GPR_string2tree"""
+
+    string = gene_association.replace('(', ' ( ').replace(')', ' ) ')
+
+    string = string.replace('_AND_', ' AND ').replace('_and_', ' and ')
+    string = string.replace('_OR_', ' OR ').replace('_or_', ' or ')
+
+    return string.split()
+
+
+def GPR_genes(gene_association):
+    """the ids of the genes named in a GPR string, in order of their first appearance"""
+    genes = []
+    for element in _tokenize_GPR(gene_association):
+        if element not in ('(', ')') and element.lower() not in ('and', 'or') \
+                and element not in genes:
+            genes.append(element)
+    return genes
+
+
+def _parse_GPR(gene_association):
+    """parse a GPR string into nested (operation, children) tuples, with the same meaning
+        as the tree of GPR_string2tree but with no graph built
+
+        each child is another such tuple or a gene id. an empty GPR (or bracket) is None,
+        placing no limit on its reaction. a bracket holding a single element is replaced by
+        that element, and a gene repeated within one bracket counts once"""
+
+    # each open bracket is a list of operations and a list of children
+    stack = [(set(), [])]
+
+    def close():
+        operations, children = stack.pop()
+
+        if len(operations) > 1:
+            raise Exception('non-unique operators within a bracket - ambiguous statement!')
+
+        children = [child for child in children if child is not None]
+
+        if not children:
+            return None
+        elif len(children) == 1:
+            return children[0]
+        elif not operations:
+            raise Exception('missing operation instructions!')
+
+        return (operations.pop(), children)
+
+    for element in _tokenize_GPR(gene_association):
+
+        if element == '(':
+            stack.append((set(), []))
+
+        elif element == ')':
+            if len(stack) == 1:
+                raise Exception('unbalanced brackets in GPR %s' % gene_association)
+            node = close()
+            stack[-1][1].append(node)
+
+        elif element.lower() in ['and', 'or']:
+            stack[-1][0].add(element.lower())
+
+        elif element not in stack[-1][1]:
+            stack[-1][1].append(element)
+
+    # brackets left open are closed at the end of the string
+    while len(stack) > 1:
+        node = close()
+        stack[-1][1].append(node)
+
+    return close()
+
+
+class CompiledGPRs(object):
+    """the GPRs of many reactions, compiled into flat arrays for evaluation with numpy
+
+        every gene is a node, shared by all of the GPRs in which it appears, followed by a single
+        node of infinite capacity (standing for an empty GPR) and then the 'and' and 'or' nodes
+        of each GPR. the nodes are evaluated a level at a time, from the genes upwards, each
+        level taking one numpy call per operation for every GPR and sample together.
+
+        the capacity of a GPR is the sum over the clauses of an 'or', and the minimum over
+        those of an 'and', of the expression of its genes. genes of unknown expression
+        (and reactions with no GPR) are given infinite capacity"""
+
+    AND = 'and'
+    OR  = 'or'
+
+    def __init__(self, gene_associations):
+
+        self.gene_associations = list(gene_associations)
+
+        self.genes      = []
+        self.gene_index = {}
+
+        trees = [_parse_GPR(gene_association) for gene_association in self.gene_associations]
+
+        # the genes take the first nodes, in order of their first appearance
+        def find_genes(node):
+            if isinstance(node, tuple):
+                for child in node[1]:
+                    find_genes(child)
+            elif node is not None and node not in self.gene_index:
+                self.gene_index[node] = len(self.genes)
+                self.genes.append(node)
+
+        for tree in trees:
+            find_genes(tree)
+
+        self.infinite = len(self.genes)
+
+        self.operations = []
+        self.children   = []
+        heights         = []
+
+        n_leaves = self.infinite + 1
+
+        def add(node):
+            """the index of node, adding its operation and those of its children"""
+            if node is None:
+                return self.infinite, 0
+            if not isinstance(node, tuple):
+                return self.gene_index[node], 0
+
+            operation, children = node
+            children = [add(child) for child in children]
+
+            self.operations.append(operation)
+            self.children.append([index for (index, _) in children])
+            heights.append(1 + max([height for (_, height) in children]))
+
+            return n_leaves + len(self.operations) - 1, heights[-1]
+
+        self.roots = np.array([add(tree)[0] for tree in trees], dtype=int)
+
+        self.n_nodes = n_leaves + len(self.operations)
+
+        # the operations are grouped into levels, each level depending only on those beneath;
+        # within a level, the children of each operation are gathered into a single array,
+        # with offsets marking the start of each operation's children
+        self.levels = []
+        heights     = np.array(heights, dtype=int)
+        for height in sorted(set(heights)):
+            for operation, ufunc in [(self.AND, np.minimum), (self.OR, np.add)]:
+                nodes = [k for k in np.flatnonzero(heights == height)
+                         if self.operations[k] == operation]
+                if not nodes:
+                    continue
+                sizes = [len(self.children[k]) for k in nodes]
+                self.levels.append((ufunc,
+                                    n_leaves + np.array(nodes, dtype=int),
+                                    np.array([c for k in nodes for c in self.children[k]],
+                                             dtype=int),
+                                    np.cumsum([0] + sizes[:-1]).astype(int)))
+
+    def expression_matrix(self, expressions):
+        """an array of samples by genes (in the order of self.genes), from a dict of
+            expression values or a list of such dicts. missing values are taken as infinite"""
+
+        if isinstance(expressions, dict):
+            expressions = [expressions]
+
+        matrix = np.array([[sample.get(gid, np.infty) for gid in self.genes]
+                           for sample in expressions], dtype=float)
+        return matrix.reshape(len(expressions), len(self.genes))
+
+    def samples(self, expressions, genes=None):
+        """an array of samples by genes (see expression_matrix) from a list of dicts, a pandas
+            DataFrame with a sample per row, or an array whose columns are named by genes
+            (defaulting to self.genes). genes unknown to the GPRs are ignored.
+
+            returns the array and the index of the DataFrame (otherwise None)"""
+
+        index = None
+        if hasattr(expressions, 'columns') and hasattr(expressions, 'index'):
+            index       = expressions.index
+            genes       = list(expressions.columns)
+            expressions = expressions.values
+
+        if isinstance(expressions, (list, tuple)) and expressions and \
+                isinstance(expressions[0], dict):
+            return self.expression_matrix(expressions), index
+
+        X = np.atleast_2d(np.asarray(expressions, dtype=float))
+
+        if genes is None:
+            return X, index
+
+        genes = list(genes)
+        if X.shape[1] != len(genes):
+            raise Exception('expected an array of samples by %d genes' % len(genes))
+
+        known = [k for (k, gid) in enumerate(genes) if gid in self.gene_index]
+
+        full = np.infty * np.ones((X.shape[0], len(self.genes)))
+        full[:, [self.gene_index[genes[k]] for k in known]] = X[:, known]
+
+        return full, index
+
+    def capacities(self, expressions):
+        """the capacity of every GPR, given a dict of expression values (returning an array
+            over the GPRs) or an array of samples by genes (returning samples by GPRs)"""
+
+        if isinstance(expressions, dict):
+            return self.capacities(self.expression_matrix(expressions))[0]
+
+        X = np.asarray(expressions, dtype=float)
+        if X.ndim != 2 or X.shape[1] != len(self.genes):
+            raise Exception('expected an array of samples by %d genes' % len(self.genes))
+
+        values = np.empty((self.n_nodes, X.shape[0]))
+        values[:self.infinite] = X.T
+        values[self.infinite]  = np.infty
+
+        for ufunc, nodes, children, offsets in self.levels:
+            values[nodes] = ufunc.reduceat(values[children], offsets, axis=0)
+
+        return values[self.roots].T
+
+    def active(self, deletions):
+        """for each set of deleted gene ids, a boolean array over the GPRs marking those that
+            remain satisfied (returning samples by GPRs). unknown gene ids are ignored"""
+
+        X = np.ones((len(deletions), len(self.genes)))
+        for i, deleted in enumerate(deletions):
+            X[i, [self.gene_index[gid] for gid in deleted if gid in self.gene_index]] = 0.0
+
+        return self.capacities(X) > 0.0
+
+    def satisfied(self, k, deleted):
+        """whether GPR k remains satisfied with a set of gene ids deleted, evaluated alone
+            (as active, but for a single GPR)"""
+
+        n_leaves = self.infinite + 1
+
+        def node_satisfied(i):
+            if i < self.infinite:
+                return self.genes[i] not in deleted
+            elif i == self.infinite:
+                return True
+            children = self.children[i - n_leaves]
+            if self.operations[i - n_leaves] == self.AND:
+                return all([node_satisfied(c) for c in children])
+            return any([node_satisfied(c) for c in children])
+
+        return node_satisfied(self.roots[k])
+
+    def complexes(self):
+        """for every GPR, the list of its sufficient gene complexes (each a list of gene ids,
+            all of which are required). an empty GPR has a single complex of no genes"""
+
+        n_leaves = self.infinite + 1
+        memo     = {}
+
+        def node_complexes(k):
+            if k in memo:
+                return memo[k]
+
+            if k < self.infinite:
+                result = [[self.genes[k]]]
+            elif k == self.infinite:
+                result = [[]]
+            else:
+                children = [node_complexes(c) for c in self.children[k - n_leaves]]
+                if self.operations[k - n_leaves] == self.OR:
+                    result = [c for child in children for c in child]
+                else:
+                    result = children[0]
+                    for child in children[1:]:
+                        result = [a + b for a in result for b in child]
+
+            memo[k] = result
+            return result
+
+        return [[list(c) for c in node_complexes(k)] for k in self.roots]
+
+
+def compile_GPRs(model):
+    """the CompiledGPRs of the GENE_ASSOCIATION of every reaction of a model, in order
+
+        the compiled form is kept with the model, and reused for as long as the GPR strings
+        of its reactions are unchanged"""
+
+    gene_associations = [r.notes.get('GENE_ASSOCIATION', '') for r in model.reactions()]
+
+    compiled = getattr(model, '_gprs', None)
+    if compiled is None or compiled.gene_associations != gene_associations:
+        compiled    = CompiledGPRs(gene_associations)
+        model._gprs = compiled
+
+    return compiled
+
+
 def find_config_folder():
     """searches path from cwd to $HOME, searching for .pyabolism directory
         if cwd not within home directory, searches cwd only
@@ -107,6 +389,7 @@ def find_config_folder():
 def construct_gene_list(model, gene_regex=None):
 
     all_genes = set()
+    ordered   = []
 
     import re
 
@@ -118,12 +401,20 @@ def construct_gene_list(model, gene_regex=None):
         except:
             raise Exception('No valid gene_regex found...')
 
+    # the pattern is matched against each distinct GPR string once, as many reactions
+    # share theirs, and the genes are added in order of their first appearance
+    searched = set()
     for r in model.reactions():
-        if r.notes.get('GENE_ASSOCIATION', ''):
-            genes = set(pattern.findall(r.notes['GENE_ASSOCIATION']))
+        gene_association = r.notes.get('GENE_ASSOCIATION', '')
+        if not gene_association or gene_association in searched:
+            continue
+        searched.add(gene_association)
 
-            all_genes.update(genes)
+        for gid in pattern.findall(gene_association):
+            if gid not in all_genes:
+                all_genes.add(gid)
+                ordered.append(gid)
 
     from pyabolism.model import Gene
-    for gid in all_genes:
+    for gid in ordered:
         model.gene.add(Gene(gid))
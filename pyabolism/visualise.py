@@ -1,19 +1,28 @@
 
 from collections import defaultdict
 
-import matplotlib.pyplot as plt
+from pyabolism.tools import get_exchange_reactions
+from pyabolism.tools import get_transport_reactions
 
-from matplotlib.path import Path
-import matplotlib.patches as patches
+# matplotlib (and seaborn, where available) are slow to import,
+# so are loaded only once something is first plotted
+_style = {'set': False}
 
-try:
-    import seaborn as sns
-    sns.set_context("poster")
-except ImportError:
-    pass
 
-from pyabolism.tools import get_exchange_reactions
-from pyabolism.tools import get_transport_reactions
+def _pyplot():
+    """docstring for _pyplot"""
+
+    import matplotlib.pyplot as plt
+
+    if not _style['set']:
+        try:
+            import seaborn as sns
+            sns.set_context("poster")
+        except ImportError:
+            pass
+        _style['set'] = True
+
+    return plt
 
 
 def get_flux_line(reaction, plot_type='value'):
@@ -58,6 +67,8 @@ def plot_flux_distribution(model, reactions=None, title=None):
 
     reactions.sort(key=lambda x: (x.category, x.id))
 
+    plt = _pyplot()
+
     fig = plt.figure(figsize=(20, 5))
 
     axis = fig.add_subplot(111)
@@ -83,8 +94,11 @@ def plot_flux_distribution(model, reactions=None, title=None):
 
 def _plot_bounds(reactions, ax=None):
 
+    from matplotlib.path import Path
+    import matplotlib.patches as patches
+
     if not ax:
-        ax = plt.gca()
+        ax = _pyplot().gca()
 
     verts = []
     codes = []
@@ -108,8 +122,11 @@ def _plot_bounds(reactions, ax=None):
 
 def _plot_fluxes(reactions, ax=None):
 
+    from matplotlib.path import Path
+    import matplotlib.patches as patches
+
     if not ax:
-        ax = plt.gca()
+        ax = _pyplot().gca()
 
     colors = {'exchange': 'g', 'main': 'b', 'objective': 'r'}
 
@@ -137,8 +154,11 @@ def _plot_fluxes(reactions, ax=None):
 
 def _plot_ranges(reactions, ax=None):
 
+    from matplotlib.path import Path
+    import matplotlib.patches as patches
+
     if not ax:
-        ax = plt.gca()
+        ax = _pyplot().gca()
 
     colors = {'exchange': 'g', 'main': 'b', 'objective': 'r'}
 
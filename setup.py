@@ -10,7 +10,7 @@ setup(
     license = "BSD",
     keywords = "FBA metabolic network",
     # url = "http://pypi.python.org/pypi/pyabolism",
-    packages=['pyabolism', 'pyabolism.simulate'],
+    packages=['pyabolism', 'pyabolism.simulate', 'pyabolism.simulate.solvers'],
     long_description=open(os.path.join(os.path.dirname(__file__), 'README.md')).read(),
     classifiers=[
         "Development Status :: 5 - Production/Stable",
@@ -13,7 +13,7 @@ import unittest
 import numpy as np
 
 from pyabolism.io import load_model
-from pyabolism.simulate import EFlux
+from pyabolism.simulate import EFlux, EFlux_batch
 
 
 class TestEFlux(unittest.TestCase):
@@ -57,6 +57,39 @@ class TestEFlux(unittest.TestCase):
         print(np.round(self.model.total_objective, 8))
         assert (np.round(self.model.total_objective, 8) == 0.30007266)
 
+    def test_EFlux_batch(self, buffer=True):
+
+        samples = [self.expressions_A, self.expressions_B]
+        bounds  = [(r.lower_bound, r.upper_bound) for r in self.model.reactions()]
+
+        for norm in ['', 'L1', 'L2']:
+
+            fluxes = EFlux_batch(self.model, samples, norm=norm)
+            assert fluxes.shape == (2, len(self.model.reactions()))
+
+            # the bounds of the model itself are left untouched
+            assert [(r.lower_bound, r.upper_bound) for r in self.model.reactions()] == bounds
+
+            # each sample matches EFlux applied to a fresh copy of the model
+            for expressions, sample_fluxes in zip(samples, fluxes):
+                model = load_model('examples/data/ecoli_core.xml')
+                EFlux(model, expressions, norm=norm)
+                if model.total_objective is None:
+                    # infeasible samples have no fluxes
+                    assert np.all(np.isnan(sample_fluxes))
+                    continue
+                assert np.round(model.total_objective, 6) == \
+                    np.round(sample_fluxes[model.matrix().objective != 0].sum(), 6)
+                if norm:
+                    assert np.allclose([r.flux_value for r in model.reactions()], sample_fluxes,
+                                       atol=1e-5)
+
+        # an array of samples by genes gives the same result, as do worker processes
+        genes = sorted(self.expressions_A)
+        X     = [[expressions[gid] for gid in genes] for expressions in samples]
+        assert np.allclose(EFlux_batch(self.model, X, genes=genes, processes=2), fluxes,
+                           atol=1e-5, equal_nan=True)
+
     def tearDown(self):
         pass
 
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_FASTCC
+----------------------------------
+
+Tests for `FASTCC` function.
+"""
+import unittest
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FASTCC, FVA
+
+
+class TestFASTCC(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def blocked_by_FVA(self):
+
+        # with no objective, FVA finds the full range of every flux at steady state
+        for reaction in self.model.reactions():
+            reaction.objective_coefficient = 0.0
+
+        ranges = FVA(self.model, norm='', write_back=False).flux_ranges
+        return sorted([r.id for r, flux_range in zip(self.model.reactions(), ranges)
+                       if np.abs(flux_range).max() < 1e-6])
+
+    def test_FASTCC(self, buffer=True):
+
+        blocked = FASTCC(self.model)
+
+        assert sorted(blocked) == self.blocked_by_FVA()
+        assert self.model.fastcc_lps_solved < 10
+
+        # closing off the uptake of glucose blocks its transport, and all that depends on it
+        self.model.reaction['R_EX_glc_e_'].lower_bound = 0.0
+        self.model.reaction['R_ATPM'].lower_bound      = 0.0
+
+        blocked = FASTCC(self.model)
+
+        assert 'R_GLCpts' in blocked
+        assert sorted(blocked) == self.blocked_by_FVA()
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -13,7 +13,7 @@ import unittest
 import numpy as np
 
 from pyabolism.io import load_model
-from pyabolism.simulate import FBA
+from pyabolism.simulate import FBA, pFBA
 
 from pyabolism.simulate.LP import grb, GRB, generate_basic_lp
 
@@ -35,6 +35,102 @@ class TestFBA(unittest.TestCase):
         FBA(self.model, norm='L2', show=False)
         assert (np.round(self.model.total_objective, 8) == 0.86140741)
 
+    def test_L1_split(self, buffer=True):
+
+        # the L1 norm is minimised within the model's own LP, with no copy of the model made
+        reaction = self.model.reaction['R_PGI']
+
+        FBA(self.model, norm='L1', show=False)
+        lp        = self.model.lp
+        variables = lp.num_variables
+        assert reaction.lp_var is not None
+
+        L1 = np.abs([r.flux_value for r in self.model.reactions()]).sum()
+
+        # the negative parts added to the LP are reused, and leave later solves unaffected
+        FBA(self.model, norm='L1', show=False)
+        assert self.model.lp is lp and lp.num_variables == variables
+        assert np.round(np.abs([r.flux_value for r in self.model.reactions()]).sum(), 6) == \
+            np.round(L1, 6)
+
+        FBA(self.model, show=False)
+        assert np.round(self.model.total_objective, 8) == 0.86140741
+
+        FBA(self.model, norm='L2', show=False)
+        assert np.abs([r.flux_value for r in self.model.reactions()]).sum() >= L1 - 1e-6
+
+    def test_pFBA(self, buffer=True):
+
+        for norm in ['L1', 'L2']:
+
+            solution = pFBA(self.model, norm=norm)
+            assert np.allclose(solution.fluxes, FBA(self.model, norm=norm).fluxes, atol=1e-6)
+            assert np.round(solution.objective_value, 6) == 0.861407
+
+            # the objective of the second stage is made once, and kept by the LP session
+            linear, quadratic = self.model.lp_session.norm_objective(norm)
+            assert self.model.lp_session.norm_objective(norm)[0] is linear
+            assert self.model.lp_session.norm_objective(norm)[1] is quadratic
+
+        # a smaller fraction of the maximal growth allows fluxes of smaller norm
+        L1      = np.abs(pFBA(self.model).fluxes).sum()
+        reduced = pFBA(self.model, fraction=0.5)
+        assert np.round(reduced.objective_value, 6) == np.round(0.5 * 0.86140741, 6)
+        assert np.abs(reduced.fluxes).sum() < L1
+
+    def test_bulk_lp(self, buffer=True):
+
+        # the matrix-form LP must be identical in solution to that built element by element
+        solutions = []
+        for bulk in [False, True]:
+            generate_basic_lp(self.model, bulk=bulk)
+            self.model.lp.optimize()
+            assert self.model.lp.NumConstrs == len([m for m in self.model.metabolites()
+                                                    if not m.boundaryCondition])
+            solutions.append(self.model.lp.ObjVal)
+            assert self.model.reaction['R_PGI'].lp_var.VarName == self.model.name + 'R_PGI'
+
+        assert np.round(solutions[0], 8) == np.round(solutions[1], 8)
+
+    def test_lp_session(self, buffer=True):
+
+        fresh = load_model('examples/data/ecoli_core.xml')
+
+        FBA(self.model, show=False)
+        lp = self.model.lp
+
+        # a change of bounds is pushed into the existing LP, rather than a new one being built
+        self.model.reaction['R_EX_glc_e_'].lower_bound = -5.0
+        FBA(self.model, show=False)
+        assert self.model.lp is lp
+        assert np.round(self.model.total_objective, 8) == np.round(0.4086461041, 8)
+
+        # the norm minimisation alters the LP directly, which must not leak into later solves
+        FBA(self.model, norm='L2', show=False)
+        self.model.reaction['R_EX_glc_e_'].lower_bound = -10.0
+        FBA(self.model, show=False)
+        assert self.model.lp is lp
+        assert np.round(self.model.total_objective, 8) == 0.86140741
+
+        # as are changes of stoichiometry, here doubling the maintenance requirement
+        for model in [self.model, fresh]:
+            reaction = model.reaction['R_ATPM']
+            for metabolite, stoichiometry in list(reaction.participants.items()):
+                reaction.add_participant(metabolite, 2.0 * stoichiometry)
+            FBA(model, show=False)
+
+        assert self.model.lp is lp
+        assert 0.0 < fresh.total_objective < 0.86140741
+        assert np.round(self.model.total_objective, 8) == np.round(fresh.total_objective, 8)
+
+        # including those made to the coefficients themselves
+        for model in [self.model, fresh]:
+            model.reaction['R_PGK'].participants[model.metabolite['M_atp_c']] = 50.0
+            FBA(model, show=False)
+
+        assert self.model.lp is lp
+        assert np.round(self.model.total_objective, 8) == np.round(fresh.total_objective, 8) == 0.0
+
     def test_FBA_compound_LP(self, buffer=True):
 
         conditions = [('ModelA_', -5.0),
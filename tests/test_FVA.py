@@ -195,6 +195,47 @@ class TestFBA(unittest.TestCase):
         #         f.write(" == %.4f" % (r.flux_range[1]))
         #         f.write('\n')
 
+    def test_parallel_FVA(self, buffer=False):
+
+        FVA(self.model)
+        serial = dict((r.id, r.flux_range) for r in self.model.reactions())
+
+        model = load_model('examples/data/ecoli_core.xml')
+        FVA(model, processes=3)
+
+        for r in model.reactions():
+            assert round(r.flux_range[0], 6) == round(serial[r.id][0], 6)
+            assert round(r.flux_range[1], 6) == round(serial[r.id][1], 6)
+
+        # the workers are given the matrix as it is after changes to participants
+        model.reaction['R_PGK'].participants[model.metabolite['M_atp_c']] = 50.0
+        FVA(model, processes=2)
+        assert model.reaction['R_Biomass_Ecoli_core_N__w_GAM_'].flux_range[1] < 1e-6
+
+    def test_FVA_pruning(self, buffer=False):
+
+        FVA(self.model, prune=False)
+        unpruned = dict((r.id, r.flux_range) for r in self.model.reactions())
+        assert self.model.fva_lps_saved == 0
+
+        model = load_model('examples/data/ecoli_core.xml')
+        FVA(model)
+        assert model.fva_lps_saved > 0
+        assert model.fva_lps_saved + model.fva_lps_solved == 2 * len(model.reaction)
+
+        for r in model.reactions():
+            assert round(r.flux_range[0], 6) == round(unpruned[r.id][0], 6)
+            assert round(r.flux_range[1], 6) == round(unpruned[r.id][1], 6)
+
+    def test_FVA_subset(self, buffer=False):
+
+        FVA(self.model, reactions=['R_PGI', self.model.reaction['R_FRD']])
+
+        assert round(self.model.reaction['R_PGI'].flux_range[0], 4) == 5.1063
+        assert round(self.model.reaction['R_FRD'].flux_range[1], 4) == 999993.6645
+        assert not hasattr(self.model.reaction['R_ACKr'], 'flux_range')
+        assert self.model.fva_lps_saved + self.model.fva_lps_solved == 4
+
     def tearDown(self):
         pass
 
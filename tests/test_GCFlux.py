@@ -17,6 +17,7 @@ from pyabolism.io import load_model
 from pyabolism.simulate import GCFlux
 from pyabolism.simulate.GCFlux import _convert_model as convert_model
 from pyabolism.simulate.GCFlux import _build_GCFlux_lp as build_GCFlux_lp
+from pyabolism.simulate.GCFlux import GCFluxSession
 
 
 class TestGCFlux(unittest.TestCase):
@@ -77,8 +78,46 @@ class TestGCFlux(unittest.TestCase):
         lp.optimize()
 
         for model, value in zip(models, [0.53802415, 0.39204621]):
-            for reaction in [r for r in model.reactions() if r.objective_coefficient != 0]:
-                assert (np.round(reaction.lp_var.X, 8) == value)
+            for column in model.lp_columns[np.flatnonzero(model.split.objective)]:
+                assert (np.round(model.lp.primal_values([column])[0], 8) == value)
+
+    def test_GCFlux_objective(self, buffer=True):
+
+        # as with irreversify, both directions of a reversible reaction keep its coefficient
+        reaction = [r for r in self.model.reactions()
+                    if r.reversible and r.notes.get('GENE_ASSOCIATION')][0]
+        reaction.objective_coefficient = 2.0
+
+        model = convert_model(self.model)
+
+        columns = [k for (k, rid) in enumerate(model.split.reaction_ids)
+                   if rid.startswith(reaction.id + '_')]
+        assert -1.0 in model.signs[columns] and 1.0 in model.signs[columns]
+        assert (model.split.objective[columns] == 2.0).all()
+
+    def test_GCFlux_session(self, buffer=True):
+
+        genes   = sorted(self.expressions_A)
+        X       = 20.0 + 80.0 * np.random.RandomState(0).rand(3, len(genes))
+        samples = [dict(zip(genes, x)) for x in X]
+
+        for norm in ['L1', 'L2']:
+
+            session = GCFluxSession(self.model, norm=norm)
+            lp      = session.lp
+
+            fluxes = session.batch(X, genes=genes)
+            assert fluxes.shape == (3, len(self.model.reactions()))
+
+            # each sample matches GC-Flux run on its own, on an LP built from scratch
+            for expressions, sample_fluxes in zip(samples, fluxes):
+                GCFlux(self.model, expressions, norm=norm)
+                assert np.allclose([r.flux_value for r in self.model.reactions()], sample_fluxes,
+                                   atol=1e-5)
+
+            # the converted model and its LP are reused for every sample
+            assert session.lp is lp
+            assert np.allclose(session.batch(samples[::-1]), fluxes[::-1], atol=1e-5)
 
     def tearDown(self):
         pass
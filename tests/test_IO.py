@@ -11,9 +11,22 @@ Tests for `FBA` function.
 import unittest
 
 import os
+import pickle
+import shutil
 import tempfile
 
-from pyabolism.io import load_model, save_model
+import numpy as np
+
+from pyabolism.io import load_model, save_model, load_sbml, _load_sbml_fast, load_matrix
+from pyabolism.io import cache_model, uncache_model
+
+
+def _memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
 
 
 class TestIO(unittest.TestCase):
@@ -28,6 +41,49 @@ class TestIO(unittest.TestCase):
 
         save_model(model, os.path.sep.join([tempfile.gettempdir(), 'test.xml']), filetype='sbml')
 
+    def test_fast_sbml(self, buffer=True):
+
+        # the streaming reader must give exactly the model read by libsbml
+        for filename in ['examples/data/ecoli_core.xml',
+                         os.path.sep.join([tempfile.gettempdir(), 'test_fast.xml'])]:
+
+            if filename != 'examples/data/ecoli_core.xml':
+                save_model(self.model, filename, filetype='sbml')
+
+            fast    = _load_sbml_fast(filename)
+            libsbml = load_sbml(filename, fast=False)
+
+            assert fast is not None
+            assert list(fast.metabolite) == list(libsbml.metabolite)
+            assert list(fast.reaction) == list(libsbml.reaction)
+
+            for a, b in zip(fast.metabolites(), libsbml.metabolites()):
+                assert (a.name, a.compartment, a.charge, a.boundaryCondition) == \
+                    (b.name, b.compartment, b.charge, b.boundaryCondition)
+
+            for a, b in zip(fast.reactions(), libsbml.reactions()):
+                assert (a.name, a.reversible, a.notes, a.default_bounds, a.objective_coefficient) \
+                    == (b.name, b.reversible, b.notes, b.default_bounds, b.objective_coefficient)
+                assert [(m.id, s) for (m, s) in a.participants.items()] == \
+                    [(m.id, s) for (m, s) in b.participants.items()]
+
+            assert [(u.kind, u.scale, u.exponent, u.multiplier)
+                    for u in fast.unit_definitions()[0].units] == \
+                [(u.kind, u.scale, u.exponent, u.multiplier)
+                 for u in libsbml.unit_definitions()[0].units]
+
+    def test_fast_sbml_fallback(self, buffer=True):
+
+        filename = os.path.sep.join([tempfile.gettempdir(), 'test_level3.xml'])
+
+        with open('examples/data/ecoli_core.xml') as original:
+            text = original.read().replace('level="2"', 'level="3"', 1)
+        with open(filename, 'w') as level3:
+            level3.write(text)
+
+        # other levels of SBML are left to libsbml
+        assert _load_sbml_fast(filename) is None
+
     def test_pickle_io(self, buffer=True):
 
         filepath = os.path.sep.join([tempfile.gettempdir(), 'test.xml'])
@@ -36,6 +92,91 @@ class TestIO(unittest.TestCase):
 
         load_model(filepath, filetype='pickle')
 
+    def test_binary_io(self, buffer=True):
+
+        path = os.path.sep.join([tempfile.gettempdir(), 'test.pyab'])
+
+        self.model.reaction['R_PGI'].flux_value = 1.5
+        save_model(self.model, path, filetype='binary')
+
+        model = load_model(path, filetype='binary')
+
+        assert list(model.reaction) == list(self.model.reaction)
+        assert list(model.metabolite) == list(self.model.metabolite)
+
+        for a, b in zip(model.reactions(), self.model.reactions()):
+            assert (a.name, a.reversible, a.notes, a.default_bounds, a.objective_coefficient,
+                    a.flux_value) == \
+                (b.name, b.reversible, b.notes, b.default_bounds, b.objective_coefficient,
+                 b.flux_value)
+            # participants must keep their order, as well as their stoichiometry
+            assert [(m.id, s) for (m, s) in a.participants.items()] == \
+                [(m.id, s) for (m, s) in b.participants.items()]
+
+        for a, b in zip(model.metabolites(), self.model.metabolites()):
+            assert (a.name, a.compartment, a.charge, a.boundaryCondition) == \
+                (b.name, b.compartment, b.charge, b.boundaryCondition)
+            # the raw notes are kept as text, whichever reader produced them
+            raw_notes = b.raw_notes.decode('utf-8') if isinstance(b.raw_notes, bytes) \
+                else b.raw_notes
+            assert a.raw_notes == raw_notes
+
+        assert (model.matrix().S != self.model.matrix().S).nnz == 0
+
+    def test_binary_matrix(self, buffer=True):
+
+        path = os.path.sep.join([tempfile.gettempdir(), 'test_matrix.pyab'])
+
+        save_model(self.model, path, filetype='binary')
+
+        matrix = load_matrix(path)
+
+        assert _memory_mapped(matrix.S.data)
+        assert matrix.reaction_ids == [r.id for r in self.model.reactions()]
+        assert np.all(matrix.upper_bounds == self.model.matrix().upper_bounds)
+
+        # a mapped matrix is pickled by its path, and mapped again on unpickling
+        pickled = pickle.loads(pickle.dumps(matrix, 2))
+        assert _memory_mapped(pickled.S.data)
+        assert (pickled.S != self.model.matrix().S).nnz == 0
+
+        assert len(pickle.dumps(matrix, 2)) < len(pickle.dumps(self.model.matrix(), 2))
+
+    def test_model_cache(self, buffer=True):
+
+        config_folder = tempfile.mkdtemp()
+        cache_folder  = os.path.join(config_folder, 'cache')
+
+        try:
+            model = uncache_model('examples/data/ecoli_core.xml', config_folder=config_folder)
+            assert list(model.reaction) == list(self.model.reaction)
+            assert len(os.listdir(cache_folder)) == 1
+
+            # the second load comes from the cache, mapped from its binary files
+            model = uncache_model('examples/data/ecoli_core.xml', config_folder=config_folder)
+            assert list(model.reaction) == list(self.model.reaction)
+            assert _memory_mapped(model.matrix().S.data)
+            pickled = pickle.dumps(model.matrix(), -1)
+
+            # models of an earlier format version are invalidated...
+            os.mkdir(os.path.join(cache_folder, 'stale-v0'))
+
+            # ...and an edited file is a new model, which here leaves room for only itself
+            edited = os.path.join(config_folder, 'edited.xml')
+            with open('examples/data/ecoli_core.xml') as original:
+                with open(edited, 'w') as f:
+                    f.write(original.read().replace('R_PGI', 'R_PGI_edited'))
+
+            path = cache_model(edited, config_folder=config_folder, max_size=1)
+            assert os.listdir(cache_folder) == [os.path.basename(path)]
+            assert 'R_PGI_edited' in load_model(edited, filetype='cached').reaction
+
+            # a matrix read from the cache is still unpickled once its entry has been evicted
+            assert (pickle.loads(pickled).S != model.matrix().S).nnz == 0
+
+        finally:
+            shutil.rmtree(config_folder)
+
     def tearDown(self):
         pass
 
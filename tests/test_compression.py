@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_compression
+----------------------------------
+
+Tests for `compress` and `decompress` functions.
+"""
+import unittest
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FBA, FVA
+from pyabolism.simulate.compression import compress, decompress, Compression
+from pyabolism.model import StoichiometricMatrix
+from pyabolism.simulate.LP import _lp_lower_bounds
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def test_compress(self, buffer=True):
+
+        reduced     = compress(self.model)
+        compression = reduced.compression
+
+        assert len(reduced.reactions()) < len(self.model.reactions())
+        assert reduced.original is self.model
+
+        # every original reaction is either blocked or maps onto one reduced reaction
+        assert ((compression.columns >= 0) != compression.blocked).all()
+        for reaction in reduced.reactions():
+            for rid, ratio in zip(reaction.notes['original_rids'],
+                                  reaction.notes['original_rid_multipliers']):
+                j = self.model.matrix().reaction_index[rid]
+                assert compression.ratios[j] == ratio
+
+        # a flux known to be blocked is removed along with the reactions coupled to it
+        further = compress(self.model, blocked=['R_PGK'])
+        assert len(further.reactions()) < len(reduced.reactions())
+
+    def test_coupling(self, buffer=True):
+
+        matrix      = self.model.matrix()
+        compression = Compression(matrix)
+
+        # scaling a coupled reaction leaves the groups as they were, whatever the basis found
+        counts = np.bincount(compression.columns[compression.columns >= 0])
+        j      = np.flatnonzero(compression.columns == np.flatnonzero(counts > 1)[0])[-1]
+
+        scale    = np.ones(len(matrix.reaction_ids))
+        scale[j] = 3.0
+
+        S      = matrix.S.tocsc().multiply(scale).tocsc()
+        scaled = Compression(StoichiometricMatrix.from_arrays(
+            S, matrix.reaction_ids, matrix.metabolite_ids, matrix.boundary, matrix.reversible,
+            matrix.lower_bounds / scale, matrix.upper_bounds / scale, matrix.objective))
+
+        assert np.array_equal(scaled.columns, compression.columns)
+        assert np.allclose(scaled.ratios, compression.ratios / scale)
+
+    def test_decompress(self, buffer=True):
+
+        original = FBA(self.model, write_back=False)
+
+        reduced  = compress(self.model)
+        expanded = decompress(reduced, FBA(reduced))
+
+        assert np.round(expanded.objective_value, 8) == np.round(original.objective_value, 8)
+        assert np.round(self.model.total_objective, 8) == np.round(original.objective_value, 8)
+
+        # the expanded fluxes are a steady state of the original, within its bounds
+        matrix = self.model.matrix()
+        fluxes = np.array([r.flux_value for r in self.model.reactions()])
+        assert np.allclose(fluxes, expanded.fluxes)
+        assert np.abs(matrix.constrained().dot(fluxes)).max() < 1e-6
+        assert (fluxes >= _lp_lower_bounds(matrix) - 1e-6).all()
+        assert (fluxes <= matrix.upper_bounds + 1e-6).all()
+
+        # as is found by FVA, with no need to solve LPs for blocked or lumped reactions
+        reference = FVA(self.model, norm='', write_back=False)
+        ranges    = FVA(reduced, norm='', write_back=False)
+
+        assert ranges.lps_solved < reference.lps_solved
+        assert np.allclose(decompress(reduced, ranges).flux_ranges, reference.flux_ranges,
+                           atol=1e-6)
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+
+    unittest.main()
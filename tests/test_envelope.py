@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_envelope
+----------------------------------
+
+Tests for `production_envelope` function.
+"""
+import unittest
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FBA, production_envelope
+
+
+class TestEnvelope(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def test_envelope(self, buffer=True):
+
+        envelope = production_envelope(self.model, ['R_EX_glc_e_'], points=6)
+
+        # the glucose uptake runs over its full range, the fastest giving the growth of FBA
+        assert envelope.shape == (6, 2)
+        assert envelope[0, 0] == -10.0
+        assert np.round(envelope[0, 1], 8) == np.round(FBA(self.model).objective_value, 8)
+        assert (np.diff(envelope[:, 1]) < 0).all()
+
+        # the model is left as it was
+        assert self.model.reaction['R_EX_glc_e_'].lower_bound == -10.0
+        assert np.round(FBA(self.model).objective_value, 4) == 0.8614
+
+    def test_envelope_plane(self, buffer=True):
+
+        reactions = ['R_EX_glc_e_', 'R_EX_o2_e_']
+        ranges    = [(-10.0, 0.0), (-30.0, 0.0)]
+
+        envelope = production_envelope(self.model, reactions, points=5, ranges=ranges)
+        assert envelope.shape == (5, 5, 3)
+
+        # each point matches FBA with the swept fluxes fixed
+        for i, j in [(0, 1), (2, 3), (4, 4)]:
+            for k, reaction in enumerate(reactions):
+                self.model.reaction[reaction].lower_bound = envelope[i, j, k]
+                self.model.reaction[reaction].upper_bound = envelope[i, j, k]
+
+            objective = FBA(self.model, write_back=False).objective_value
+            if objective is None:
+                assert np.isnan(envelope[i, j, 2])
+            else:
+                assert np.round(envelope[i, j, 2], 6) == np.round(objective, 6)
+
+        parallel = production_envelope(self.model, reactions, points=5, ranges=ranges,
+                                       processes=2)
+        assert np.allclose(parallel, envelope, equal_nan=True)
+
+        with self.assertRaises(Exception):
+            production_envelope(self.model, ['R_PGK'])
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_knockouts
+----------------------------------
+
+Tests for the `knockouts` deletion screens.
+"""
+
+import unittest
+from itertools import combinations
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FBA
+from pyabolism.simulate.knockouts import single_reaction_deletions, double_reaction_deletions
+from pyabolism.simulate.knockouts import single_gene_deletions, double_gene_deletions
+from pyabolism.simulate.knockouts import _GeneReactionMap
+
+
+class TestKnockouts(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def _knockout_FBA(self, reaction_ids):
+
+        model = load_model('examples/data/ecoli_core.xml')
+        for rid in reaction_ids:
+            model.reaction[rid].lower_bound = 0.0
+            model.reaction[rid].upper_bound = 0.0
+        FBA(model, show=False)
+
+        return np.nan if model.total_objective is None else model.total_objective
+
+    def test_reaction_deletions(self, buffer=True):
+
+        growth = single_reaction_deletions(self.model)
+
+        assert list(growth.keys()) == list(self.model.reaction.keys())
+        for rid in ['R_PGI', 'R_ENO', 'R_EX_glc_e_', 'R_ACKr']:
+            assert np.allclose(growth[rid], self._knockout_FBA([rid]), equal_nan=True)
+
+        # the LP of the model is left untouched by the screen
+        FBA(self.model, show=False)
+        assert np.round(self.model.total_objective, 8) == 0.86140741
+
+        growth = double_reaction_deletions(self.model, ['R_PGI', 'R_G6PDH2r', 'R_ACKr'])
+        assert len(growth) == 3
+        assert np.allclose(growth[('R_PGI', 'R_G6PDH2r')],
+                           self._knockout_FBA(['R_PGI', 'R_G6PDH2r']), equal_nan=True)
+
+    def test_gene_deletions(self, buffer=True):
+
+        growth = single_gene_deletions(self.model)
+
+        # b4025 is the only gene associated with R_PGI
+        assert np.allclose(growth['b4025'], self._knockout_FBA(['R_PGI']))
+
+        # b2935 and b2465 are isozymes, so both must be deleted to disable the reaction
+        assert np.round(growth['b2935'], 8) == 0.86140741
+        growth = double_gene_deletions(self.model, ['b2935', 'b2465'])
+        assert np.allclose(growth[('b2935', 'b2465')], self._knockout_FBA(['R_TKT1', 'R_TKT2']))
+
+    def test_gene_reaction_map(self, buffer=True):
+
+        # the reactions disabled by each pair of genes, found from the gene incidence, must be
+        # those found by evaluating every GPR at once
+        gpr   = _GeneReactionMap(self.model)
+        pairs = list(combinations(gpr.genes, 2))
+
+        expected = [list(np.flatnonzero(~row)) for row in gpr.gprs.active(pairs)]
+        assert gpr.knocked_out(pairs) == expected
+        assert gpr.knocked_out([['b2935', 'b2465', 'b0000']]) == \
+            gpr.knocked_out([['b2935', 'b2465']])
+
+    def test_parallel_deletions(self, buffer=True):
+
+        serial   = single_gene_deletions(self.model)
+        parallel = single_gene_deletions(self.model, processes=2)
+
+        assert list(serial.keys()) == list(parallel.keys())
+        assert np.allclose(list(serial.values()), list(parallel.values()), equal_nan=True)
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+
+    unittest.main()
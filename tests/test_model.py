@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_model
+----------------------------------
+
+Tests for the compiled `StoichiometricMatrix` of a `MetaModel`.
+"""
+
+import gc
+import pickle
+import unittest
+from copy import copy
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.model import Reaction, Metabolite, Gene, _Coefficients
+from pyabolism.simulate import FBA
+
+
+class TestStoichiometricMatrix(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def test_matrix(self, buffer=True):
+
+        matrix = self.model.matrix()
+
+        assert matrix.shape == (len(self.model.metabolite), len(self.model.reaction))
+        assert matrix.reaction_ids == list(self.model.reaction.keys())
+
+        for reaction in self.model.reactions():
+            j = matrix.reaction_index[reaction.id]
+            for metabolite, stoichiometry in reaction.participants.items():
+                assert matrix.S[matrix.metabolite_index[metabolite.id], j] == stoichiometry
+            assert matrix.lower_bounds[j] == reaction.lower_bound
+            assert matrix.upper_bounds[j] == reaction.upper_bound
+            assert matrix.objective[j] == reaction.objective_coefficient
+
+        assert matrix.S.nnz == sum([len(r.participants) for r in self.model.reactions()])
+
+    def test_matrix_updates(self, buffer=True):
+
+        matrix = self.model.matrix()
+
+        # changes of bounds are picked up without recompiling the structure...
+        self.model.reaction['R_EX_glc_e_'].lower_bound = -5.0
+        assert self.model.matrix() is matrix
+        assert matrix.lower_bounds[matrix.reaction_index['R_EX_glc_e_']] == -5.0
+
+        # ...while adding a reaction triggers a fresh compilation
+        reaction = Reaction('R_test')
+        reaction.add_participant(self.model.metabolite['M_atp_c'], -1.0)
+        self.model.reaction.add(reaction)
+
+        new_matrix = self.model.matrix()
+        assert new_matrix is not matrix
+        assert new_matrix.shape[1] == matrix.shape[1] + 1
+
+        # as does a change to the participants of a reaction already in the model
+        self.model.reaction['R_PGK'].participants[self.model.metabolite['M_atp_c']] = 50.0
+        matrix = self.model.matrix()
+        assert matrix is not new_matrix
+        assert matrix.S[matrix.metabolite_index['M_atp_c'], matrix.reaction_index['R_PGK']] == 50.0
+        assert self.model.matrix() is matrix
+
+    def test_steady_state(self, buffer=True):
+
+        FBA(self.model, show=False)
+
+        matrix = self.model.matrix()
+
+        balance = matrix.constrained().dot(matrix.flux_values)
+        assert np.allclose(balance, 0.0, atol=1e-6)
+
+    def tearDown(self):
+        pass
+
+
+class TestMetaModel(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def test_copy(self, buffer=True):
+
+        FBA(self.model, show=False)
+        lp = self.model.lp
+
+        model = self.model.copy()
+
+        # the copy has the same structure, in objects of its own
+        assert model.matrix().S is self.model.matrix().S
+        assert list(model.reaction.keys()) == list(self.model.reaction.keys())
+        for rid in ['R_PGI', 'R_Biomass_Ecoli_core_N__w_GAM_']:
+            reaction = model.reaction[rid]
+            assert reaction is not self.model.reaction[rid]
+            assert reaction.notes == self.model.reaction[rid].notes
+            assert reaction.notes is not self.model.reaction[rid].notes
+            for metabolite in reaction.participants:
+                assert model.metabolite[metabolite.id] is metabolite
+                assert metabolite.participations[rid] == reaction.participants[metabolite]
+
+        # which may be altered, and simulated, without affecting the original
+        fresh = load_model('examples/data/ecoli_core.xml')
+        for altered in [model, fresh]:
+            altered.reaction['R_EX_glc_e_'].lower_bound = -5.0
+            altered.reaction.remove(altered.reaction['R_PGI'])
+            FBA(altered, show=False)
+
+        assert model.lp is not lp
+        assert np.round(model.total_objective, 8) == np.round(fresh.total_objective, 8)
+        assert model.total_objective < 0.86140741
+
+        assert 'R_PGI' in self.model.metabolite['M_g6p_c'].participations
+
+        # notes, too, are the copy's own
+        model.metabolite['M_g6p_c'].notes['edited'] = True
+        assert 'edited' not in self.model.metabolite['M_g6p_c'].notes
+        FBA(self.model, show=False)
+        assert self.model.lp is lp
+        assert np.round(self.model.total_objective, 8) == 0.86140741
+
+    def test_temporary_changes(self, buffer=True):
+
+        objective = FBA(self.model, show=False).objective_value
+
+        with self.model.temporary_changes({'R_EX_glc_e_': (-5.0, 0.0)}):
+            assert self.model.reaction['R_EX_glc_e_'].lower_bound == -5.0
+            self.model.reaction['R_ATPM'].lower_bound = 0.0
+            assert FBA(self.model, show=False).objective_value < objective
+
+        assert self.model.reaction['R_EX_glc_e_'].lower_bound == -10.0
+        assert self.model.reaction['R_ATPM'].lower_bound > 0.0
+        assert np.round(FBA(self.model, show=False).objective_value, 8) == np.round(objective, 8)
+
+        # the changes are undone even where the context is left by an error
+        with self.assertRaises(KeyError):
+            with self.model.temporary_changes():
+                self.model.reaction['R_PGK'].upper_bound = 0.0
+                self.model.reaction['R_missing']
+        assert self.model.reaction['R_PGK'].upper_bound > 0.0
+
+    def test_indexes(self, buffer=True):
+
+        reactions = self.model.reactions()
+
+        def scan(test):
+            return [r.id for r in reactions if test(r)]
+
+        def ids(elements):
+            return [e.id for e in elements]
+
+        # the indexes must agree with a search of every reaction, and keep the model's order
+        assert ids(self.model.reaction.get_exchanges()) == \
+            scan(lambda r: len(r.participants) == 1 or
+                 any([m.boundaryCondition for m in r.participants]))
+        assert ids(self.model.reaction.get_transports()) == \
+            scan(lambda r: set([m.compartment for m in r.participants]) == set(['e', 'c']))
+        assert ids(self.model.reaction.get_by_compartment('Extra_organism')) == \
+            scan(lambda r: 'Extra_organism' in [m.compartment for m in r.participants])
+        assert ids(self.model.metabolite.get_boundary()) == \
+            [m.id for m in self.model.metabolites() if m.boundaryCondition]
+
+        # and follow reactions as they are removed and added
+        reaction = self.model.reaction['R_GLCpts']
+        assert self.model.reaction.get_by_gene('b2417') == [reaction]
+        self.model.reaction.remove(reaction)
+        assert reaction not in self.model.reaction.get_by_compartment('Cytosol')
+
+        for mid, compartment in [('M_glc_D_e_copy', 'e'), ('M_glc_D_c_copy', 'c')]:
+            self.model.metabolite.add(Metabolite(mid, compartment=compartment))
+
+        duplicate = Reaction('R_GLCt_copy', reversible=False)
+        duplicate.notes['GENE_ASSOCIATION'] = '( b2417 and b1101 )'
+        duplicate.add_participant(self.model.metabolite['M_glc_D_e_copy'], -1.0)
+        duplicate.add_participant(self.model.metabolite['M_glc_D_c_copy'], 1.0)
+        self.model.reaction.add(duplicate)
+
+        assert self.model.reaction.get_transports() == [duplicate]
+        assert self.model.reaction.get_by_gene('b2417') == [duplicate]
+        assert self.model.gene_incidence().reactions['R_GLCt_copy'] == ['b2417', 'b1101']
+        assert self.model.reaction.get_by_compartment('c') == [duplicate]
+        assert ids(self.model.metabolite.get_by_compartment('e')) == ['M_glc_D_e_copy']
+
+        # as well as changes within reactions and metabolites already in the model
+        metabolite = self.model.metabolite['M_glc_D_e_copy']
+        metabolite.boundaryCondition = True
+        assert duplicate in self.model.reaction.get_exchanges()
+        assert metabolite in self.model.metabolite.get_boundary()
+
+        reaction = self.model.reaction['R_PGI']
+        assert reaction not in self.model.reaction.get_exchanges()
+        reaction.remove_participant(self.model.metabolite['M_g6p_c'])
+        assert reaction in self.model.reaction.get_exchanges()
+
+        metabolite.compartment = 'c'
+        assert self.model.reaction.get_transports() == []
+        assert ids(self.model.metabolite.get_by_compartment('e')) == []
+
+        # changes are counted by each model, such that neither changes of bounds nor changes
+        # to a copy make the indexes of the original stale
+        index = self.model.reaction.index()
+        model = self.model.copy()
+        model.reaction['R_PGK'].remove_participant(model.metabolite['M_atp_c'])
+        model.metabolite['M_3pg_c'].boundaryCondition = True
+        self.model.reaction['R_PGK'].lower_bound = 0.0
+        assert self.model.reaction.index() is index
+        assert model.reaction['R_PGK'] in model.reaction.get_exchanges()
+
+    def tearDown(self):
+        pass
+
+
+class TestElements(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def test_coefficients(self, buffer=True):
+
+        # a mapping that keeps its order, as an OrderedDict
+        coefficients = _Coefficients([('b', 1.0), ('a', -2.0)])
+        coefficients['c'] = 3.0
+        coefficients['b'] = 4.0
+        del coefficients['a']
+
+        assert list(coefficients) == ['b', 'c'] and coefficients.values() == [4.0, 3.0]
+        assert coefficients == {'c': 3.0, 'b': 4.0} and coefficients != {'b': 4.0}
+        assert coefficients.get('a', 0.0) == 0.0 and 'a' not in coefficients
+        with self.assertRaises(KeyError):
+            coefficients.pop('a')
+
+        for duplicate in [copy(coefficients), coefficients.copy(),
+                          pickle.loads(pickle.dumps(coefficients, 2))]:
+            assert duplicate.items() == coefficients.items()
+            duplicate['d'] = 5.0
+            assert 'd' not in coefficients
+
+        # long mappings index their keys, which must follow additions and removals
+        n = 3 * _Coefficients.indexed
+        coefficients = _Coefficients()
+        for k in range(n):
+            coefficients[str(k)] = float(k)
+        for k in range(0, n, 2):
+            del coefficients[str(k)]
+        coefficients['0'] = -1.0
+
+        assert len(coefficients) == n // 2 + 1
+        assert all(coefficients[str(k)] == float(k) for k in range(1, n, 2))
+        assert coefficients.keys()[-1] == '0' and coefficients['0'] == -1.0
+        assert list(coefficients) == [str(k) for k in range(1, n, 2)] + ['0']
+
+        # as must removing nearly all of them, in any order
+        for k in list(range(1, n - 2, 4)) + list(range(n - 1, 4, -4)):
+            del coefficients[str(k)]
+        assert coefficients.items() == [('3', 3.0), ('0', -1.0)]
+
+    def test_slots(self, buffer=True):
+
+        # copying and pickling do not give elements a __dict__ of their own
+        self.model.copy()
+        pickle.dumps(self.model.reaction['R_PGK'], 2)
+        for element in [self.model.reaction['R_PGK'], self.model.metabolite['M_atp_c']]:
+            assert not any(isinstance(referent, dict) and referent is not element._notes
+                           for referent in gc.get_referents(element))
+
+        reaction   = self.model.reaction['R_PGI']
+        metabolite = self.model.metabolite['M_g6p_c']
+
+        # the attributes of elements are held in slots, and ids are shared with the model,
+        # while other attributes may still be set
+        for element in [reaction, metabolite, Gene('b0001')]:
+            assert 'id' not in element.__dict__
+            element.undeclared = 1
+            assert element.undeclared == 1
+            with self.assertRaises(AttributeError):
+                element.unset
+
+        assert Reaction(''.join(['R_', 'PGI'])).id is reaction.id
+        assert metabolite.participations['R_PGI'] == reaction.participants[metabolite]
+        assert reaction in self.model.reaction.get_by_consumes(metabolite)
+
+        # notes are made only when first needed
+        element = Metabolite('M_new_c')
+        assert element._notes is None and element.notes == {} and element._notes is not None
+
+        # elements are copied and pickled with all their attributes
+        reaction.flux_range = (0.0, 1.0)
+        for duplicate in [copy(reaction), pickle.loads(pickle.dumps(reaction, 2))]:
+            assert (duplicate.id, duplicate.notes, duplicate.flux_range, duplicate.undeclared) \
+                == (reaction.id, reaction.notes, reaction.flux_range, reaction.undeclared)
+            assert duplicate.default_bounds == reaction.default_bounds
+            assert [(m.id, s) for (m, s) in duplicate.participants.items()] == \
+                [(m.id, s) for (m, s) in reaction.participants.items()]
+
+if __name__ == '__main__':
+
+    unittest.main()
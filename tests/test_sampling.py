@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_sampling
+----------------------------------
+
+Tests for `sample` function.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import sample
+from pyabolism.simulate.sampling import warmup_points, _Sampler
+from pyabolism.simulate.LP import _lp_lower_bounds
+
+
+class TestSampling(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model  = load_model('examples/data/ecoli_core.xml')
+        self.matrix = self.model.matrix()
+
+        self.directory = tempfile.mkdtemp()
+
+    def assert_feasible(self, samples):
+
+        assert np.abs(self.matrix.constrained().dot(samples.T)).max() < 1e-6
+        assert (samples >= _lp_lower_bounds(self.matrix) - 1e-6).all()
+        assert (samples <= self.matrix.upper_bounds + 1e-6).all()
+
+    def test_sample(self, buffer=True):
+
+        warmup  = warmup_points(self.matrix)
+        samples = sample(self.model, 50, chains=4, thinning=20, warmup=warmup, seed=0)
+
+        assert samples.shape == (50, len(self.matrix.reaction_ids))
+        self.assert_feasible(samples)
+
+        # the chains move, and are reproducible from their seed
+        assert (samples.std(axis=0) > 1e-3).sum() > 10
+        assert np.array_equal(sample(self.model, 50, chains=4, thinning=20, warmup=warmup, seed=0),
+                              samples)
+
+    def test_project(self, buffer=True):
+
+        warmup  = warmup_points(self.matrix)
+        sampler = _Sampler(self.matrix, warmup)
+
+        # drift away from the steady-state space is removed
+        S      = self.matrix.constrained()
+        drift  = S.T.dot(1e-7 * np.random.RandomState(0).randn(S.shape[0], 4)).T
+        points = sampler.project(sampler.center + drift)
+        self.assert_feasible(points)
+        assert np.abs(S.dot(points.T)).max() < 1e-9
+
+        # a point that would be projected out of bounds is left as it is
+        point = sampler.center.copy()
+        point[np.argmax(sampler.upper_bounds - sampler.lower_bounds)] += 1e6
+        assert np.array_equal(sampler.project(point[np.newaxis]), point[np.newaxis])
+
+    def test_sample_to_file(self, buffer=True):
+
+        output  = os.path.join(self.directory, 'samples.npy')
+        samples = sample(self.model, 30, chains=4, thinning=20, processes=2, output=output, seed=0)
+
+        saved = np.load(output)
+        assert saved.shape == (30, len(self.matrix.reaction_ids))
+        assert np.array_equal(saved, samples)
+        self.assert_feasible(saved)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+
+    unittest.main()
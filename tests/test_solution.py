@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_solution
+----------------------------------
+
+Tests for the `Solution` returned by simulations.
+"""
+
+import unittest
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FBA, FVA
+from pyabolism.simulate.solution import stack
+
+
+class TestSolution(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def test_FBA_solution(self, buffer=True):
+
+        solution = FBA(self.model, write_back=False)
+
+        assert np.round(solution.objective_value, 8) == 0.86140741
+        assert np.round(solution.shadow_price('M_13dpg_c'), 6) == -0.045276
+        assert len(solution.reduced_costs) == len(self.model.reactions())
+
+        # without write_back the model is left untouched
+        assert self.model.reaction['R_PGI'].flux_value is None
+        assert getattr(self.model, 'total_objective', None) is None
+
+        solution.write_back(self.model)
+        assert self.model.reaction['R_PGI'].flux_value == solution.flux('R_PGI')
+        assert self.model.total_objective == solution.objective_value
+
+        # solutions of many runs are stacked into a single array
+        solutions = []
+        for lower_bound in [-5.0, -10.0]:
+            self.model.reaction['R_EX_glc_e_'].lower_bound = lower_bound
+            solutions.append(FBA(self.model, write_back=False))
+        assert stack(solutions).shape == (2, len(self.model.reactions()))
+        assert stack(solutions, 'objective_value').ravel()[0] < solutions[1].objective_value
+
+    def test_FVA_solution(self, buffer=True):
+
+        solution = FVA(self.model, reactions=['R_ATPS4r', 'R_ACKr'], write_back=False)
+
+        assert np.round(solution.flux_range('R_ATPS4r'), 4).tolist() == [39.7470, 39.7470]
+        assert np.all(np.isnan(solution.flux_range('R_PGI')))
+        assert not hasattr(self.model.reaction['R_ATPS4r'], 'flux_range')
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_solvers
+----------------------------------
+
+Tests for the `solvers` backends of `simulate`.
+"""
+
+import unittest
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.simulate import FBA, FVA
+from pyabolism.simulate.solvers import available_solvers, get_solver, as_solver, OPTIMAL, MAXIMIZE
+
+SOLVERS = available_solvers()
+
+
+class TestSolvers(unittest.TestCase):
+
+    def setUp(self):
+
+        self.model = load_model('examples/data/ecoli_core.xml')
+
+    def test_FBA(self, buffer=True):
+
+        for solver in SOLVERS:
+            FBA(self.model, solver=solver)
+            assert self.model.lp.name == solver
+            assert np.round(self.model.metabolite['M_13dpg_c'].shadow, 6) == -0.045276
+
+            for norm in ['', 'L1', 'L2']:
+                FBA(self.model, norm=norm, solver=solver)
+                assert np.round(self.model.total_objective, 6) == 0.861407
+                assert np.round(self.model.reaction['R_ACONT'].flux_value, 4) == 6.2649
+
+    def test_FVA(self, buffer=True):
+
+        for solver in SOLVERS:
+            FVA(self.model, solver=solver, reactions=['R_ATPS4r', 'R_ACKr', 'R_PGI'])
+            assert np.round(self.model.reaction['R_ATPS4r'].flux_range, 4).tolist() == \
+                [39.7470, 39.7470]
+            assert np.round(self.model.reaction['R_ACKr'].flux_range, 4).tolist() == [0.0, 0.0]
+
+    def test_switch_solver(self, buffer=True):
+
+        for solver in SOLVERS:
+            FBA(self.model, solver=solver)
+            assert isinstance(self.model.lp, get_solver(solver))
+
+            # with no solver named, the existing LP is kept
+            lp = self.model.lp
+            FBA(self.model)
+            assert self.model.lp is lp
+
+    @unittest.skipUnless('gurobi' in SOLVERS, 'gurobipy unavailable')
+    def test_native(self, buffer=True):
+
+        import gurobipy as grb
+
+        lp = as_solver(grb.Model('native'))
+        columns = lp.add_variables([0.0, 0.0], [1.0, 2.0], [1.0, 1.0])
+        lp.set_sense(MAXIMIZE)
+        lp.add_constraint(columns, [1.0, 1.0], '<', 2.5)
+
+        assert lp.solve() == OPTIMAL
+        assert lp.objective_value() == 2.5
+        assert lp.NumVars == 2
+
+    def test_unknown_solver(self, buffer=True):
+
+        self.assertRaises(Exception, FBA, self.model, solver='no_such_solver')
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+
+    unittest.main()
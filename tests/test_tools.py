@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_tools
+----------------------------------
+
+Tests for the compiled GPRs of `tools`.
+"""
+
+import unittest
+
+import numpy as np
+
+from pyabolism.io import load_model
+from pyabolism.tools import CompiledGPRs, compile_GPRs, GPR_genes, construct_gene_list
+
+
+class TestCompiledGPRs(unittest.TestCase):
+
+    def setUp(self):
+
+        self.gprs = CompiledGPRs(['( b1 and b2 ) or b3',
+                                  'b1',
+                                  '',
+                                  '( b1 or b1 ) and ( b4 )',
+                                  '(b2_and_b3) OR (b4 and (b1 or b5))'])
+
+    def test_capacities(self, buffer=True):
+
+        expressions = {'b1': 1.0, 'b2': 2.0, 'b3': 4.0, 'b4': 8.0}
+
+        # a gene repeated within a bracket counts once, and missing genes are unlimited
+        assert self.gprs.capacities(expressions).tolist() == [5.0, 1.0, np.infty, 1.0, 10.0]
+
+        # a matrix of samples is evaluated in one go, one row per sample
+        samples = [expressions, {'b1': 0.0, 'b5': 3.0}]
+        assert self.gprs.capacities(self.gprs.expression_matrix(samples))[1].tolist() == \
+            [np.infty, 0.0, np.infty, 0.0, np.infty]
+
+        self.assertRaises(Exception, CompiledGPRs, ['b1 and b2 or b3'])
+
+    def test_complexes(self, buffer=True):
+
+        complexes = self.gprs.complexes()
+
+        assert complexes[0] == [['b1', 'b2'], ['b3']]
+        assert complexes[2] == [[]]
+        assert complexes[4] == [['b2', 'b3'], ['b4', 'b1'], ['b4', 'b5']]
+
+        assert self.gprs.active([['b1'], ['b1', 'b3']])[:, 0].tolist() == [True, False]
+
+        # a single GPR is evaluated alone with the same result
+        for deleted in [['b1'], ['b1', 'b3'], ['b2', 'b4'], ['b4', 'b5']]:
+            assert [self.gprs.satisfied(k, set(deleted)) for k in range(5)] == \
+                self.gprs.active([deleted])[0].tolist()
+
+    def test_compile_GPRs(self, buffer=True):
+
+        model = load_model('examples/data/ecoli_core.xml')
+
+        gprs = compile_GPRs(model)
+        assert compile_GPRs(model) is gprs
+
+        # the compiled form is replaced once a GPR changes
+        model.reaction['R_PGI'].notes['GENE_ASSOCIATION'] = 'b9999'
+        assert compile_GPRs(model) is not gprs
+        assert 'b9999' in compile_GPRs(model).genes
+
+    def test_gene_incidence(self, buffer=True):
+
+        assert GPR_genes('(b2_and_b3) OR (b4 and (b1 or b5 or b4))') == \
+            ['b2', 'b3', 'b4', 'b1', 'b5']
+
+        model     = load_model('examples/data/ecoli_core.xml')
+        incidence = model.gene_incidence()
+
+        # the incidence holds the genes of the compiled GPRs, in the same order
+        gprs = compile_GPRs(model)
+        assert list(incidence.genes) == gprs.genes
+        assert incidence.genes['b4025'] == ['R_PGI']
+
+        matrix = incidence.matrix(model.matrix().reaction_ids)
+        assert matrix.shape == (len(gprs.genes), len(model.reaction))
+        assert matrix.nnz == sum([len(g) for g in incidence.reactions.values()])
+        assert incidence.matrix(model.matrix().reaction_ids) is matrix
+
+        # removing a reaction removes the genes named by no other
+        model.reaction.remove(model.reaction['R_PGI'])
+        assert 'b4025' not in incidence.genes and 'R_PGI' not in incidence.reactions
+        assert incidence.matrix(model.matrix().reaction_ids).shape[0] == len(gprs.genes) - 1
+
+        # as is a reaction whose GPR changes
+        reaction = model.reaction['R_PGK']
+        reaction.notes['GENE_ASSOCIATION'] = 'b9999'
+        assert model.gene_incidence().genes['b9999'] == ['R_PGK']
+        assert model.reaction.get_by_gene('b9999') == [reaction]
+
+        construct_gene_list(model, gene_regex=r'b\d{4}')
+        assert list(model.gene.keys()) == list(model.gene_incidence().genes)
+
+        # the pattern is matched against the GPR strings themselves
+        model.gene.clear()
+        construct_gene_list(model, gene_regex=r'(b\d{4})\s+and')
+        assert 'b9999' not in model.gene
+        assert 0 < len(model.gene) < len(model.gene_incidence().genes)
+
+    def tearDown(self):
+        pass
+
+if __name__ == '__main__':
+
+    unittest.main()